@@ -4,10 +4,12 @@ from . import models
 admin.site.register(models.ProjectOwner)
 admin.site.register(models.Project)
 admin.site.register(models.ProjectBlock)
+admin.site.register(models.ProjectBlockRun)
 admin.site.register(models.ProjectAttributeKey)
 admin.site.register(models.ProjectAttribute)
 admin.site.register(models.ConsumptionMetadata)
 admin.site.register(models.ConsumptionRecord)
+admin.site.register(models.ConsumptionRecordChunk)
 admin.site.register(models.ProjectRun)
 admin.site.register(models.ProjectResult)
 admin.site.register(models.ModelingPeriod)
@@ -0,0 +1,92 @@
+""" Optional indexes on the consumption record table, for trace queries.
+
+Both are built with `CREATE INDEX CONCURRENTLY`, so records can still be
+written while they are built, and must be run outside of a transaction:
+
+- covering: the `(metadata_id, start)` unique constraint is rebuilt to also
+  carry `value` and `estimated`, so trace loads can be answered by
+  index-only scans. Requires PostgreSQL 11.
+- brin: a small index for time range scans across all traces, only useful
+  when records are inserted roughly in start order.
+
+A table partitioned with `datastore.partitioning` already has a covering
+unique constraint.
+"""
+from django.db import connection, transaction
+
+from .models import ConsumptionRecord
+from .partitioning import partition_scheme
+
+TABLE = ConsumptionRecord._meta.db_table
+COVERING_INDEX = TABLE + '_metadata_id_start_covering'
+BRIN_INDEX = TABLE + '_start_brin'
+
+
+def unique_constraint():
+    """ Name and definition of the `(metadata_id, start)` unique constraint.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint"
+            " WHERE conrelid = to_regclass(%s) AND contype = 'u'"
+            " AND pg_get_constraintdef(oid)"
+            " LIKE 'UNIQUE (metadata_id, start)%%'",
+            [TABLE]
+        )
+        return cursor.fetchone()
+
+
+def create_covering_index():
+    """ Replace the `(metadata_id, start)` unique constraint with one whose
+    index includes `value` and `estimated`.
+
+    Returns
+    -------
+    created : bool
+        False if the constraint was already covering.
+    """
+    _check_unpartitioned()
+    if connection.pg_version < 110000:
+        raise ValueError("Covering indexes require PostgreSQL 11")
+
+    name, definition = unique_constraint()
+    if 'INCLUDE' in definition:
+        return False
+
+    with connection.cursor() as cursor:
+        # left behind, invalid, if an earlier build was interrupted
+        cursor.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS {}".format(COVERING_INDEX))
+        cursor.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY {} ON {} (metadata_id, start)"
+            " INCLUDE (value, estimated)".format(COVERING_INDEX, TABLE))
+
+        # Only this swap locks the table, and it doesn't scan it.
+        with transaction.atomic():
+            cursor.execute(
+                "ALTER TABLE {table} DROP CONSTRAINT {name},"
+                " ADD CONSTRAINT {name} UNIQUE USING INDEX {index}"
+                .format(table=TABLE, name=name, index=COVERING_INDEX))
+    return True
+
+
+def create_brin_index():
+    """ Create a BRIN index on `start`, unless it already exists. """
+    _check_unpartitioned()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {}"
+            " USING brin (start)".format(BRIN_INDEX, TABLE))
+
+
+def drop_brin_index():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS {}".format(BRIN_INDEX))
+
+
+def _check_unpartitioned():
+    # Indexes can't be built concurrently on a partitioned table.
+    if partition_scheme() is not None:
+        raise ValueError(
+            "{} is partitioned; index its partitions instead".format(TABLE))
@@ -0,0 +1,181 @@
+from collections import OrderedDict
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+
+from . import models
+
+
+class ForeignKeyCache(object):
+    """ Process-level, size-bounded LRU cache of objects by natural key, for
+    resolving the foreign keys named in sync payloads. Keys missing from the
+    cache are fetched with one query per call to `get_many`; keys with no
+    matching object are not cached.
+
+    The whole cache is cleared whenever an instance of its model, or of a
+    model it `depends_on`, is saved or deleted in this process (see
+    `invalidate`). Changes made by other processes aren't signalled, so the
+    cache is also cleared `ttl` seconds after it was first filled.
+
+    Parameters
+    ----------
+    queryset : django.db.models.QuerySet
+        Objects to resolve; if several objects share a key, the last one in
+        queryset order wins.
+    key : str or tuple of str
+        Lookup path (or paths) forming the natural key, e.g. `'project_id'`
+        or `('project__project_id', 'interpretation')`. Keys are scalars for
+        a single path and tuples otherwise.
+    maxsize : int
+        Maximum number of objects kept in memory.
+    ttl : float
+        Maximum number of seconds an object is kept; 0 disables caching.
+    depends_on : list of model classes, optional
+        Other models whose changes can affect keys or objects.
+    """
+
+    def __init__(self, queryset, key, maxsize, ttl, depends_on=()):
+        self.queryset = queryset
+        self.key = key
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.models = [queryset.model] + list(depends_on)
+        self._objects = OrderedDict()
+        self._expires = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _paths(self):
+        if isinstance(self.key, tuple):
+            return self.key
+        return (self.key,)
+
+    def _object_key(self, obj):
+        values = []
+        for path in self._paths:
+            value = obj
+            for attr in path.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+
+        if isinstance(self.key, tuple):
+            return tuple(values)
+        return values[0]
+
+    def get_many(self, keys):
+        """ Return a dict of key to object for each of `keys` which
+        matches an object.
+        """
+        found = {}
+        missing = set()
+        with self._lock:
+            if self._expires is not None and _now() >= self._expires:
+                self._clear()
+            generation = self._generation
+            for key in keys:
+                if key in self._objects:
+                    obj = self._objects.pop(key)
+                    self._objects[key] = obj
+                    found[key] = obj
+                else:
+                    missing.add(key)
+
+        if len(missing) == 0:
+            return found
+
+        fetched = self._fetch(missing)
+        found.update(fetched)
+
+        with self._lock:
+            # Don't cache objects fetched before an invalidation.
+            if generation == self._generation:
+                if self._expires is None:
+                    self._expires = _now() + self.ttl
+                self._objects.update(fetched)
+                while len(self._objects) > self.maxsize:
+                    self._objects.popitem(last=False)
+
+        return found
+
+    def _fetch(self, keys):
+        # Filter on each path separately, then keep exact matches.
+        if isinstance(self.key, tuple):
+            filters = {
+                '{}__in'.format(path): set(key[i] for key in keys)
+                for i, path in enumerate(self.key)
+            }
+        else:
+            filters = {'{}__in'.format(self.key): keys}
+
+        fetched = {}
+        for obj in self.queryset.filter(**filters):
+            key = self._object_key(obj)
+            if key in keys:
+                fetched[key] = obj
+        return fetched
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._objects.clear()
+        self._expires = None
+        self._generation += 1
+
+
+# time.monotonic is new in Python 3.3
+_now = getattr(time, 'monotonic', time.time)
+
+
+project_cache = ForeignKeyCache(
+    models.Project.objects.all().order_by('pk'),
+    'project_id',
+    settings.FOREIGN_KEY_CACHE_SIZE,
+    settings.FOREIGN_KEY_CACHE_TTL,
+)
+
+project_attribute_key_cache = ForeignKeyCache(
+    models.ProjectAttributeKey.objects.all().order_by('pk'),
+    'name',
+    settings.FOREIGN_KEY_CACHE_SIZE,
+    settings.FOREIGN_KEY_CACHE_TTL,
+)
+
+consumption_metadata_cache = ForeignKeyCache(
+    models.ConsumptionMetadata.objects.select_related('project')
+    .order_by('pk'),
+    ('project__project_id', 'interpretation'),
+    settings.FOREIGN_KEY_CACHE_SIZE,
+    settings.FOREIGN_KEY_CACHE_TTL,
+    depends_on=[models.Project],
+)
+
+_caches = [
+    project_cache,
+    project_attribute_key_cache,
+    consumption_metadata_cache,
+]
+
+
+def invalidate(model_class):
+    """ Clear every cache which depends on `model_class`. Called on save and
+    delete signals, and directly after writes which don't send signals, such
+    as `models.bulk_save`.
+    """
+    for cache in _caches:
+        if model_class in cache.models:
+            cache.clear()
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate(sender)
+
+
+for _model in [models.Project, models.ProjectAttributeKey,
+               models.ConsumptionMetadata]:
+    post_save.connect(_invalidate_on_change, sender=_model)
+    post_delete.connect(_invalidate_on_change, sender=_model)
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+import pytz
+
+from datastore.models import ConsumptionMetadata, ConsumptionRecord
+from datastore.services import bulk_sync
+from datastore.services.record_validation import validate_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures consumption record upsert throughput against the current '
+        'database (e.g. a copy of a production-sized table). Synthetic '
+        'records are written for an existing trace and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('metadata_id', type=int)
+        parser.add_argument('--n-records', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        metadata = ConsumptionMetadata.objects.get(pk=options["metadata_id"])
+        n_records = options["n_records"]
+
+        print("{} existing records".format(ConsumptionRecord.objects.count()))
+
+        # far enough in the future not to collide with real data
+        start = datetime(2100, 1, 1, tzinfo=pytz.UTC)
+        records = [
+            {
+                'start': (start + timedelta(minutes=15 * i)).isoformat(),
+                'value': float(i),
+                'estimated': False,
+                'metadata_id': metadata.pk,
+            }
+            for i in range(n_records)
+        ]
+        changed = [dict(record, value=-1.0) for record in records]
+        fields = ['start', 'value', 'estimated', 'metadata_id']
+        keys = ['start', 'metadata_id']
+
+        t0 = time.time()
+        _, errors = validate_records(records, fields, ConsumptionRecord)
+        print("validation: {} errors, {:.2f}s".format(
+            len(errors), time.time() - t0))
+
+        with transaction.atomic():
+            for label, payload, skip_unchanged in [
+                ('insert', records, True),
+                ('unchanged (skipped)', records, True),
+                ('unchanged (rewritten)', records, False),
+                ('update', changed, True),
+            ]:
+                t0 = time.time()
+                _, status = bulk_sync(payload, fields, ConsumptionRecord,
+                                      keys, skip_unchanged=skip_unchanged)
+                elapsed = time.time() - t0
+                print(
+                    "{}: status {}, {:.2f}s, {:.0f} records/s"
+                    .format(label, status, elapsed, n_records / elapsed)
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,65 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from datastore import models
+from datastore.services import diagnostic_export
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the diagnostic export and counts its queries against a '
+        'synthetic portfolio. Nothing is committed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n-projects', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        n_projects = options["n_projects"]
+
+        with transaction.atomic():
+            self._seed(n_projects)
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                export = diagnostic_export()
+                elapsed = time.time() - start
+
+            transaction.set_rollback(True)
+
+        print(
+            "diagnostic_export: {} rows, {} queries, {:.4f}s"
+            .format(len(export['rows']), len(queries), elapsed)
+        )
+
+    def _seed(self, n_projects):
+        user = User.objects.create_user('diagnostic_export_benchmark')
+
+        project_pks = models.reserve_pks(models.Project, n_projects)
+        models.Project.objects.bulk_create([
+            models.Project(
+                pk=pk,
+                project_owner=user.projectowner,
+                project_id="BENCHMARK_{}".format(pk),
+            )
+            for pk in project_pks
+        ])
+
+        models.ConsumptionMetadata.objects.bulk_create([
+            models.ConsumptionMetadata(
+                project_id=pk,
+                interpretation=interpretation,
+                unit=unit,
+            )
+            for pk in project_pks
+            for interpretation, unit in [('E_C_S', 'KWH'), ('NG_C_S', 'THM')]
+        ])
+
+        models.ProjectRun.objects.bulk_create([
+            models.ProjectRun(project_id=pk, status='SUCCESS')
+            for pk in project_pks
+        ])
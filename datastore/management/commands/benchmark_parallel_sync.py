@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from functools import partial
+import time
+
+from django.core.management.base import BaseCommand
+import pytz
+
+from datastore.models import ConsumptionMetadata, ConsumptionRecord
+from datastore.services import bulk_sync, parallel_sync
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures consumption record upsert throughput over 1 to 8 database '
+        'connections. Synthetic records are written for existing traces and '
+        'deleted after each run; chunks commit on their own connections, so '
+        'nothing is rolled back if the command is interrupted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('metadata_ids', type=int, nargs='+')
+        parser.add_argument('--n-records', type=int, default=100000,
+                            help='records per trace')
+        parser.add_argument('--connections', type=int, nargs='+',
+                            default=[1, 2, 4, 8])
+
+    def handle(self, *args, **options):
+        metadata_ids = list(ConsumptionMetadata.objects.filter(
+            pk__in=options["metadata_ids"]).values_list('pk', flat=True))
+        n_records = options["n_records"]
+
+        # far enough in the future not to collide with real data
+        start = datetime(2100, 1, 1, tzinfo=pytz.UTC)
+        records = [
+            {
+                'start': (start + timedelta(minutes=15 * i)).isoformat(),
+                'value': float(i),
+                'estimated': False,
+                'metadata_id': metadata_id,
+            }
+            for metadata_id in metadata_ids
+            for i in range(n_records)
+        ]
+        sync = partial(bulk_sync,
+                       fields=['start', 'value', 'estimated', 'metadata_id'],
+                       model_class=ConsumptionRecord,
+                       keys=['start', 'metadata_id'])
+        synthetic = ConsumptionRecord.objects.filter(
+            metadata_id__in=metadata_ids, start__gte=start)
+
+        print("{} records over {} traces".format(
+            len(records), len(metadata_ids)))
+
+        try:
+            for n_connections in options["connections"]:
+                t0 = time.time()
+                _, status = parallel_sync(records, sync,
+                                          n_connections=n_connections)
+                elapsed = time.time() - t0
+                print(
+                    "{} connections: status {}, {:.2f}s, {:.0f} records/s"
+                    .format(n_connections, status, elapsed,
+                            len(records) / elapsed)
+                )
+                synthetic.delete()
+        finally:
+            synthetic.delete()
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from datastore.models import Project, ProjectResultWriter
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares query counts and wall time of bulk and per-row meter '
+        'result writes for a project. Nothing is committed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_pk', type=int)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+
+        project = Project.objects.get(pk=options["project_pk"])
+
+        print("Running meter for {}".format(project))
+        meter = project._get_meter('EnergyEfficiencyMeter')
+        results = meter.evaluate(project.eemeter_project())
+
+        for bulk in [False, True]:
+            timings = []
+            for _ in range(options["repeat"]):
+                writer = ProjectResultWriter(project, results)
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.time()
+                        writer.save(bulk=bulk)
+                        timings.append(time.time() - start)
+                    transaction.set_rollback(True)
+
+            print(
+                "{}: {} queries, best of {}: {:.4f}s"
+                .format("bulk" if bulk else "per-row", len(queries),
+                        len(timings), min(timings))
+            )
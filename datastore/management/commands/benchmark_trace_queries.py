@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from datastore.models import ConsumptionMetadata, ConsumptionRecord
+
+
+class Command(BaseCommand):
+    help = (
+        'Explains and times the consumption record queries used to load a '
+        'trace, reporting whether they are answered by index-only scans '
+        '(see create_consumption_record_indexes --covering).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('metadata_id', type=int)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='VACUUM ANALYZE the table first, so that the visibility map '
+                 'allows index-only scans')
+
+    def handle(self, *args, **options):
+        metadata = ConsumptionMetadata.objects.get(pk=options["metadata_id"])
+
+        if options["vacuum"]:
+            table = ConsumptionRecord._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM ANALYZE {}".format(table))
+
+        records = metadata.records.order_by('start')
+        first = records.values_list('start', flat=True).first()
+        last = records.reverse().values_list('start', flat=True).first()
+        if first is None:
+            print("{} has no records".format(metadata))
+            return
+
+        queries = [
+            ("trace load",
+             records.values_list('start', 'value', 'estimated')),
+            ("time window",
+             records.filter(start__gte=first + (last - first) / 2)
+             .values_list('start', 'value', 'estimated')),
+        ]
+
+        for name, queryset in queries:
+            sql, params = queryset.query.sql_with_params()
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+                plan = [row[0] for row in cursor.fetchall()]
+
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = time.time()
+                    cursor.execute(sql, params)
+                    n = len(cursor.fetchall())
+                    timings.append(time.time() - start)
+
+            print(
+                "{}: {} rows, index-only scan: {}, best of {}: {:.4f}s"
+                .format(name, n,
+                        any("Index Only Scan" in line for line in plan),
+                        len(timings), min(timings))
+            )
+            for line in plan:
+                print("    " + line)
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from datastore.models import (
+    CHUNK_PERIODS,
+    ConsumptionMetadata,
+    ConsumptionRecord,
+    ConsumptionRecordChunk,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the stored size and load time of a trace as records and '
+        'as packed chunks, and checks that both load the same data. Nothing '
+        'is committed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('metadata_id', type=int)
+        parser.add_argument('--freq', type=int, default=900)
+        parser.add_argument('--period', choices=CHUNK_PERIODS,
+                            default='month')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        metadata = ConsumptionMetadata.objects.get(pk=options["metadata_id"])
+
+        with transaction.atomic():
+            records = self._measure(metadata, ConsumptionRecord, options)
+
+            metadata.compact_records(options["freq"], options["period"])
+            chunks = self._measure(metadata, ConsumptionRecordChunk, options)
+
+            transaction.set_rollback(True)
+
+        for name, (n_rows, size, elapsed, data) in [
+                ("records", records), ("chunks", chunks)]:
+            print(
+                "{}: {} rows, {} bytes, best of {}: {:.4f}s"
+                .format(name, n_rows, size, options["repeat"], elapsed)
+            )
+
+        print("same data: {}".format(records[3].equals(chunks[3])))
+        if chunks[1] and chunks[2]:
+            print(
+                "{:.1f}x smaller, {:.1f}x faster"
+                .format(records[1] / float(chunks[1]),
+                        records[2] / chunks[2])
+            )
+
+    def _measure(self, metadata, model_class, options):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pg_column_size(t.*)), 0)"
+                " FROM {} t WHERE metadata_id = %s"
+                .format(model_class._meta.db_table),
+                [metadata.pk])
+            n_rows, size = cursor.fetchone()
+
+        timings = []
+        for _ in range(options["repeat"]):
+            start = time.time()
+            data = metadata.records_dataframe()
+            timings.append(time.time() - start)
+
+        return n_rows, size, min(timings), data
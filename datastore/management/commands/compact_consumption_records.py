@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from datastore.models import CHUNK_PERIODS, ConsumptionMetadata
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves the records of fixed-frequency traces into packed '
+        'ConsumptionRecordChunks. Traces whose records are not aligned to '
+        'the frequency are left alone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('metadata_ids', type=int, nargs='*',
+                            help='traces to compact; all traces by default')
+        parser.add_argument('--freq', type=int, default=900,
+                            help='interval between readings, in seconds')
+        parser.add_argument('--period', choices=CHUNK_PERIODS,
+                            default='month', help='span of each chunk')
+
+    def handle(self, *args, **options):
+        metadatas = ConsumptionMetadata.objects.order_by('pk')
+        if options["metadata_ids"]:
+            metadatas = metadatas.filter(pk__in=options["metadata_ids"])
+
+        n_compacted = 0
+        for metadata in metadatas.iterator():
+            try:
+                metadata.compact_records(options["freq"], options["period"])
+            except ValueError as e:
+                print("Skipped {}: {}".format(metadata.pk, e))
+            else:
+                n_compacted += 1
+
+        print("Compacted {} traces".format(n_compacted))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from datastore import indexes
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds optional indexes on the consumption record table without '
+        'blocking writes: --covering rebuilds the (metadata_id, start) '
+        'unique constraint to include value and estimated (PostgreSQL 11), '
+        'and --brin adds a BRIN index on start.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--covering', action='store_true')
+        parser.add_argument('--brin', action='store_true')
+        parser.add_argument('--drop-brin', action='store_true')
+
+    def handle(self, *args, **options):
+        if not (options["covering"] or options["brin"] or
+                options["drop_brin"]):
+            raise CommandError("Pass --covering, --brin or --drop-brin")
+
+        try:
+            if options["covering"]:
+                if indexes.create_covering_index():
+                    print("Rebuilt the unique constraint as a covering index")
+                else:
+                    print("The unique constraint is already covering")
+            if options["brin"]:
+                indexes.create_brin_index()
+                print("Created {}".format(indexes.BRIN_INDEX))
+            if options["drop_brin"]:
+                indexes.drop_brin_index()
+                print("Dropped {}".format(indexes.BRIN_INDEX))
+        except ValueError as e:
+            raise CommandError(str(e))
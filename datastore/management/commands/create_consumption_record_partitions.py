@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from datastore import partitioning
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError("Expected a date as YYYY-MM-DD")
+    return datetime(parsed.year, parsed.month, parsed.day)
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates and attaches monthly or yearly partitions covering a date '
+        'range to a consumption record table partitioned by start, moving '
+        'matching records out of the default partition.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=_date)
+        parser.add_argument('end', type=_date)
+        parser.add_argument('--interval', choices=partitioning.INTERVALS,
+                            default='year')
+
+    def handle(self, *args, **options):
+        try:
+            created = partitioning.create_range_partitions(
+                options["start"], options["end"], options["interval"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for name in created:
+            print("Created {}".format(name))
+        print("{} partitions created".format(len(created)))
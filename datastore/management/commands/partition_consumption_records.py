@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from datastore import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Converts the consumption record table into a partitioned table, '
+        'hashed by metadata or ranged by start, copying existing records. '
+        'Requires PostgreSQL 11. The table is locked while records are '
+        'copied.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', choices=['metadata', 'start'],
+                            required=True)
+        parser.add_argument('--partitions', type=int, default=16,
+                            help='number of hash partitions')
+        parser.add_argument('--interval', choices=partitioning.INTERVALS,
+                            default='year',
+                            help='size of range partitions')
+
+    def handle(self, *args, **options):
+        try:
+            partitioning.partition_table(
+                options["by"],
+                partitions=options["partitions"],
+                interval=options["interval"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        print("{} is partitioned by {}".format(
+            partitioning.TABLE, partitioning.partition_scheme()))
@@ -1,12 +1,56 @@
 from django.core.management.base import BaseCommand
 from datastore.models import Project
+from datastore.services import (
+    iterate_project_pks, run_meters_parallel, run_project,
+)
+from datastore.weather import weather_source_cache
+
+
+def run_meter_for_projects(projects, workers=None, chunk_size=100):
+    """ Run the meter for each project in the queryset, serially or, if
+    `workers` is given, across a process pool. Either way a ProjectRun is
+    recorded for each project.
+    """
+
+    if workers is None:
+        n_projects = projects.count()
+        print("Running meter for {} projects".format(n_projects))
+        project_runs = (
+            run_project(project_pk) for project_pk
+            in iterate_project_pks(projects, chunk_size=chunk_size)
+        )
+    else:
+        project_pks = list(
+            projects.order_by('pk').values_list('pk', flat=True))
+        n_projects = len(project_pks)
+        print("Running meter for {} projects on {} workers"
+              .format(n_projects, workers))
+        project_runs = run_meters_parallel(project_pks, workers)
+
+    n_failed = 0
+    for i, project_run in enumerate(project_runs, start=1):
+        print("[{}/{}] {}".format(i, n_projects, project_run))
+        if project_run.status == 'FAILED':
+            n_failed += 1
+            print(project_run.traceback)
+
+    if workers is None:
+        print("Weather source cache: {}".format(weather_source_cache.stats()))
+    print("Finished: {} succeeded, {} failed."
+          .format(n_projects - n_failed, n_failed))
 
 
 class Command(BaseCommand):
     help = 'Runs the meter for all projects.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Run projects across a pool of N '
+                                 'processes.')
+
     def handle(self, *args, **options):
 
-        for project in Project.objects.all():
-            print("Running meter for {}".format(project))
-            project.run_meter()
+        run_meter_for_projects(Project.objects.all(),
+                               workers=options["workers"],
+                               chunk_size=options["chunk_size"])
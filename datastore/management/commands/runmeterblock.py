@@ -1,21 +1,25 @@
 from django.core.management.base import BaseCommand
 from datastore.models import ProjectBlock
 
+from .runmeter import run_meter_for_projects
+
 
 class Command(BaseCommand):
     help = 'Runs the meter for all projects in a particular block.'
 
     def add_arguments(self, parser):
         parser.add_argument('block_id', type=int)
+        parser.add_argument('--chunk-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Run projects across a pool of N '
+                                 'processes.')
 
     def handle(self, *args, **options):
 
         project_block = ProjectBlock.objects.get(id=options["block_id"])
 
-        projects = project_block.projects.all()
-
-        print("Running meter for {}".format(project_block, len(projects)))
+        print("Running meter for {}".format(project_block))
 
-        for project in projects:
-            print("Running meter for {}".format(project))
-            project.run_meter()
+        run_meter_for_projects(project_block.projects.all(),
+                               workers=options["workers"],
+                               chunk_size=options["chunk_size"])
@@ -1,15 +1,17 @@
 from django.core.management.base import BaseCommand
 from datastore.models import Project
 
+from .runmeter import run_meter_for_projects
+
 
 class Command(BaseCommand):
-    help = 'Runs the meter for all projects without.'
+    help = 'Runs the meter for all projects without project results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100)
 
     def handle(self, *args, **options):
 
-        for project in Project.objects.all():
-            if len(project.meterrun_set.all()) == 0:
-                print("Running meter for {}".format(project))
-                project.run_meter()
-            else:
-                print("Skipping meter for {}".format(project))
+        projects = Project.objects.filter(project_results__isnull=True)
+
+        run_meter_for_projects(projects, chunk_size=options["chunk_size"])
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastore', '0030_projectresult_project_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectBlockRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('meter_class', models.CharField(default='EnergyEfficiencyMeter', max_length=250, null=True)),
+                ('meter_settings', django.contrib.postgres.fields.jsonb.JSONField(null=True)),
+                ('added', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('project_block', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='datastore.ProjectBlock')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='projectrun',
+            name='project_block_run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='project_runs', to='datastore.ProjectBlockRun'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastore', '0031_projectblockrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='latest_project_result',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='datastore.ProjectResult'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE datastore_project
+            SET latest_project_result_id = latest.id
+            FROM (
+                SELECT project_id, MAX(id) AS id
+                FROM datastore_projectresult
+                GROUP BY project_id
+            ) AS latest
+            WHERE latest.project_id = datastore_project.id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
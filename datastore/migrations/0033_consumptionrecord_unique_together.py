@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import migrations
+
+# bulk_sync upserts with INSERT ... ON CONFLICT, new in PostgreSQL 9.5.
+MIN_PG_VERSION = 90500
+
+
+def check_pg_version(apps, schema_editor):
+    if schema_editor.connection.pg_version < MIN_PG_VERSION:
+        raise ImproperlyConfigured(
+            "PostgreSQL 9.5 or later is required, found {}"
+            .format(schema_editor.connection.pg_version))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastore', '0032_project_latest_project_result'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_pg_version, migrations.RunPython.noop),
+        # Keep the most recently inserted of any duplicate records
+        migrations.RunSQL(
+            """
+            DELETE FROM datastore_consumptionrecord AS a
+            USING datastore_consumptionrecord AS b
+            WHERE a.metadata_id = b.metadata_id
+              AND a.start = b.start
+              AND a.id < b.id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterUniqueTogether(
+            name='consumptionrecord',
+            unique_together=set([('metadata', 'start')]),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastore', '0033_consumptionrecord_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumptionmetadata',
+            name='has_record_chunks',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ConsumptionRecordChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('freq_seconds', models.IntegerField()),
+                ('values', models.BinaryField()),
+                ('estimated', models.BinaryField()),
+                ('present', models.BinaryField()),
+                ('added', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='record_chunks', to='datastore.ConsumptionMetadata')),
+            ],
+            options={
+                'ordering': ['start'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='consumptionrecordchunk',
+            unique_together=set([('metadata', 'start')]),
+        ),
+    ]
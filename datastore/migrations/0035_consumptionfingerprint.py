@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Deletes the fingerprints of the days written by a statement, read from its
+# transition tables. A trigger with transition tables handles one event, so
+# there is one per event, all calling this function.
+STATEMENT_FUNCTION = """
+CREATE FUNCTION datastore_consumptionrecord_invalidate_fingerprint()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM datastore_consumptionfingerprint AS f
+        USING (
+            SELECT DISTINCT metadata_id,
+                date_trunc('day', start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                AS day
+            FROM old_records
+        ) AS d
+        WHERE f.metadata_id = d.metadata_id AND f.start = d.day;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        DELETE FROM datastore_consumptionfingerprint AS f
+        USING (
+            SELECT DISTINCT metadata_id,
+                date_trunc('day', start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                AS day
+            FROM new_records
+        ) AS d
+        WHERE f.metadata_id = d.metadata_id AND f.start = d.day;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+STATEMENT_TRIGGERS = """
+CREATE TRIGGER datastore_consumptionrecord_fingerprint_insert
+AFTER INSERT ON datastore_consumptionrecord
+REFERENCING NEW TABLE AS new_records
+FOR EACH STATEMENT
+EXECUTE PROCEDURE datastore_consumptionrecord_invalidate_fingerprint();
+
+CREATE TRIGGER datastore_consumptionrecord_fingerprint_update
+AFTER UPDATE ON datastore_consumptionrecord
+REFERENCING OLD TABLE AS old_records NEW TABLE AS new_records
+FOR EACH STATEMENT
+EXECUTE PROCEDURE datastore_consumptionrecord_invalidate_fingerprint();
+
+CREATE TRIGGER datastore_consumptionrecord_fingerprint_delete
+AFTER DELETE ON datastore_consumptionrecord
+REFERENCING OLD TABLE AS old_records
+FOR EACH STATEMENT
+EXECUTE PROCEDURE datastore_consumptionrecord_invalidate_fingerprint();
+"""
+
+# Transition tables are new in PostgreSQL 10; older servers get a row
+# trigger, at the cost of a DELETE per record written.
+ROW_FUNCTION = """
+CREATE FUNCTION datastore_consumptionrecord_invalidate_fingerprint()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM datastore_consumptionfingerprint
+        WHERE metadata_id = OLD.metadata_id
+          AND start = date_trunc('day', OLD.start AT TIME ZONE 'UTC')
+                      AT TIME ZONE 'UTC';
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        DELETE FROM datastore_consumptionfingerprint
+        WHERE metadata_id = NEW.metadata_id
+          AND start = date_trunc('day', NEW.start AT TIME ZONE 'UTC')
+                      AT TIME ZONE 'UTC';
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+ROW_TRIGGER = """
+CREATE TRIGGER datastore_consumptionrecord_fingerprint
+AFTER INSERT OR UPDATE OR DELETE ON datastore_consumptionrecord
+FOR EACH ROW
+EXECUTE PROCEDURE datastore_consumptionrecord_invalidate_fingerprint();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.pg_version >= 100000:
+        schema_editor.execute(STATEMENT_FUNCTION)
+        schema_editor.execute(STATEMENT_TRIGGERS)
+    else:
+        schema_editor.execute(ROW_FUNCTION)
+        schema_editor.execute(ROW_TRIGGER)
+
+
+def drop_trigger(apps, schema_editor):
+    schema_editor.execute(
+        "DROP FUNCTION datastore_consumptionrecord_invalidate_fingerprint()"
+        " CASCADE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datastore', '0034_consumptionrecordchunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionFingerprint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('digest', models.CharField(max_length=40)),
+                ('metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='datastore.ConsumptionMetadata')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='consumptionfingerprint',
+            unique_together=set([('metadata', 'start')]),
+        ),
+        # Any write to a day's records, by whatever means, invalidates the
+        # fingerprint of that day.
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
@@ -1,8 +1,8 @@
-from django.db import models
+from django.db import models, connection, transaction
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import JSONField
 from django.utils.encoding import python_2_unicode_compatible
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from eemeter.structures import (
@@ -12,12 +12,17 @@ from eemeter.structures import (
     ZIPCodeSite,
     Project as EEMeterProject,
 )
-from eemeter.io.serializers import ArbitraryStartSerializer
 from eemeter.ee.meter import EnergyEfficiencyMeter
 from eemeter import get_version
 
+from .weather import weather_source_cache
+
 from warnings import warn
 import numpy as np
+import pandas as pd
+from pandas.tseries import offsets
+from pandas.tseries.frequencies import to_offset
+import pytz
 
 METER_CLASS_CHOICES = {
     'EnergyEfficiencyMeter': EnergyEfficiencyMeter,
@@ -48,6 +53,276 @@ PROJECT_ATTRIBUTE_DATA_TYPE_CHOICES = [
 ]
 
 
+def records_dataframe(rows):
+    """ Build a trace DataFrame from `(start, value, estimated)` tuples, as
+    returned by `values_list('start', 'value', 'estimated')`.
+    """
+    rows = list(rows)
+    if len(rows) == 0:
+        starts, values, estimateds = [], [], []
+    else:
+        starts, values, estimateds = zip(*rows)
+
+    index = pd.DatetimeIndex(starts)
+    if index.tz is None:
+        index = index.tz_localize(pytz.UTC)
+    else:
+        index = index.tz_convert(pytz.UTC)
+
+    return pd.DataFrame({
+        'value': np.array(values, dtype=float),
+        'estimated': np.array(estimateds, dtype=bool),
+    }, index=index, columns=['value', 'estimated'])
+
+
+CHUNK_PERIODS = ['day', 'month']
+
+# Rows deleted per query when compacting a trace
+COMPACT_DELETE_BATCH_SIZE = 10000
+
+# Chunks fetched per query when reading a limited number of chunked records
+CHUNK_READ_BATCH_SIZE = 4
+
+RESAMPLE_AGGREGATIONS = ['sum', 'mean', 'min', 'max', 'count']
+
+# Offsets which pandas anchors to the end of each interval, e.g. 'M' (month
+# end), and so bins as intervals closed and labelled on the right.
+END_ANCHORED_OFFSETS = tuple(
+    getattr(offsets, name) for name in [
+        'MonthEnd', 'BMonthEnd', 'SemiMonthEnd', 'QuarterEnd', 'BQuarterEnd',
+        'YearEnd', 'BYearEnd', 'Week',
+    ]
+    if hasattr(offsets, name)
+)
+
+
+def is_start_anchored(freq):
+    """ Whether intervals of `freq`, an offset or alias, are labelled by
+    their start, as `ConsumptionMetadata.resample_records` requires.
+    """
+    offset = to_offset(freq)
+    if isinstance(offset, offsets.Week):
+        # weekly offsets are end-anchored once they are tied to a weekday
+        return offset.weekday is None
+    return not isinstance(offset, END_ANCHORED_OFFSETS)
+
+
+def encode_record_chunks(data, freq_seconds, period='month'):
+    """ Pack a trace DataFrame, as returned by `records_dataframe`, into one
+    chunk per UTC day or month of readings at a fixed frequency.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        Frame with columns `value` and `estimated`, indexed by UTC start.
+    freq_seconds : int
+        Interval between readings; must evenly divide each day or month,
+        and every record must start on a multiple of it within its chunk.
+    period : {'day', 'month'}
+        Span of each chunk.
+
+    Returns
+    -------
+    chunks : list of dict
+        Field values for `ConsumptionRecordChunk`: `start`, `end`,
+        `freq_seconds` and packed `values` (little-endian float64, NaN where
+        missing), `estimated` and `present` (bitmasks).
+    """
+    if period not in CHUNK_PERIODS:
+        raise ValueError("Unknown chunk period: {}".format(period))
+    if len(data) == 0:
+        return []
+
+    freq_ns = int(freq_seconds) * 10 ** 9
+    index = data.index.tz_convert(pytz.UTC).tz_localize(None)
+    if period == 'day':
+        buckets = index.floor('D')
+        step = pd.DateOffset(days=1)
+    else:
+        buckets = index.to_period('M').to_timestamp()
+        step = pd.DateOffset(months=1)
+
+    chunks = []
+    for lower, group in data.groupby(buckets):
+        upper = lower + step
+        length, remainder = divmod(upper.value - lower.value, freq_ns)
+        if remainder != 0:
+            raise ValueError(
+                "A frequency of {}s doesn't divide a {}"
+                .format(freq_seconds, period))
+
+        deltas = group.index.asi8 - lower.value
+        offsets = deltas // freq_ns
+        if (deltas % freq_ns).any():
+            raise ValueError(
+                "Records are not aligned to a frequency of {}s"
+                .format(freq_seconds))
+
+        values = np.full(length, np.nan, dtype='<f8')
+        values[offsets] = group.value.values
+        estimated = np.zeros(length, dtype=bool)
+        estimated[offsets] = group.estimated.values
+        present = np.zeros(length, dtype=bool)
+        present[offsets] = True
+
+        chunks.append({
+            'start': lower.tz_localize(pytz.UTC).to_pydatetime(),
+            'end': upper.tz_localize(pytz.UTC).to_pydatetime(),
+            'freq_seconds': int(freq_seconds),
+            'values': values.tobytes(),
+            'estimated': np.packbits(estimated).tobytes(),
+            'present': np.packbits(present).tobytes(),
+        })
+    return chunks
+
+
+def decode_record_chunks(rows):
+    """ Build a trace DataFrame, as `records_dataframe` would, from
+    `(start, end, freq_seconds, values, estimated, present)` tuples of
+    ConsumptionRecordChunk fields.
+    """
+    starts, values, estimateds = [], [], []
+    for start, end, freq_seconds, chunk_values, estimated, present in rows:
+        freq_ns = freq_seconds * 10 ** 9
+        start_ns = pd.Timestamp(start).value
+        length = (pd.Timestamp(end).value - start_ns) // freq_ns
+
+        present = np.unpackbits(
+            np.frombuffer(bytes(present), dtype=np.uint8))[:length]\
+            .astype(bool)
+        estimated = np.unpackbits(
+            np.frombuffer(bytes(estimated), dtype=np.uint8))[:length]\
+            .astype(bool)
+        chunk_values = np.frombuffer(bytes(chunk_values), dtype='<f8',
+                                     count=length)
+
+        offsets = np.arange(length, dtype=np.int64)[present]
+        starts.append(start_ns + offsets * freq_ns)
+        values.append(chunk_values[present])
+        estimateds.append(estimated[present])
+
+    if len(starts) == 0:
+        return records_dataframe([])
+
+    index = pd.DatetimeIndex(np.concatenate(starts)).tz_localize(pytz.UTC)
+    return pd.DataFrame({
+        'value': np.concatenate(values).astype(float),
+        'estimated': np.concatenate(estimateds),
+    }, index=index, columns=['value', 'estimated'])
+
+
+def _in_window(data, start=None, end=None):
+    """ Rows of a trace DataFrame with `start <= index < end`. """
+    keep = np.ones(len(data), dtype=bool)
+    if start is not None:
+        keep &= data.index >= start
+    if end is not None:
+        keep &= data.index < end
+    return data[keep]
+
+
+def chunk_records(metadata, data):
+    """ Unsaved ConsumptionRecords of `metadata`, with no id, from a trace
+    DataFrame such as that of `ConsumptionMetadata.chunks_dataframe`.
+    """
+    return [
+        ConsumptionRecord(
+            metadata=metadata,
+            start=start.to_pydatetime(),
+            value=None if np.isnan(value) else float(value),
+            estimated=bool(estimated),
+        )
+        for start, value, estimated
+        in zip(data.index, data.value.values, data.estimated.values)
+    ]
+
+
+def reserve_pks(model_class, n):
+    """ Reserve `n` primary keys from the sequence of `model_class`'s table.
+
+    Django's `bulk_create` does not set primary keys on the objects it
+    inserts, so objects which must be referenced after a bulk insert are
+    given reserved keys beforehand.
+    """
+    table = model_class._meta.db_table
+    column = model_class._meta.pk.column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s))"
+            " FROM generate_series(1, %s)",
+            [table, column, n]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_save(model_class, objs):
+    """ Save new and existing `objs` in a single
+    `INSERT ... ON CONFLICT ... DO UPDATE`.
+
+    Rows conflict on the model's natural key: its first `unique_together`,
+    or else its first unique field, if it has one; otherwise on the primary
+    key. Unlike the primary key of a partitioned consumption record table
+    (see `datastore.partitioning`), a natural key is always backed by a
+    unique index, and a new object whose row was inserted concurrently
+    updates that row instead of failing. Objects are given the primary keys
+    of the rows they were saved to.
+
+    New objects (`obj._state.adding`) must already have a primary key, e.g.
+    from `reserve_pks`. Field values are prepared as in `Model.save`,
+    including `auto_now` and `auto_now_add`, but no signals are sent.
+    """
+    if len(objs) == 0:
+        return
+
+    opts = model_class._meta
+    fields = opts.local_concrete_fields
+    quote_name = connection.ops.quote_name
+
+    params = []
+    for obj in objs:
+        params.extend([
+            field.get_db_prep_save(field.pre_save(obj, obj._state.adding),
+                                   connection)
+            for field in fields
+        ])
+
+    row = "({})".format(", ".join(["%s"] * len(fields)))
+    sql = (
+        "INSERT INTO {table} ({columns}) VALUES {rows}"
+        " ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+        " RETURNING {pk}"
+    ).format(
+        table=quote_name(opts.db_table),
+        columns=", ".join(quote_name(field.column) for field in fields),
+        rows=", ".join([row] * len(objs)),
+        conflict=", ".join(
+            quote_name(field.column) for field in _conflict_fields(opts)),
+        updates=", ".join(
+            "{0} = EXCLUDED.{0}".format(quote_name(field.column))
+            for field in fields if not field.primary_key
+        ),
+        pk=quote_name(opts.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # rows are returned in the order of VALUES, as bulk_create assumes
+        pks = [row[0] for row in cursor.fetchall()]
+
+    for obj, pk in zip(objs, pks):
+        obj.pk = pk
+        obj._state.adding = False
+        obj._state.db = connection.alias
+
+
+def _conflict_fields(opts):
+    if len(opts.unique_together) > 0:
+        return [opts.get_field(name) for name in opts.unique_together[0]]
+    for field in opts.local_concrete_fields:
+        if field.unique and not field.primary_key:
+            return [field]
+    return [opts.pk]
+
+
 def _json_clean(value):
     if value is None or np.isnan(value) or np.isinf(value):
         return None
@@ -74,12 +349,33 @@ class Project(models.Model):
     reporting_period_start = models.DateTimeField(blank=True, null=True)
     reporting_period_end = models.DateTimeField(blank=True, null=True)
     zipcode = models.CharField(max_length=10, blank=True, null=True)
+    # Kept current on ProjectResult save and deletion, and by
+    # ProjectResultWriter, which may bulk create results.
+    latest_project_result = models.ForeignKey(
+        'ProjectResult', blank=True, null=True, related_name='+',
+        on_delete=models.SET_NULL)
     added = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return u'Project {}'.format(self.project_id)
 
+    def set_latest_project_result(self, project_result):
+        """ Point latest_project_result at `project_result` unless a newer
+        result is already recorded.
+        """
+        Project.objects\
+            .filter(pk=self.pk)\
+            .filter(models.Q(latest_project_result__isnull=True) |
+                    models.Q(latest_project_result__lt=project_result.pk))\
+            .update(latest_project_result=project_result)
+
+    def refresh_latest_project_result(self):
+        latest_pk = self.project_results.aggregate(
+            latest=models.Max('pk'))['latest']
+        Project.objects.filter(pk=self.pk)\
+            .update(latest_project_result=latest_pk)
+
     def eemeter_project(self):
         cm_set = self.consumptionmetadata_set.all()
         consumption = [cm.eemeter_consumption_data() for cm in cm_set]
@@ -110,6 +406,10 @@ class Project(models.Model):
             One of the keys in METER_CLASS_CHOICES
         meter_settings : dict
             Dictionary of extra settings to send to the meter.
+        weather_source, weather_normal_source : eemeter weather sources
+            If not given (and no meter_settings are given), these are taken
+            from the process-level weather source cache for the project's
+            zipcode.
 
         Returns
         -------
@@ -126,152 +426,22 @@ class Project(models.Model):
             warn(message)
             return None
 
+        if self.zipcode and not meter_settings:
+            if weather_source is None:
+                weather_source = \
+                    weather_source_cache.weather_source(self.zipcode)
+            if weather_normal_source is None:
+                weather_normal_source = \
+                    weather_source_cache.weather_normal_source(self.zipcode)
+
         meter = self._get_meter(meter_class, settings=meter_settings)
         results = meter.evaluate(project, weather_source=weather_source,
                                  weather_normal_source=weather_normal_source)
 
-        weather_source = results['weather_source']
-        if weather_source is not None:
-            weather_source_station = weather_source.station
-        else:
-            weather_source_station = None
-
-        weather_normal_source = \
-            results['weather_normal_source']
-        if weather_normal_source is not None:
-            weather_normal_source_station = weather_normal_source.station
-        else:
-            weather_normal_source_station = None
-
-        project_result = ProjectResult.objects.create(
-            project=self,
-            project_run=project_run,
-            eemeter_version=get_version(),
-            meter_class=meter_class,
-            meter_settings=meter_settings,
-            weather_source_station=weather_source_station,
-            weather_normal_source_station=weather_normal_source_station,
-        )
-
-        modeling_period_mapping = {}
-
-        for modeling_period_label, modeling_period in \
-                results['modeling_period_set'].iter_modeling_periods():
-            mp = ModelingPeriod.objects.create(
-                project_result=project_result,
-                interpretation=modeling_period.interpretation,
-                start_date=modeling_period.start_date,
-                end_date=modeling_period.end_date,
-            )
-            modeling_period_mapping[modeling_period_label] = mp
-
-        modeling_period_group_mapping = {}
-        for (baseline_label, reporting_label), _ in \
-                results['modeling_period_set'].iter_modeling_period_groups():
-            mp_baseline = modeling_period_mapping[baseline_label]
-            mp_reporting = modeling_period_mapping[reporting_label]
-            mpg = ModelingPeriodGroup.objects.create(
-                project_result=project_result,
-                baseline_period=mp_baseline,
-                reporting_period=mp_reporting,
-            )
-            modeling_period_group_mapping[
-                (baseline_label, reporting_label)] = mpg
-
-        # one result per trace per model
-        energy_trace_model_result_mapping = {}
-        for trace_label, modeled_energy_trace in \
-                results['modeled_energy_traces'].items():
-            for model_label, outputs in \
-                    modeled_energy_trace.fit_outputs.items():
-
-                etm = EnergyTraceModelResult.objects.create(
-                    project_result=project_result,
-                    energy_trace_id=trace_label,
-                    modeling_period=modeling_period_mapping[model_label],
-                    model_serializiation=None,
-                    status=outputs['status'],
-                    r2=outputs.get('r2'),
-                    rmse=outputs.get('rmse'),
-                    cvrmse=outputs.get('cvrmse'),
-                    upper=outputs.get('upper'),
-                    lower=outputs.get('lower'),
-                    n=outputs.get('n'),
-                )
-                energy_trace_model_result_mapping[
-                    (trace_label, model_label)] = etm
-
-        aggregation_interpretations = [
-            'annualized_weather_normal',
-            'gross_predicted',
-        ]
-
-        for trace_label, modeling_period_group_derivatives in \
-                results['modeled_energy_trace_derivatives'].items():
-
-            # get all modeling period derivatives
-            modeling_period_derivatives = {}
-            for (baseline_label, reporting_label), derivatives in \
-                    modeling_period_group_derivatives.items():
-                modeling_period_derivatives[baseline_label] = \
-                    derivatives['BASELINE']
-                modeling_period_derivatives[reporting_label] = \
-                    derivatives['REPORTING']
-
-            for modeling_period_label, derivatives in \
-                    modeling_period_derivatives.items():
-
-                for interpretation in aggregation_interpretations:
-
-                    derivative = derivatives.get(interpretation, None)
-
-                    energy_trace_model_res = \
-                        energy_trace_model_result_mapping[
-                            (trace_label, modeling_period_label)]
-
-                    if derivative is not None:
-                        Derivative.objects.create(
-                            energy_trace_model_result=energy_trace_model_res,
-                            interpretation=interpretation,
-                            value=derivative[0],
-                            upper=derivative[1],
-                            lower=derivative[2],
-                            n=derivative[3],
-                        )
-
-        # one result per aggregation - baseline + reporting?
-        for group_label, group_derivatives in \
-                results['project_derivatives'].items():
-            for name, named_results in group_derivatives.items():
-                if named_results is None:
-                    continue
-
-                for interpretation in aggregation_interpretations:
-
-                    baseline_output = \
-                        named_results['BASELINE'][interpretation]
-                    reporting_output = \
-                        named_results['REPORTING'][interpretation]
-
-                    modeling_period_group = \
-                        modeling_period_group_mapping[group_label]
-
-                    DerivativeAggregation.objects.create(
-                        project_result=project_result,
-                        modeling_period_group=modeling_period_group,
-                        trace_interpretation=name,
-                        interpretation=interpretation,
-                        baseline_value=baseline_output[0],
-                        baseline_upper=baseline_output[1],
-                        baseline_lower=baseline_output[2],
-                        baseline_n=baseline_output[3],
-                        reporting_value=reporting_output[0],
-                        reporting_upper=reporting_output[1],
-                        reporting_lower=reporting_output[2],
-                        reporting_n=reporting_output[3],
-                    )
-
-        return project_result
+        writer = ProjectResultWriter(self, results, meter_class=meter_class,
+                                     meter_settings=meter_settings,
+                                     project_run=project_run)
+        return writer.save()
 
     def _get_meter(self, meter_class, settings=None):
         MeterClass = METER_CLASS_CHOICES.get(meter_class, None)
@@ -302,6 +472,9 @@ class ProjectRun(models.Model):
         ('commercial', 'Commercial'),
     )
     project = models.ForeignKey(Project)
+    project_block_run = models.ForeignKey('ProjectBlockRun', blank=True,
+                                          null=True,
+                                          related_name='project_runs')
     status = models.CharField(max_length=250, choices=STATUS_CHOICES,
                               default="PENDING")
     meter_class = models.CharField(max_length=250, null=True,
@@ -380,6 +553,33 @@ class ProjectBlock(models.Model):
         )
 
 
+@python_2_unicode_compatible
+class ProjectBlockRun(models.Model):
+    """ Encapsulates the request to run the meters of every Project in a
+       ProjectBlock. Each Project gets its own ProjectRun.
+    """
+    project_block = models.ForeignKey(ProjectBlock)
+    meter_class = models.CharField(max_length=250, null=True,
+                                   default="EnergyEfficiencyMeter")
+    meter_settings = JSONField(null=True)
+    added = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def status_counts(self):
+        counts = {status: 0 for status, _ in ProjectRun.STATUS_CHOICES}
+        status_rows = self.project_runs.order_by().values('status')\
+            .annotate(n=models.Count('id'))
+        for row in status_rows:
+            counts[row['status']] = row['n']
+        return counts
+
+    def __str__(self):
+        return (
+            u'ProjectBlockRun(project_block={}, meter_class={})'
+            .format(self.project_block.name, self.meter_class)
+        )
+
+
 @python_2_unicode_compatible
 class ConsumptionMetadata(models.Model):
     interpretation = models.CharField(max_length=16,
@@ -387,18 +587,207 @@ class ConsumptionMetadata(models.Model):
     unit = models.CharField(max_length=3, choices=UNIT_CHOICES)
     project = models.ForeignKey(Project, blank=True, null=True)
     label = models.CharField(max_length=140, blank=True, null=True)
+    # Some of the trace is stored as ConsumptionRecordChunks
+    has_record_chunks = models.BooleanField(default=False)
     added = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     def eemeter_consumption_data(self):
-        records = [r.eemeter_record() for r in self.records.all()]
         interpretation = dict(INTERPRETATION_CHOICES)[self.interpretation]
         unit_name = dict(UNIT_CHOICES)[self.unit]
-        return EnergyTrace(interpretation, records=records, unit=unit_name,
-                           serializer=ArbitraryStartSerializer())
+
+        # As with ArbitraryStartSerializer, the last record only marks the
+        # end of the trace: its value and estimated flag are not used.
+        data = self.records_dataframe()
+        if len(data) > 0:
+            data.loc[data.index[-1], 'value'] = np.nan
+            data.loc[data.index[-1], 'estimated'] = False
+
+        return EnergyTrace(interpretation, data=data, unit=unit_name)
+
+    def records_dataframe(self, start=None, end=None):
+        """ Load the trace's time series without instantiating any
+        ConsumptionRecord objects.
+
+        Parameters
+        ----------
+        start, end : datetime, optional
+            Only load records with `start <= record.start < end`. Bounding
+            the window also lets PostgreSQL skip partitions when the record
+            table is partitioned by start (see `datastore.partitioning`).
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            Frame with columns `value` (float, NaN for missing values) and
+            `estimated` (bool), indexed by the UTC `start` of each record.
+            Records stored as rows take precedence over chunked records with
+            the same start.
+        """
+        records = self.records.all()
+        if start is not None:
+            records = records.filter(start__gte=start)
+        if end is not None:
+            records = records.filter(start__lt=end)
+        rows = records.order_by('start')\
+            .values_list('start', 'value', 'estimated')
+        return self._with_chunks(records_dataframe(rows), start, end)
+
+    def chunks_dataframe(self, start=None, end=None, limit=None):
+        """ Load the records stored in ConsumptionRecordChunks, as for
+        `records_dataframe`, including those overridden by rows.
+
+        If `limit` is given, only the first `limit` records are returned,
+        and chunks are only fetched and decoded until they are found.
+        """
+        if not self.has_record_chunks:
+            return records_dataframe([])
+
+        chunks = self.record_chunks.all()
+        if start is not None:
+            chunks = chunks.filter(end__gt=start)
+        if end is not None:
+            chunks = chunks.filter(start__lt=end)
+        chunks = chunks.order_by('start').values_list(
+            'start', 'end', 'freq_seconds', 'values', 'estimated', 'present')
+
+        if limit is None:
+            return _in_window(decode_record_chunks(chunks), start, end)
+
+        frames = []
+        n_records = 0
+        last_start = None
+        while n_records < limit:
+            if last_start is not None:
+                chunks = chunks.filter(start__gt=last_start)
+            rows = list(chunks[:CHUNK_READ_BATCH_SIZE])
+            if len(rows) == 0:
+                break
+            last_start = rows[-1][0]
+
+            data = _in_window(decode_record_chunks(rows), start, end)
+            frames.append(data)
+            n_records += len(data)
+
+        if len(frames) == 0:
+            return records_dataframe([])
+        return pd.concat(frames)[:limit]
+
+    def _with_chunks(self, data, start=None, end=None):
+        """ `data`, loaded from rows, merged with the chunked records which
+        it doesn't override.
+        """
+        if not self.has_record_chunks:
+            return data
+        chunk_data = self.chunks_dataframe(start, end)
+        keep = ~chunk_data.index.isin(data.index)
+        return pd.concat([chunk_data[keep], data]).sort_index()
+
+    def all_records(self):
+        """ Every record of the trace in start order, as ConsumptionRecords.
+        Chunked records are unsaved ConsumptionRecords, with no id.
+        """
+        records = sorted(self.records.all(), key=lambda record: record.start)
+        if not self.has_record_chunks:
+            return records
+        stored = set(record.start for record in records)
+        chunked = chunk_records(self, self.chunks_dataframe())
+        return sorted(
+            records +
+            [record for record in chunked if record.start not in stored],
+            key=lambda record: record.start)
+
+    def compact_records(self, freq_seconds, period='month'):
+        """ Move the whole trace into ConsumptionRecordChunks, merging rows
+        into any existing chunks and deleting them. New records can still be
+        synced as rows, and are read together with the chunks.
+
+        The rows read are locked until they are deleted, so records synced
+        meanwhile wait for, and are then kept as rows after, compaction.
+
+        Raises ValueError, leaving the trace as it was, if the records are
+        not aligned to `freq_seconds` (see `encode_record_chunks`).
+        """
+        with transaction.atomic():
+            # One compaction of a trace at a time
+            ConsumptionMetadata.objects.select_for_update()\
+                .filter(pk=self.pk).values_list('pk').first()
+            self.refresh_from_db(fields=['has_record_chunks'])
+
+            rows = list(self.records.select_for_update().order_by('start')
+                        .values_list('pk', 'start', 'value', 'estimated'))
+            data = self._with_chunks(
+                records_dataframe([row[1:] for row in rows]))
+            chunks = encode_record_chunks(data, freq_seconds, period)
+
+            self.record_chunks.all().delete()
+            ConsumptionRecordChunk.objects.bulk_create([
+                ConsumptionRecordChunk(metadata=self, **chunk)
+                for chunk in chunks
+            ])
+            pks = [row[0] for row in rows]
+            for i in range(0, len(pks), COMPACT_DELETE_BATCH_SIZE):
+                self.records.filter(
+                    pk__in=pks[i:i + COMPACT_DELETE_BATCH_SIZE]).delete()
+            self.has_record_chunks = True
+            self.save(update_fields=['has_record_chunks', 'updated'])
+
+    def resample_records(self, freq, aggregation='sum', start=None,
+                         end=None, tz=pytz.UTC, max_intervals=None):
+        """ Aggregate the trace into intervals of `freq`.
+
+        Parameters
+        ----------
+        freq : str
+            pandas offset alias, e.g. `'H'`, `'D'` or `'MS'`. Intervals are
+            labelled by, and include, their start; offsets anchored to
+            interval ends, such as `'M'`, raise ValueError.
+        aggregation : {'sum', 'mean', 'min', 'max', 'count'}
+            Applied to the non-null values of each interval; `count` is the
+            number of them. Intervals with no values are NaN, except for
+            `count`, where they are 0.
+        start, end : datetime, optional
+            Window of records to aggregate, as for `records_dataframe`.
+        tz : pytz timezone
+            Time zone in which intervals such as days begin.
+        max_intervals : int, optional
+            Raise ValueError, rather than allocate them, if the records span
+            more than this many intervals of a fixed-length `freq`, e.g.
+            `'S'`. Other offsets are at least an hour long.
+
+        Returns
+        -------
+        series : pandas.Series
+            Aggregated values, indexed by interval start in `tz`.
+        """
+        if aggregation not in RESAMPLE_AGGREGATIONS:
+            raise ValueError("Unknown aggregation: {}".format(aggregation))
+        if not is_start_anchored(freq):
+            raise ValueError(
+                "Intervals of {} are labelled by their end".format(freq))
+
+        value = self.records_dataframe(start, end).value
+        value.index = value.index.tz_convert(tz)
+
+        offset = to_offset(freq)
+        if max_intervals is not None and len(value) > 0 and \
+                isinstance(offset, offsets.Tick):
+            n_intervals = \
+                (value.index[-1] - value.index[0]).value // offset.nanos + 1
+            if n_intervals > max_intervals:
+                raise ValueError(
+                    "{} intervals of {} is more than the limit of {}; use a "
+                    "longer frequency or a shorter window"
+                    .format(n_intervals, freq, max_intervals))
+
+        resampler = value.resample(freq, closed='left', label='left')
+        series = getattr(resampler, aggregation)()
+        if aggregation == 'sum':
+            series[resampler.count() == 0] = np.nan
+        return series
 
     def __str__(self):
-        n = len(self.records.all())
+        n = len(self.records_dataframe())
         return (
             u'ConsumptionMetadata(interpretation={}, unit={}, n={})'
             .format(self.interpretation, self.unit, n)
@@ -420,6 +809,7 @@ class ConsumptionRecord(models.Model):
 
     class Meta:
         ordering = ['start']
+        unique_together = ('metadata', 'start')
 
     def eemeter_record(self):
         return {
@@ -432,6 +822,68 @@ class ConsumptionRecord(models.Model):
         return _json_clean(self.value)
 
 
+@python_2_unicode_compatible
+class ConsumptionRecordChunk(models.Model):
+    """ Readings of a trace at a fixed frequency over one day or month,
+    packed into arrays (see `encode_record_chunks`) instead of stored one
+    ConsumptionRecord row per interval.
+    """
+    metadata = models.ForeignKey(ConsumptionMetadata,
+                                 related_name="record_chunks")
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    freq_seconds = models.IntegerField()
+    values = models.BinaryField()
+    estimated = models.BinaryField()
+    present = models.BinaryField()
+    added = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return (
+            u'ConsumptionRecordChunk(start={}, end={}, freq_seconds={})'
+            .format(self.start, self.end, self.freq_seconds)
+        )
+
+    class Meta:
+        ordering = ['start']
+        unique_together = ('metadata', 'start')
+
+    def dataframe(self):
+        return decode_record_chunks([(
+            self.start, self.end, self.freq_seconds, self.values,
+            self.estimated, self.present,
+        )])
+
+
+@python_2_unicode_compatible
+class ConsumptionFingerprint(models.Model):
+    """ Digest of a trace's readings over one UTC day, as stored, so that
+    uploads of unchanged days can be skipped (see
+    `services.sync_consumption_records`). A database trigger deletes it
+    whenever a record of that day is inserted, updated or deleted.
+    """
+    metadata = models.ForeignKey(ConsumptionMetadata,
+                                 related_name="fingerprints")
+    start = models.DateTimeField()
+    digest = models.CharField(max_length=40)
+
+    def __str__(self):
+        return (
+            u'ConsumptionFingerprint(start={}, digest={})'
+            .format(self.start, self.digest)
+        )
+
+    class Meta:
+        unique_together = ('metadata', 'start')
+
+    @staticmethod
+    def bucket(start):
+        """ Start of the UTC day containing `start`. """
+        start = start.astimezone(pytz.UTC)
+        return start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
 @python_2_unicode_compatible
 class ProjectResult(models.Model):
     project = models.ForeignKey(Project, related_name='project_results')
@@ -557,6 +1009,252 @@ class DerivativeAggregation(models.Model):
         )
 
 
+class ProjectResultWriter(object):
+    """ Collects the full result graph of a meter run in memory and writes it
+    in one transaction.
+
+    Primary keys are reserved from each table's sequence up front so that
+    child rows can point at their parents before anything is inserted. This
+    is necessary because `bulk_create` does not return primary keys.
+
+    Parameters
+    ----------
+    project : datastore.models.Project
+        Project the meter was run for.
+    results : dict
+        Output of `EnergyEfficiencyMeter.evaluate`.
+    """
+
+    AGGREGATION_INTERPRETATIONS = [
+        'annualized_weather_normal',
+        'gross_predicted',
+    ]
+
+    def __init__(self, project, results, meter_class='EnergyEfficiencyMeter',
+                 meter_settings=None, project_run=None):
+        self.project_result = self._build_project_result(
+            project, results, meter_class, meter_settings, project_run)
+
+        self.modeling_periods = {}
+        self.modeling_period_groups = {}
+        self.energy_trace_model_results = {}
+        self.derivatives = []
+        self.derivative_aggregations = []
+
+        self._build_modeling_periods(results)
+        self._build_modeling_period_groups(results)
+        self._build_energy_trace_model_results(results)
+        self._build_derivatives(results)
+        self._build_derivative_aggregations(results)
+
+    def stages(self):
+        """ Model classes and instances in insertion order, along with the
+        foreign keys which must be resolved before insertion.
+        """
+        return [
+            (ProjectResult, [self.project_result], []),
+            (ModelingPeriod, list(self.modeling_periods.values()),
+             ['project_result']),
+            (ModelingPeriodGroup, list(self.modeling_period_groups.values()),
+             ['project_result', 'baseline_period', 'reporting_period']),
+            (EnergyTraceModelResult,
+             list(self.energy_trace_model_results.values()),
+             ['project_result', 'modeling_period']),
+            (Derivative, self.derivatives, ['energy_trace_model_result']),
+            (DerivativeAggregation, self.derivative_aggregations,
+             ['project_result', 'modeling_period_group']),
+        ]
+
+    def save(self, bulk=True):
+        """ Write the result graph.
+
+        Parameters
+        ----------
+        bulk : bool, default True
+            If True, write each model with a single `bulk_create`. If False,
+            save each object individually (one INSERT per row); kept for
+            benchmarking against the bulk path.
+
+        Returns
+        -------
+        project_result : datastore.models.ProjectResult
+            Saved result object.
+        """
+        with transaction.atomic():
+            for model_class, objs, foreign_keys in self.stages():
+                if len(objs) == 0:
+                    continue
+
+                if bulk:
+                    pks = reserve_pks(model_class, len(objs))
+                    for obj, pk in zip(objs, pks):
+                        obj.pk = pk
+                        self._resolve_foreign_keys(obj, foreign_keys)
+                    model_class.objects.bulk_create(objs)
+                else:
+                    for obj in objs:
+                        self._resolve_foreign_keys(obj, foreign_keys)
+                        obj.save()
+
+            self.project_result.project.set_latest_project_result(
+                self.project_result)
+
+        return self.project_result
+
+    def _resolve_foreign_keys(self, obj, foreign_keys):
+        for name in foreign_keys:
+            field = obj._meta.get_field(name)
+            setattr(obj, field.attname, getattr(obj, name).pk)
+
+    def _build_project_result(self, project, results, meter_class,
+                              meter_settings, project_run):
+        weather_source = results['weather_source']
+        if weather_source is not None:
+            weather_source_station = weather_source.station
+        else:
+            weather_source_station = None
+
+        weather_normal_source = results['weather_normal_source']
+        if weather_normal_source is not None:
+            weather_normal_source_station = weather_normal_source.station
+        else:
+            weather_normal_source_station = None
+
+        return ProjectResult(
+            project=project,
+            project_run=project_run,
+            eemeter_version=get_version(),
+            meter_class=meter_class,
+            meter_settings=meter_settings,
+            weather_source_station=weather_source_station,
+            weather_normal_source_station=weather_normal_source_station,
+        )
+
+    def _build_modeling_periods(self, results):
+        for modeling_period_label, modeling_period in \
+                results['modeling_period_set'].iter_modeling_periods():
+            self.modeling_periods[modeling_period_label] = ModelingPeriod(
+                project_result=self.project_result,
+                interpretation=modeling_period.interpretation,
+                start_date=modeling_period.start_date,
+                end_date=modeling_period.end_date,
+            )
+
+    def _build_modeling_period_groups(self, results):
+        for (baseline_label, reporting_label), _ in \
+                results['modeling_period_set'].iter_modeling_period_groups():
+            self.modeling_period_groups[(baseline_label, reporting_label)] = \
+                ModelingPeriodGroup(
+                    project_result=self.project_result,
+                    baseline_period=self.modeling_periods[baseline_label],
+                    reporting_period=self.modeling_periods[reporting_label],
+                )
+
+    def _build_energy_trace_model_results(self, results):
+        # one result per trace per model
+        for trace_label, modeled_energy_trace in \
+                results['modeled_energy_traces'].items():
+            for model_label, outputs in \
+                    modeled_energy_trace.fit_outputs.items():
+                self.energy_trace_model_results[(trace_label, model_label)] = \
+                    EnergyTraceModelResult(
+                        project_result=self.project_result,
+                        energy_trace_id=trace_label,
+                        modeling_period=self.modeling_periods[model_label],
+                        model_serializiation=None,
+                        status=outputs['status'],
+                        r2=outputs.get('r2'),
+                        rmse=outputs.get('rmse'),
+                        cvrmse=outputs.get('cvrmse'),
+                        upper=outputs.get('upper'),
+                        lower=outputs.get('lower'),
+                        n=outputs.get('n'),
+                    )
+
+    def _build_derivatives(self, results):
+        for trace_label, modeling_period_group_derivatives in \
+                results['modeled_energy_trace_derivatives'].items():
+
+            # get all modeling period derivatives
+            modeling_period_derivatives = {}
+            for (baseline_label, reporting_label), derivatives in \
+                    modeling_period_group_derivatives.items():
+                modeling_period_derivatives[baseline_label] = \
+                    derivatives['BASELINE']
+                modeling_period_derivatives[reporting_label] = \
+                    derivatives['REPORTING']
+
+            for modeling_period_label, derivatives in \
+                    modeling_period_derivatives.items():
+
+                energy_trace_model_result = \
+                    self.energy_trace_model_results[
+                        (trace_label, modeling_period_label)]
+
+                for interpretation in self.AGGREGATION_INTERPRETATIONS:
+                    derivative = derivatives.get(interpretation, None)
+                    if derivative is None:
+                        continue
+
+                    self.derivatives.append(Derivative(
+                        energy_trace_model_result=energy_trace_model_result,
+                        interpretation=interpretation,
+                        value=derivative[0],
+                        upper=derivative[1],
+                        lower=derivative[2],
+                        n=derivative[3],
+                    ))
+
+    def _build_derivative_aggregations(self, results):
+        # one result per aggregation - baseline + reporting?
+        for group_label, group_derivatives in \
+                results['project_derivatives'].items():
+            for name, named_results in group_derivatives.items():
+                if named_results is None:
+                    continue
+
+                modeling_period_group = \
+                    self.modeling_period_groups[group_label]
+
+                for interpretation in self.AGGREGATION_INTERPRETATIONS:
+
+                    baseline_output = \
+                        named_results['BASELINE'][interpretation]
+                    reporting_output = \
+                        named_results['REPORTING'][interpretation]
+
+                    self.derivative_aggregations.append(DerivativeAggregation(
+                        project_result=self.project_result,
+                        modeling_period_group=modeling_period_group,
+                        trace_interpretation=name,
+                        interpretation=interpretation,
+                        baseline_value=baseline_output[0],
+                        baseline_upper=baseline_output[1],
+                        baseline_lower=baseline_output[2],
+                        baseline_n=baseline_output[3],
+                        reporting_value=reporting_output[0],
+                        reporting_upper=reporting_output[1],
+                        reporting_lower=reporting_output[2],
+                        reporting_n=reporting_output[3],
+                    ))
+
+
 @receiver(post_save, sender=User)
 def create_project_owner(sender, instance, **kwargs):
     project_owner, created = ProjectOwner.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=ProjectResult)
+def set_latest_project_result(sender, instance, created, **kwargs):
+    if created:
+        Project(pk=instance.project_id).set_latest_project_result(instance)
+
+
+@receiver(post_delete, sender=ProjectResult)
+def refresh_latest_project_result(sender, instance, **kwargs):
+    try:
+        project = Project.objects.get(pk=instance.project_id)
+    except Project.DoesNotExist:
+        return  # deleted along with its project
+    if project.latest_project_result_id is None:
+        project.refresh_latest_project_result()
@@ -0,0 +1,179 @@
+""" Keyset (cursor) pagination for list endpoints. """
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates a list by seeking past the last key of the previous page,
+    e.g. `WHERE (metadata_id, start) > (%s, %s) ORDER BY metadata_id, start
+    LIMIT n`, so every page is an index range scan no matter how deep it
+    is, and no `COUNT(*)` is run.
+
+    Lists are only paginated if the request passes `page_size` (up to
+    `API_MAX_PAGE_SIZE`) or `API_PAGE_SIZE` is set. Paginated responses look
+    like::
+
+        {
+            "next": "https://.../?cursor=WzQyXQ%3D%3D&page_size=1000",
+            "results": [...]
+        }
+
+    where `next` is null on the last page.
+
+    Views order pages by `pk` unless they set `keyset_ordering` to a tuple
+    of fields covered by a unique index, ascending.
+
+    Views may also serve objects which aren't rows of the queryset by
+    defining `get_extra_objects(after, limit)`, returning up to `limit`
+    such objects whose keys sort after `after` (None on the first page), in
+    key order. They are merged into pages; objects of the queryset take
+    precedence over extra objects with the same key.
+
+    Views which must never send an unpaginated list, such as binary lists,
+    pass `max_page_size` to `paginate_queryset`: their lists are always
+    paginated, by default with pages of that size, and link to the next
+    page in a `Link` header (see `get_link_header`).
+    """
+
+    ordering = ('pk',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None,
+                          max_page_size=None):
+        self.page_size = self.get_page_size(request, max_page_size)
+        if self.page_size is None:
+            return None
+
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+        fields = [_get_field(queryset.model, name) for name in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        key = None
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            key = self.decode_cursor(encoded, fields)
+            queryset = _seek(queryset, fields, key)
+
+        results = list(queryset[:self.page_size + 1])
+        if hasattr(view, 'get_extra_objects'):
+            results = merge_objects(
+                results, view.get_extra_objects(key, self.page_size + 1),
+                lambda obj: _object_key(obj, fields), self.page_size + 1)
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_cursor = self.encode_cursor(results[-1], fields)
+        else:
+            self.next_cursor = None
+
+        self.request = request
+        return results
+
+    def get_page_size(self, request, max_page_size=None):
+        if max_page_size is None:
+            default = settings.API_PAGE_SIZE
+            max_page_size = settings.API_MAX_PAGE_SIZE
+        else:
+            max_page_size = min(max_page_size, settings.API_MAX_PAGE_SIZE)
+            default = max_page_size
+
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size is None:
+            return default
+        try:
+            page_size = int(page_size)
+        except ValueError:
+            return default
+        if page_size <= 0:
+            return default
+        return min(page_size, max_page_size)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param,
+                                  self.page_size)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.next_cursor)
+
+    def get_link_header(self):
+        """ `Link` header value pointing to the next page, if any. """
+        url = self.get_next_link()
+        if url is None:
+            return None
+        return '<{}>; rel="next"'.format(url)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def encode_cursor(self, obj, fields):
+        key = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in _object_key(obj, fields)
+        ]
+        return urlsafe_b64encode(json.dumps(key).encode('ascii')) \
+            .decode('ascii')
+
+    def decode_cursor(self, encoded, fields):
+        try:
+            key = json.loads(
+                urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            if not isinstance(key, list) or len(key) != len(fields):
+                raise ValueError
+            return [
+                field.to_python(value) for field, value in zip(fields, key)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound("Invalid cursor")
+
+
+def merge_objects(objects, extra, key, limit=None):
+    """ Merge two lists of objects sorted by `key`, dropping extra objects
+    with the same key as one of `objects`, and keep the first `limit`.
+    """
+    keys = set(key(obj) for obj in objects)
+    merged = sorted(
+        objects + [obj for obj in extra if key(obj) not in keys], key=key)
+    if limit is not None:
+        merged = merged[:limit]
+    return merged
+
+
+def _object_key(obj, fields):
+    return tuple(getattr(obj, field.attname) for field in fields)
+
+
+def _get_field(model, name):
+    if name == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _seek(queryset, fields, key):
+    """ Rows of `queryset` whose `fields` sort after `key`, as a row value
+    comparison the planner can answer from a composite index.
+    """
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    columns = ", ".join(
+        "{}.{}".format(table, connection.ops.quote_name(field.column))
+        for field in fields
+    )
+    placeholders = ", ".join(["%s"] * len(fields))
+    return queryset.extra(
+        where=["({}) > ({})".format(columns, placeholders)],
+        params=key,
+    )
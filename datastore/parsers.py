@@ -0,0 +1,134 @@
+import codecs
+import json
+import numbers
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+WHITESPACE = re.compile(r'\s*')
+
+# Characters which can continue a number, e.g. "1" of "1.5" or "1e3"
+NUMBER_CHARS = set('0123456789.eE+-')
+
+
+class JSONArrayStream(object):
+    """
+    Lazily decode the elements of a JSON array read from `stream`, holding
+    roughly one chunk of the input in memory at a time. A top-level value
+    which isn't an array is yielded as the only element.
+
+    Parameters
+    ----------
+    stream : file-like object
+        Binary stream supporting `read(size)`.
+    encoding : str
+        Character encoding of the stream.
+    chunk_size : int
+        Number of bytes to read at a time.
+    """
+
+    def __init__(self, stream, encoding='utf-8', chunk_size=65536):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = u''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        char = self._next_char()
+        if char is None:
+            return
+
+        if char != '[':
+            yield self._decode_value()
+            return
+
+        self._pos += 1
+        if self._next_char() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+
+            char = self._next_char()
+            self._pos += 1
+            if char == ']':
+                return
+            elif char != ',':
+                raise ParseError(
+                    'JSON parse error - expected "," or "]" between array '
+                    'elements')
+
+    def _fill(self):
+        """ Append the next chunk of the stream to the buffer, dropping what
+        has already been consumed. Returns False at the end of the stream.
+        """
+        if self._eof:
+            return False
+
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            text = self._decoder.decode(b'', final=True)
+        else:
+            text = self._decoder.decode(chunk)
+
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return not self._eof or len(text) > 0
+
+    def _next_char(self):
+        """ Skip whitespace and return the next character without consuming
+        it, or None at the end of the stream.
+        """
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return None
+
+    def _decode_value(self):
+        self._next_char()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(
+                    self._buffer, self._pos)
+            except ValueError as e:
+                if self._fill():
+                    continue
+                raise ParseError('JSON parse error - %s' % e)
+
+            # A value ending exactly at the end of the buffer may continue in
+            # the next chunk, and a number may have been decoded from only
+            # part of the buffered text, e.g. 1 from "1." of "1.5".
+            if (end == len(self._buffer) or
+                    (_is_number(value) and
+                     self._buffer[end] in NUMBER_CHARS)) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+class JSONStreamParser(BaseParser):
+    """
+    Parses JSON request content into a lazy iterator of records (see
+    `JSONArrayStream`), so that large arrays can be processed in batches
+    without loading the whole payload.
+    """
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return iter(JSONArrayStream(stream, encoding=encoding))
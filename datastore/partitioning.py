@@ -0,0 +1,220 @@
+""" Opt-in declarative partitioning of the consumption record table, either
+hashed by metadata or ranged by start. Requires PostgreSQL 11 or later.
+
+Rows are routed to partitions by PostgreSQL. Unique constraints of a
+partitioned table must include its partition key, so the primary key
+becomes `(id, key)` and `id` alone is no longer unique; writes which
+upsert, `bulk_sync` and `models.bulk_save`, conflict on the
+`(metadata_id, start)` unique constraint instead.
+
+Queries on `metadata_id` are pruned to one partition when hashed by
+metadata. Ranging by start only prunes reads bounded by a time window,
+such as those of `ConsumptionMetadata.records_dataframe(start, end)`;
+meter runs load whole traces, so they read every partition.
+"""
+from datetime import datetime
+
+from django.db import connection, transaction
+import pytz
+
+from .models import ConsumptionRecord
+
+TABLE = ConsumptionRecord._meta.db_table
+DEFAULT_PARTITION = TABLE + '_default'
+
+INTERVALS = ['month', 'year']
+
+FINGERPRINT_TRIGGERS = [
+    ('insert', 'NEW TABLE AS new_records'),
+    ('update', 'OLD TABLE AS old_records NEW TABLE AS new_records'),
+    ('delete', 'OLD TABLE AS old_records'),
+]
+
+
+def partition_scheme():
+    """ 'hash' or 'range' if the consumption record table is partitioned,
+    otherwise None.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT p.partstrat FROM pg_partitioned_table p"
+            " JOIN pg_class c ON c.oid = p.partrelid"
+            " WHERE c.oid = to_regclass(%s)",
+            [TABLE]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {'h': 'hash', 'r': 'range'}[row[0]]
+
+
+def partition_table(by, partitions=16, interval='year'):
+    """ Convert the consumption record table into a partitioned table,
+    copying existing records, in one transaction.
+
+    Parameters
+    ----------
+    by : {'metadata', 'start'}
+        Hash partition on `metadata_id` or range partition on `start`.
+    partitions : int
+        Number of hash partitions.
+    interval : {'month', 'year'}
+        Size of range partitions. Partitions are created to cover existing
+        records, plus a default partition for records outside of them.
+    """
+    if connection.pg_version < 110000:
+        raise ValueError(
+            "Partitioning consumption records requires PostgreSQL 11")
+    if partition_scheme() is not None:
+        raise ValueError("{} is already partitioned".format(TABLE))
+    if by == 'metadata':
+        strategy, key = 'HASH', 'metadata_id'
+    elif by == 'start':
+        strategy, key = 'RANGE', 'start'
+    else:
+        raise ValueError("Unknown partition key: {}".format(by))
+
+    unpartitioned = TABLE + '_unpartitioned'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "LOCK TABLE {} IN ACCESS EXCLUSIVE MODE".format(TABLE))
+        cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(
+            "ALTER TABLE {} RENAME TO {}".format(TABLE, unpartitioned))
+        cursor.execute(
+            "CREATE TABLE {table} (LIKE {unpartitioned}"
+            " INCLUDING DEFAULTS INCLUDING STORAGE)"
+            " PARTITION BY {strategy} ({key})"
+            .format(table=TABLE, unpartitioned=unpartitioned,
+                    strategy=strategy, key=key))
+
+        # Unique constraints of partitioned tables must include the
+        # partition key, so the primary key becomes (id, key). The
+        # (metadata_id, start) constraint also carries value and estimated,
+        # so that trace loads can be answered by index-only scans.
+        cursor.execute(
+            "ALTER TABLE {table}"
+            " ADD CONSTRAINT {table}_partitioned_pkey"
+            " PRIMARY KEY (id, {key}),"
+            " ADD CONSTRAINT {table}_partitioned_metadata_id_start_uniq"
+            " UNIQUE (metadata_id, start) INCLUDE (value, estimated),"
+            " ADD CONSTRAINT {table}_partitioned_metadata_id_fk"
+            " FOREIGN KEY (metadata_id)"
+            " REFERENCES datastore_consumptionmetadata (id)"
+            " DEFERRABLE INITIALLY DEFERRED"
+            .format(table=TABLE, key=key))
+        cursor.execute(
+            "ALTER SEQUENCE {} OWNED BY {}.id".format(sequence, TABLE))
+        # as created by migration 0035 on PostgreSQL 10 and later
+        for event, transition_tables in FINGERPRINT_TRIGGERS:
+            cursor.execute(
+                "CREATE TRIGGER {table}_fingerprint_{event}"
+                " AFTER {event} ON {table}"
+                " REFERENCING {transition_tables}"
+                " FOR EACH STATEMENT EXECUTE PROCEDURE"
+                " {table}_invalidate_fingerprint()"
+                .format(table=TABLE, event=event,
+                        transition_tables=transition_tables))
+
+        if by == 'metadata':
+            for remainder in range(partitions):
+                cursor.execute(
+                    "CREATE TABLE {table}_h{remainder} PARTITION OF {table}"
+                    " FOR VALUES WITH (MODULUS {modulus},"
+                    " REMAINDER {remainder})"
+                    .format(table=TABLE, modulus=partitions,
+                            remainder=remainder))
+        else:
+            cursor.execute(
+                "CREATE TABLE {} PARTITION OF {} DEFAULT"
+                .format(DEFAULT_PARTITION, TABLE))
+            cursor.execute(
+                "SELECT MIN(start), MAX(start) FROM {}"
+                .format(unpartitioned))
+            first, last = cursor.fetchone()
+            if first is not None:
+                create_range_partitions(first, last, interval)
+
+        cursor.execute(
+            "INSERT INTO {} SELECT * FROM {}".format(TABLE, unpartitioned))
+        cursor.execute("DROP TABLE {}".format(unpartitioned))
+
+
+def interval_bounds(start, end, interval='year'):
+    """ `(lower, upper)` UTC bounds of each month or year overlapping
+    `[start, end]`.
+    """
+    if interval not in INTERVALS:
+        raise ValueError("Unknown interval: {}".format(interval))
+
+    start, end = _as_utc(start), _as_utc(end)
+    lower = datetime(start.year, start.month if interval == 'month' else 1,
+                     1, tzinfo=pytz.UTC)
+
+    bounds = []
+    while lower <= end:
+        if interval == 'month':
+            year, month = divmod(lower.month, 12)
+            upper = lower.replace(year=lower.year + year, month=month + 1)
+        else:
+            upper = lower.replace(year=lower.year + 1)
+        bounds.append((lower, upper))
+        lower = upper
+    return bounds
+
+
+def partition_name(lower, interval='year'):
+    if interval == 'month':
+        return "{}_y{:04d}m{:02d}".format(TABLE, lower.year, lower.month)
+    return "{}_y{:04d}".format(TABLE, lower.year)
+
+
+def create_range_partitions(start, end, interval='year'):
+    """ Create and attach a partition for each month or year overlapping
+    `[start, end]`, moving any of its records out of the default partition.
+    Existing partitions are left alone.
+
+    Returns
+    -------
+    created : list of str
+        Names of the partitions created.
+    """
+    if partition_scheme() != 'range':
+        raise ValueError("{} is not partitioned by start".format(TABLE))
+
+    created = []
+    for lower, upper in interval_bounds(start, end, interval):
+        name = partition_name(lower, interval)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+
+            cursor.execute(
+                "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS"
+                " INCLUDING STORAGE)".format(name, TABLE))
+            cursor.execute(
+                "WITH moved AS ("
+                "  DELETE FROM {default} WHERE start >= %s AND start < %s"
+                "  RETURNING *"
+                ") INSERT INTO {name} SELECT * FROM moved"
+                .format(default=DEFAULT_PARTITION, name=name),
+                [lower, upper])
+            cursor.execute(
+                "ALTER TABLE {} ATTACH PARTITION {}"
+                " FOR VALUES FROM (%s) TO (%s)".format(TABLE, name),
+                [lower, upper])
+
+        created.append(name)
+    return created
+
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return pytz.UTC.localize(value)
+    return value.astimezone(pytz.UTC)
@@ -0,0 +1,169 @@
+""" Typed, columnar binary renderers for bulk reads.
+
+Views using `ColumnarMixin` (see `datastore.views`) respond with a `Columns`
+of numpy arrays when one of these renderers is negotiated, through the
+`Accept` header or `?format=`:
+
+- `npy`: a NumPy structured array (`application/x-npy`), read with
+  `numpy.load`
+- `arrow`: an Arrow IPC stream (`application/vnd.apache.arrow.stream`),
+  read with `pyarrow.ipc.open_stream`; requires pyarrow
+- `msgpack`: a map of `dtypes` and `columns` (`application/msgpack`), read
+  with `msgpack.unpackb`; requires msgpack
+
+Lists are sent a page at a time, linking to the next page from the `Link`
+header. Start times are UTC, in microseconds. Missing float values are NaN
+rather than null.
+"""
+from collections import OrderedDict
+from io import BytesIO
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Columns(OrderedDict):
+    """ Column name to equal-length 1-d numpy array. Datetimes are naive
+    UTC `datetime64[us]`, strings are object arrays which may hold None.
+    """
+
+    def n_rows(self):
+        for column in self.values():
+            return len(column)
+        return 0
+
+    @classmethod
+    def from_rows(cls, rows, names, kinds):
+        """ Columns from tuples, e.g. of `values_list(*names)`.
+
+        `kinds` gives the type of each column: 'int', 'float' (None becomes
+        NaN), 'bool', 'datetime' or 'str'.
+        """
+        rows = list(rows)
+        values = list(zip(*rows)) if len(rows) > 0 else [()] * len(names)
+
+        columns = cls()
+        for name, kind, column in zip(names, kinds, values):
+            if kind == 'datetime':
+                columns[name] = utc_datetimes(pd.DatetimeIndex(column))
+            elif kind == 'str':
+                columns[name] = np.array(column, dtype=object)
+            else:
+                dtype = {'int': np.int64, 'float': float, 'bool': bool}[kind]
+                columns[name] = np.array(column, dtype=dtype)
+        return columns
+
+
+def utc_datetimes(index):
+    """ `datetime64[us]` UTC values of a pandas DatetimeIndex. """
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.values.astype('datetime64[us]')
+
+
+class ColumnarRenderer(BaseRenderer):
+    """ Renders `Columns` with the `render_columns` of a subclass; other
+    data, such as error details, is rendered as JSON.
+    """
+
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, Columns):
+            response = (renderer_context or {}).get('response')
+            if response is not None:
+                response['Content-Type'] = JSONRenderer.media_type
+            return JSONRenderer().render(data)
+        return self.render_columns(data)
+
+
+class NpyRenderer(ColumnarRenderer):
+    media_type = 'application/x-npy'
+    format = 'npy'
+
+    def render_columns(self, columns):
+        prepared = OrderedDict()
+        for name, column in columns.items():
+            if column.dtype == object:
+                column = np.array(
+                    [u'' if value is None else value for value in column],
+                    dtype='U')
+            prepared[str(name)] = column
+
+        array = np.empty(
+            columns.n_rows(),
+            dtype=[(name, column.dtype) for name, column in prepared.items()])
+        for name, column in prepared.items():
+            array[name] = column
+
+        buffer = BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        return buffer.getvalue()
+
+
+class ArrowRenderer(ColumnarRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+    def render_columns(self, columns):
+        arrays = []
+        for column in columns.values():
+            if column.dtype.kind == 'M':
+                arrays.append(pyarrow.array(
+                    column, type=pyarrow.timestamp('us', tz='UTC')))
+            elif column.dtype == object:
+                arrays.append(pyarrow.array(column.tolist(),
+                                            type=pyarrow.string()))
+            else:
+                arrays.append(pyarrow.array(column))
+        table = pyarrow.Table.from_arrays(arrays, names=list(columns))
+
+        sink = pyarrow.BufferOutputStream()
+        writer = pyarrow.RecordBatchStreamWriter(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+        return sink.getvalue().to_pybytes()
+
+
+class MsgpackRenderer(ColumnarRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+
+    def render_columns(self, columns):
+        dtypes = OrderedDict()
+        data = OrderedDict()
+        for name, column in columns.items():
+            if column.dtype.kind == 'M':
+                dtypes[name] = 'datetime64[us, UTC]'
+                data[name] = column.astype(np.int64).tolist()
+            elif column.dtype == object:
+                dtypes[name] = 'str'
+                data[name] = column.tolist()
+            else:
+                dtypes[name] = column.dtype.str
+                data[name] = column.tolist()
+        return msgpack.packb(
+            OrderedDict([('dtypes', dtypes), ('columns', data)]),
+            use_bin_type=True)
+
+
+# Renderers whose dependencies are installed.
+BINARY_RENDERERS = [NpyRenderer]
+if pyarrow is not None:
+    BINARY_RENDERERS.append(ArrowRenderer)
+if msgpack is not None:
+    BINARY_RENDERERS.append(MsgpackRenderer)
+
+BINARY_FORMATS = [renderer.format for renderer in BINARY_RENDERERS]
@@ -1,11 +1,17 @@
 from rest_framework import serializers
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+import pytz
 
 from .. import models
 
 from .projects import (
     ProjectSerializer,
     ProjectWithAttributesSerializer,
+    ProjectWithMeterRunsSerializer,
+    ProjectWithAttributesAndMeterRunsSerializer,
     ProjectRunSerializer,
+    ProjectBlockRunSerializer,
 )
 
 from .project_results import (
@@ -15,7 +21,10 @@ from .project_results import (
 __all__ = (
     'ProjectSerializer',
     'ProjectWithAttributesSerializer',
+    'ProjectWithMeterRunsSerializer',
+    'ProjectWithAttributesAndMeterRunsSerializer',
     'ProjectRunSerializer',
+    'ProjectBlockRunSerializer',
     'ProjectResultSerializer',
     'ProjectOwnerSerializer',
     'ProjectBlockSerializer',
@@ -27,6 +36,8 @@ __all__ = (
     'ConsumptionMetadataSummarySerializer',
     'ConsumptionRecordEmbeddedSerializer',
     'ConsumptionMetadataSerializer',
+    'ConsumptionMetadataColumnarSerializer',
+    'TraceQuerySerializer',
 )
 
 
@@ -154,7 +165,9 @@ class ConsumptionRecordEmbeddedSerializer(serializers.ModelSerializer):
 
 class ConsumptionMetadataSerializer(serializers.ModelSerializer):
 
-    records = ConsumptionRecordEmbeddedSerializer(many=True)
+    # Compacted records are included, with a null id
+    records = ConsumptionRecordEmbeddedSerializer(many=True,
+                                                  source='all_records')
 
     class Meta:
         model = models.ConsumptionMetadata
@@ -168,7 +181,7 @@ class ConsumptionMetadataSerializer(serializers.ModelSerializer):
         )
 
     def create(self, validated_data):
-        records_data = validated_data.pop('records')
+        records_data = validated_data.pop('all_records')
 
         consumption_metadata = \
             models.ConsumptionMetadata.objects.create(**validated_data)
@@ -178,3 +191,98 @@ class ConsumptionMetadataSerializer(serializers.ModelSerializer):
                 metadata=consumption_metadata, **record_data)
 
         return consumption_metadata
+
+
+class ColumnarRecordsField(serializers.Field):
+    """ Read-only representation of a ConsumptionMetadata's records as
+    parallel arrays, loaded with `records_dataframe` (so without any model
+    instances, and including compacted records)::
+
+        {
+            "start": "2016-01-01T00:00:00Z",
+            "freq_seconds": 900,
+            "value": [1.0, null, ...],
+            "estimated": [false, false, ...]
+        }
+
+    If the records are not evenly spaced, `start` and `freq_seconds` are
+    replaced by a `starts` array.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super(ColumnarRecordsField, self).__init__(**kwargs)
+
+    def to_representation(self, consumption_metadata):
+        data = consumption_metadata.records_dataframe()
+
+        starts = data.index.tz_convert(None).values.astype('datetime64[ns]')
+        values = data.value.values
+        records = {
+            'value': np.where(np.isnan(values), None, values).tolist(),
+            'estimated': data.estimated.values.tolist(),
+        }
+
+        deltas = np.diff(starts.astype('int64'))
+        if len(starts) > 1 and (deltas == deltas[0]).all() and \
+                deltas[0] % 10 ** 9 == 0:
+            records['start'] = isoformat_utc(starts[:1])[0]
+            records['freq_seconds'] = int(deltas[0] // 10 ** 9)
+        else:
+            records['starts'] = isoformat_utc(starts)
+        return records
+
+
+def isoformat_utc(starts):
+    """ ISO 8601 UTC strings, formatted like DRF's DateTimeField, e.g.
+    `2016-01-01T00:00:00Z`, of naive UTC `datetime64` values or of a
+    timezone-aware DatetimeIndex.
+    """
+    if getattr(starts, 'tz', None) is not None:
+        starts = starts.tz_convert(None)
+    starts = np.asarray(starts).astype('datetime64[ns]')
+    unit = 's' if (starts.astype('int64') % 10 ** 9 == 0).all() else 'us'
+    return np.datetime_as_string(starts, unit=unit, timezone='UTC').tolist()
+
+
+class ConsumptionMetadataColumnarSerializer(
+        ConsumptionMetadataSerializer):
+
+    records = ColumnarRecordsField()
+
+
+class TraceQuerySerializer(serializers.Serializer):
+    """ Query parameters of a resampled trace request. """
+
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    freq = serializers.CharField(default='D')
+    aggregation = serializers.ChoiceField(
+        choices=models.RESAMPLE_AGGREGATIONS, default='sum')
+    tz = serializers.CharField(default='UTC')
+
+    def validate_freq(self, value):
+        try:
+            offset = to_offset(value)
+        except ValueError:
+            raise serializers.ValidationError(
+                "Not a pandas frequency: {}".format(value))
+        if not models.is_start_anchored(offset):
+            raise serializers.ValidationError(
+                "{} intervals end on their label; use a frequency labelled "
+                "by interval start, e.g. MS, QS, AS or 7D".format(value))
+        return value
+
+    def validate_tz(self, value):
+        try:
+            return pytz.timezone(value)
+        except pytz.UnknownTimeZoneError:
+            raise serializers.ValidationError(
+                "Unknown time zone: {}".format(value))
+
+    def validate(self, data):
+        if 'start' in data and 'end' in data and \
+                data['start'] >= data['end']:
+            raise serializers.ValidationError("start must be before end")
+        return data
@@ -1,11 +1,15 @@
 from rest_framework import serializers
 
 from .. import models
+from .project_results import ProjectResultSerializer
 
 __all__ = (
     'ProjectSerializer',
     'ProjectWithAttributesSerializer',
+    'ProjectWithMeterRunsSerializer',
+    'ProjectWithAttributesAndMeterRunsSerializer',
     'ProjectRunSerializer',
+    'ProjectBlockRunSerializer',
 )
 
 BASIC_PROJECT_FIELDS = (
@@ -49,6 +53,32 @@ class ProjectWithAttributesSerializer(serializers.ModelSerializer):
         )
 
 
+class ProjectWithMeterRunsSerializer(serializers.ModelSerializer):
+
+    latest_project_result = ProjectResultSerializer(read_only=True)
+
+    class Meta:
+        model = models.Project
+        fields = BASIC_PROJECT_FIELDS + (
+            'latest_project_result',
+        )
+
+
+class ProjectWithAttributesAndMeterRunsSerializer(
+        serializers.ModelSerializer):
+
+    attributes = ProjectAttributeValueEmbeddedSerializer(many=True,
+                                                         read_only=True)
+    latest_project_result = ProjectResultSerializer(read_only=True)
+
+    class Meta:
+        model = models.Project
+        fields = BASIC_PROJECT_FIELDS + (
+            'attributes',
+            'latest_project_result',
+        )
+
+
 class ProjectRunSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -74,3 +104,34 @@ class ProjectRunSerializer(serializers.ModelSerializer):
         if value not in models.METER_CLASS_CHOICES:
             raise serializers.ValidationError("Invalid meter_class")
         return value
+
+
+class ProjectBlockRunSerializer(serializers.ModelSerializer):
+
+    status_counts = serializers.DictField(child=serializers.IntegerField(),
+                                          read_only=True)
+    chunk_size = serializers.IntegerField(write_only=True, required=False,
+                                          min_value=1)
+
+    class Meta:
+        model = models.ProjectBlockRun
+        fields = (
+            'id',
+            'project_block',
+            'meter_class',
+            'meter_settings',
+            'chunk_size',
+            'status_counts',
+            'added',
+            'updated',
+        )
+        read_only_fields = (
+            'project_block',
+            'added',
+            'updated',
+        )
+
+    def validate_meter_class(self, value):
+        if value not in models.METER_CLASS_CHOICES:
+            raise serializers.ValidationError("Invalid meter_class")
+        return value
@@ -45,16 +45,31 @@ views.py
 
 """
 
-from .bulk_sync import bulk_sync
+from .bulk_sync import bulk_sync, bulk_sync_csv, reindex_errors
 from .create_project import create_project
 from .projectresult_export import projectresult_export
 from .overview import overview
 from .diagnostic_export import diagnostic_export
+from .project_iterator import iterate_project_pks, iterate_projects
+from .parallel_meter import run_meters_parallel, run_project
+from .parallel_sync import ConnectionPool, parallel_sync
+from .project_block_run import run_project_block
+from .record_fingerprints import sync_consumption_records
 
 __all__ = (
+    'ConnectionPool',
     'bulk_sync',
+    'bulk_sync_csv',
     'create_project',
     'diagnostic_export',
+    'iterate_project_pks',
+    'iterate_projects',
     'projectresult_export',
     'overview',
+    'parallel_sync',
+    'reindex_errors',
+    'run_meters_parallel',
+    'run_project',
+    'run_project_block',
+    'sync_consumption_records',
 )
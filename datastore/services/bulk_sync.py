@@ -3,12 +3,15 @@ import csv
 import logging
 import traceback
 import re
-try:
-    from StringIO import StringIO
-except ImportError:
-    from io import StringIO
 
 from django.db import connection
+from django.utils.six import text_type
+import numpy as np
+
+from .record_validation import validate_records
+
+# Errors listed in a response; any more are only counted.
+MAX_REPORTED_ERRORS = 100
 
 
 def success_response():
@@ -17,6 +20,72 @@ def success_response():
     }, 200)
 
 
+class IterFile(object):
+    """
+    Read-only file-like object over an iterable of strings, for handing
+    generated data to `cursor.copy_expert` chunk by chunk.
+    """
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            try:
+                chunk = next(self._iterator)
+            except StopIteration:
+                break
+            chunks.append(chunk)
+            length += len(chunk)
+
+        data = ''.join(chunks)
+        if size < 0:
+            self._buffer = ''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def _csv_chunks(frame, chunk_size=10000):
+    """ Yield CSV text for the coerced columns of `frame` (see
+    `validate_records`), `chunk_size` rows at a time. Nulls are written as
+    empty values.
+    """
+    columns = [_csv_column(frame[name]) for name in frame.columns]
+    for i in range(0, len(frame), chunk_size):
+        rows = zip(*[column[i:i + chunk_size] for column in columns])
+        yield '\n'.join(map(','.join, rows)) + '\n'
+
+
+def _csv_column(column):
+    """ List of CSV values for a coerced column. """
+    null = column.isnull().values
+
+    if column.dtype.kind == 'M':
+        utc = column.dt.tz_convert(None).values.astype('datetime64[us]')
+        values = np.datetime_as_string(utc, unit='us', timezone='UTC')
+        values = values.tolist()
+    elif column.dtype.kind == 'f':
+        values = [repr(value) for value in column.values.tolist()]
+    elif column.dtype.kind in 'iu':
+        return [str(value) for value in column.values.tolist()]
+    elif column.dtype.kind == 'b':
+        return ['t' if value else 'f' for value in column.values.tolist()]
+    else:
+        values = [
+            ('t' if value else 'f') if isinstance(value, bool) else
+            u'"{}"'.format(text_type(value).replace('"', '""'))
+            for value in column.values.tolist()
+        ]
+
+    for i in np.flatnonzero(null):
+        values[i] = ''
+    return values
+
+
 def error_response(message="Error attempting to sync"):
     return ({
         "status": "error",
@@ -24,9 +93,30 @@ def error_response(message="Error attempting to sync"):
     }, 400)
 
 
-def bulk_sync(records, fields, model_class, keys):
+def invalid_records_response(errors):
+    """ Error response listing the first `MAX_REPORTED_ERRORS` of the
+    `errors` found by `validate_records`.
+    """
+    response, status = error_response(
+        "{} invalid values in {} records".format(
+            len(errors), len(set(error["index"] for error in errors))))
+    response["errors"] = errors[:MAX_REPORTED_ERRORS]
+    return response, status
+
+
+def reindex_errors(response, indexes):
+    """ Map the record indexes of `response` errors, if any, through
+    `indexes`, e.g. from a batch back to the whole payload.
+    """
+    for error in response.get("errors", []):
+        error["index"] = indexes[error["index"]]
+    return response
+
+
+def bulk_sync(records, fields, model_class, keys, skip_unchanged=True):
     """
-    Upsert data for the given `model_class` using a temporary table.
+    Upsert data for the given `model_class` using a temporary table and
+    `INSERT ... ON CONFLICT DO UPDATE`.
 
     Parameters
     ----------
@@ -48,28 +138,80 @@ def bulk_sync(records, fields, model_class, keys):
 
     model_class: Django model class
 
-    keys: primary or composite key
+    keys: primary or composite key; must be covered by a unique constraint
 
         Examples:
 
         ['id']
 
         ['start', 'project_id']
+
+    skip_unchanged: if True, existing rows whose values are unchanged are
+        not rewritten
+
+    Values are checked and coerced before loading (see `validate_records`);
+    if any are invalid nothing is loaded, and the response lists the
+    `errors` by record index.
     """
 
     if records is None or len(records) == 0:
         return success_response()
 
-    # Error out if missing fields
-    def valid_record(record):
-        for field in fields:
-            if field not in record:
-                return False
-        return True
-    for record in records:
-        if not valid_record(record):
-            return error_response()
+    # Error out on missing or invalid fields, before anything is loaded
+    frame, errors = validate_records(records, fields, model_class)
+    if len(errors) > 0:
+        return invalid_records_response(errors)
+
+    return bulk_sync_frame(frame, model_class, keys, skip_unchanged)
+
+
+def bulk_sync_frame(frame, model_class, keys, skip_unchanged=True):
+    """
+    Upsert values already coerced by `validate_records`, one column per
+    field, as `bulk_sync` does.
+    """
+    if len(frame) == 0:
+        return success_response()
+
+    fields = list(frame.columns)
 
+    # Generate CSV lazily so that COPY consumes it in chunks
+    infile = IterFile(_csv_chunks(frame))
+
+    return _copy_upsert(infile, fields, fields, model_class, keys,
+                        skip_unchanged)
+
+
+def bulk_sync_csv(infile, fields, model_class, keys, skip_unchanged=True):
+    """
+    Upsert CSV data for the given `model_class`, streaming `infile`
+    straight into a Postgres COPY.
+
+    Parameters
+    ----------
+    infile: file-like object with `readline` and `read`, e.g. a request
+        stream, yielding CSV with a header row naming the `fields` (in any
+        order) and one row per record. Empty values are stored as NULL.
+
+    fields, model_class, keys, skip_unchanged: as for `bulk_sync`
+    """
+
+    header = infile.readline()
+    if isinstance(header, bytes):
+        header = header.decode('utf-8')
+    columns = [column.strip() for column in next(csv.reader([header]), [])]
+
+    # Column names are interpolated into SQL, so only accept known fields
+    if sorted(columns) != sorted(fields):
+        return error_response(
+            "CSV header must contain exactly the fields: {}"
+            .format(", ".join(fields)))
+
+    return _copy_upsert(infile, columns, fields, model_class, keys,
+                        skip_unchanged)
+
+
+def _copy_upsert(infile, columns, fields, model_class, keys, skip_unchanged):
     # Build schema from field names
     schema = [
         {
@@ -92,64 +234,65 @@ def bulk_sync(records, fields, model_class, keys):
     ])
 
     create_tmp_table_statement = """
-      CREATE TEMPORARY TABLE {tmp_tablename}({schema_statement});
+      CREATE TEMPORARY TABLE {tmp_tablename}(
+        _row BIGSERIAL, {schema_statement}
+      );
     """.format(tmp_tablename=tmp_tablename, schema_statement=schema_statement)
 
-    # Write the request data to an in-memory CSV file for a subsequent
-    # Postgres COPY
-    infile = StringIO()
-    fieldnames = records[0].keys()
-    writer = csv.DictWriter(infile, fieldnames=fieldnames)
-    for record in records:
-        writer.writerow(record)
-    infile.seek(0)
+    copy_statement = """
+      COPY {tmp_tablename}({columns}) FROM STDIN WITH (FORMAT csv);
+    """.format(tmp_tablename=tmp_tablename, columns=",".join(columns))
 
     # Build SQL statement for upsert from temporary table to real table
-    update_schema_statement = ",".join([
-        "{name} = {tmp_tablename}.{name}"
-        .format(name=column['name'], tmp_tablename=tmp_tablename)
-        for column in schema
-    ])
-
     insert_columns = ",".join([
         column['name'] for column in schema
     ])
 
-    insert_schema_statement = ",".join([
-        "{tmp_tablename}.{name}"
-        .format(name=column['name'], tmp_tablename=tmp_tablename)
-        for column in schema
-    ])
+    key_columns = ",".join(keys)
 
-    key_statement = " AND ".join([
-        "{tablename}.{key} = {tmp_tablename}.{key}"
-        .format(tablename=tablename, tmp_tablename=tmp_tablename, key=key)
-        for key in keys
-    ])
+    update_columns = [
+        column['name'] for column in schema if column['name'] not in keys
+    ]
 
-    where_statement = " AND ".join([
-        "{tablename}.{key} IS NULL".format(tablename=tablename, key=key)
-        for key in keys
+    update_schema_statement = ",".join([
+        "{name} = EXCLUDED.{name}".format(name=name)
+        for name in update_columns
     ])
 
+    # Skip rewriting rows whose values would not change
+    if skip_unchanged and len(update_columns) > 0:
+        where_statement = "WHERE ({existing}) IS DISTINCT FROM ({excluded})"\
+            .format(
+                existing=",".join([
+                    "{tablename}.{name}".format(tablename=tablename, name=name)
+                    for name in update_columns
+                ]),
+                excluded=",".join([
+                    "EXCLUDED.{name}".format(name=name)
+                    for name in update_columns
+                ]),
+            )
+    else:
+        where_statement = ""
+
+    if len(update_columns) > 0:
+        conflict_statement = "DO UPDATE SET {} {}".format(
+            update_schema_statement, where_statement)
+    else:
+        conflict_statement = "DO NOTHING"
+
+    # If a key appears more than once in the payload, the last record wins.
     upsert_statement = """
-      UPDATE {tablename}
-      SET {update_schema_statement}
-      FROM {tmp_tablename}
-      WHERE {key_statement};
-
       INSERT INTO {tablename}({insert_columns})
-      SELECT {insert_schema_statement}
+      SELECT DISTINCT ON ({key_columns}) {insert_columns}
       FROM {tmp_tablename}
-      LEFT OUTER JOIN {tablename} ON {key_statement}
-      WHERE {where_statement};
+      ORDER BY {key_columns}, _row DESC
+      ON CONFLICT ({key_columns}) {conflict_statement};
     """.format(tablename=tablename,
                tmp_tablename=tmp_tablename,
-               key_statement=key_statement,
-               where_statement=where_statement,
-               update_schema_statement=update_schema_statement,
                insert_columns=insert_columns,
-               insert_schema_statement=insert_schema_statement)
+               key_columns=key_columns,
+               conflict_statement=conflict_statement)
 
     response = success_response()
 
@@ -158,11 +301,14 @@ def bulk_sync(records, fields, model_class, keys):
         cursor.execute(create_tmp_table_statement)
 
         # Load data into temporary table from CSV
-        cursor.copy_from(file=infile, table=tmp_tablename, sep=',',
-                         columns=fieldnames, null="")
+        cursor.copy_expert(copy_statement, infile)
 
         # Upsert it into the actual table
         cursor.execute(upsert_statement)
+
+        # Temporary tables otherwise last until the session ends, and sync2
+        # loads many batches in one transaction.
+        cursor.execute("DROP TABLE {}".format(tmp_tablename))
     except:
         # Log exception
         logging.error(traceback.print_exc())
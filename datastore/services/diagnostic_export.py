@@ -1,65 +1,71 @@
+from collections import defaultdict
+
+from django.db.models import Count
+
 from datastore import models
 
+PROJECT_RUN_STATUSES = ['PENDING', 'RUNNING', 'SUCCESS', 'FAILED']
+
+
+def _grouped_counts(queryset, *fields):
+    """ Count rows in `queryset` per `project_id` and per combination of
+    `project_id` and `fields`, using one GROUP BY query.
+
+    Returns
+    -------
+    totals : dict
+        Maps project pk to row count.
+    counts : dict
+        Maps `(project_pk,) + field values` to row count.
+    """
+    totals = defaultdict(int)
+    counts = defaultdict(int)
+    group_fields = ('project_id',) + fields
+    rows = queryset.order_by().values(*group_fields).annotate(n=Count('pk'))
+    for row in rows:
+        key = tuple(row[field] for field in group_fields)
+        totals[row['project_id']] += row['n']
+        counts[key] = row['n']
+    return totals, counts
+
+
+def project_diagnostic_row(project_pk, project_id, project_result_counts,
+                           project_run_counts, consumption_metadata_counts):
+    project_result_totals, _ = project_result_counts
+    project_run_totals, project_run_status_counts = project_run_counts
+    consumption_metadata_totals, consumption_metadata_interpretation_counts =\
+        consumption_metadata_counts
 
-def project_diagnostic_row(project):
-    project_runs = project.projectrun_set.all()
     row = {
-        'project_pk': project.id,
-        'project_id': project.project_id,
-        'project_result_count': project.project_results.count(),
-        'project_run_count': len(project_runs),
-        'project_run_count-PENDING': sum([
-            1 for pr in project_runs if pr.status == 'PENDING'
-        ]),
-        'project_run_count-RUNNING': sum([
-            1 for pr in project_runs if pr.status == 'RUNNING'
-        ]),
-        'project_run_count-SUCCESS': sum([
-            1 for pr in project_runs if pr.status == 'SUCCESS'
-        ]),
-        'project_run_count-FAILED': sum([
-            1 for pr in project_runs if pr.status == 'FAILED'
-        ]),
-        'consumption_metadata_count': project.consumptionmetadata_set.count(),
-        'consumption_metadata_count-ELECTRICITY_CONSUMPTION_SUPPLIED': (
-            project.consumptionmetadata_set
-            .filter(interpretation='E_C_S').count()
-        ),
-        'consumption_metadata_count-ELECTRICITY_CONSUMPTION_NET': (
-            project.consumptionmetadata_set
-            .filter(interpretation='E_C_N').count()
-        ),
-        'consumption_metadata_count-ELECTRICITY_CONSUMPTION_TOTAL': (
-            project.consumptionmetadata_set
-            .filter(interpretation='E_C_T').count()
-        ),
-        'consumption_metadata_count-ELECTRICITY_ON_SITE_GENERATION_TOTAL': (
-            project.consumptionmetadata_set
-            .filter(interpretation='E_OSG_T').count()
-        ),
-        'consumption_metadata_count-ELECTRICITY_ON_SITE_GENERATION_CONSUMED': (
-            project.consumptionmetadata_set
-            .filter(interpretation='E_OSG_C').count()
-        ),
-        'consumption_metadata_count-ELECTRICITY_ON_SITE_GENERATION_UNCONSUMED':
-        (
-            project.consumptionmetadata_set
-            .filter(interpretation='E_OSG_U').count()
-        ),
-        'consumption_metadata_count-NATURAL_GAS_CONSUMPTION_SUPPLIED': (
-            project.consumptionmetadata_set
-            .filter(interpretation='NG_C_S').count()
-        ),
+        'project_pk': project_pk,
+        'project_id': project_id,
+        'project_result_count': project_result_totals[project_pk],
+        'project_run_count': project_run_totals[project_pk],
+        'consumption_metadata_count': consumption_metadata_totals[project_pk],
     }
+
+    for status in PROJECT_RUN_STATUSES:
+        row['project_run_count-' + status] = \
+            project_run_status_counts[(project_pk, status)]
+
+    for interpretation, name in models.INTERPRETATION_CHOICES:
+        row['consumption_metadata_count-' + name] = \
+            consumption_metadata_interpretation_counts[
+                (project_pk, interpretation)]
+
     return row
 
 
 def diagnostic_export():
-    projects = models.Project.objects.all().prefetch_related(
-        'project_results',
-        'projectrun_set',
-        'consumptionmetadata_set',
-    ).order_by('project_id')
+    projects = models.Project.objects.order_by('project_id')\
+        .values_list('pk', 'project_id')
+
+    project_result_counts = _grouped_counts(
+        models.ProjectResult.objects.all())
+    project_run_counts = _grouped_counts(
+        models.ProjectRun.objects.all(), 'status')
+    consumption_metadata_counts = _grouped_counts(
+        models.ConsumptionMetadata.objects.all(), 'interpretation')
 
     return {
         'headers': [
@@ -87,6 +93,9 @@ def diagnostic_export():
             'consumption_metadata_count-NATURAL_GAS_CONSUMPTION_SUPPLIED',
         ],
         'rows': [
-            project_diagnostic_row(project) for project in projects
+            project_diagnostic_row(
+                project_pk, project_id, project_result_counts,
+                project_run_counts, consumption_metadata_counts)
+            for project_pk, project_id in projects
         ],
     }
@@ -0,0 +1,69 @@
+import multiprocessing
+
+from django import db
+
+from datastore import models
+from datastore import tasks
+
+
+def run_project(project_pk, meter_class='EnergyEfficiencyMeter',
+                meter_settings=None):
+    """ Run the meter for one project through a ProjectRun, in this process,
+    exactly as if it had been POSTed to the API.
+
+    Returns
+    -------
+    project_run : datastore.models.ProjectRun
+        The finished project run, with its status and any traceback.
+    """
+    project_run = models.ProjectRun.objects.create(
+        project_id=project_pk,
+        meter_class=meter_class,
+        meter_settings=meter_settings,
+    )
+    tasks.execute_project_run(project_run.pk)
+    project_run.refresh_from_db()
+
+    return project_run
+
+
+def _run_project(args):
+    return run_project(*args)
+
+
+def run_meters_parallel(project_pks, n_workers,
+                        meter_class='EnergyEfficiencyMeter',
+                        meter_settings=None):
+    """
+    Run the meter for each project across a pool of `n_workers` processes.
+
+    Each project is run with `run_project`, so status and tracebacks are
+    recorded per project, as in serial runs. Every worker opens its own
+    database connection.
+
+    Parameters
+    ----------
+    project_pks : list of int
+        Primary keys of projects to run.
+    n_workers : int
+        Number of worker processes.
+
+    Yields
+    ------
+    project_run : datastore.models.ProjectRun
+        Finished project runs, in order of completion.
+    """
+
+    # Connections must not be shared across a fork; close them here so that
+    # workers (and this process) reconnect on first use.
+    db.connections.close_all()
+
+    args = [(pk, meter_class, meter_settings) for pk in project_pks]
+
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        for project_run in pool.imap_unordered(_run_project, args):
+            yield project_run
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+import sys
+import threading
+
+from django import db
+from django.utils import six
+from django.utils.six.moves import queue
+
+from .bulk_sync import (
+    MAX_REPORTED_ERRORS, error_response, reindex_errors, success_response,
+)
+
+
+def partition_records(records, partition_key, n_chunks):
+    """ Split records into at most `n_chunks` lists of similar size, keeping
+    all records with the same `partition_key` value together, in order.
+    """
+    return [
+        [records[i] for i in chunk]
+        for chunk in _partition_indexes(records, partition_key, n_chunks)
+    ]
+
+
+def _partition_indexes(records, partition_key, n_chunks):
+    groups = OrderedDict()
+    for i, record in enumerate(records):
+        key = str(record.get(partition_key))
+        groups.setdefault(key, []).append(i)
+
+    chunks = [[] for _ in range(n_chunks)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(chunks, key=len).extend(group)
+    return [chunk for chunk in chunks if len(chunk) > 0]
+
+
+class ConnectionPool(object):
+    """
+    Threads which each keep their own database connection for the life of
+    the pool, so that consecutive `parallel_sync` calls, such as the batches
+    of one upload, reuse the same connections. Use as a context manager;
+    the threads stop and close their connections on exit.
+
+    Work done by the threads is committed on their connections, so it is
+    neither part of, nor can it see, a transaction open on the calling
+    thread's connection.
+    """
+
+    def __init__(self, n_connections):
+        self.n_connections = n_connections
+        self._tasks = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._work)
+            for _ in range(n_connections)
+        ]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    return
+                func, arg, i, results = task
+                try:
+                    results.put((i, True, func(arg)))
+                except Exception:
+                    results.put((i, False, sys.exc_info()))
+        finally:
+            db.connection.close()
+
+    def map(self, func, args):
+        """ `[func(arg) for arg in args]`, with the calls spread over the
+        threads. Raises the first exception raised by any call.
+        """
+        results = queue.Queue()
+        for i, arg in enumerate(args):
+            self._tasks.put((func, arg, i, results))
+
+        values = [None] * len(args)
+        error = None
+        for _ in range(len(args)):
+            i, ok, value = results.get()
+            if ok:
+                values[i] = value
+            elif error is None:
+                error = value
+        if error is not None:
+            six.reraise(*error)
+        return values
+
+
+def parallel_sync(records, sync, partition_key='metadata_id',
+                  n_connections=4, pool=None):
+    """
+    Sync records over up to `n_connections` database connections at once.
+
+    Records are split by `partition_key` so that no two connections write
+    the same rows, and each chunk is passed to `sync` in a thread of a
+    `ConnectionPool`, with its own connection and transaction. A failed
+    chunk therefore doesn't roll back the others.
+
+    Parameters
+    ----------
+    records: list of dicts
+    sync: callable taking a list of records and returning
+        `(response, status)`, e.g. `bulk_sync` with its other arguments
+        bound, or `sync_consumption_records`
+    partition_key: record field to split on
+    n_connections: maximum number of concurrent connections, if `pool` is
+        not given
+    pool: `ConnectionPool` to sync over, e.g. one shared by every batch of
+        a request; otherwise a pool is opened for this call only
+
+    Returns
+    -------
+    (response, status) merged over all chunks; `skipped` counts are summed
+    and error indexes refer to positions in `records`.
+    """
+    if pool is not None:
+        n_connections = pool.n_connections
+    chunk_indexes = _partition_indexes(records, partition_key,
+                                       n_connections)
+    if len(chunk_indexes) == 0 or (len(chunk_indexes) == 1 and pool is None):
+        return sync(records)
+    chunks = [[records[i] for i in chunk] for chunk in chunk_indexes]
+
+    if pool is None:
+        with ConnectionPool(len(chunks)) as pool:
+            results = pool.map(sync, chunks)
+    else:
+        results = pool.map(sync, chunks)
+
+    failed = [
+        reindex_errors(response, indexes)
+        for (response, status), indexes in zip(results, chunk_indexes)
+        if status != 200
+    ]
+    if len(failed) > 0:
+        messages = OrderedDict.fromkeys(
+            response.get("message", "") for response in failed)
+        merged, status = error_response(
+            "{} of {} chunks failed: {}".format(
+                len(failed), len(chunks), "; ".join(messages)))
+        errors = sorted(
+            (error for response in failed
+             for error in response.get("errors", [])),
+            key=lambda error: error["index"])
+        if len(errors) > 0:
+            merged["errors"] = errors[:MAX_REPORTED_ERRORS]
+        return merged, status
+
+    merged, status = success_response()
+    skipped = [response["skipped"] for response, _ in results
+               if "skipped" in response]
+    if len(skipped) > 0:
+        merged["skipped"] = sum(skipped)
+    return merged, status
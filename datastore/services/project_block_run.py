@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import transaction
+
+from datastore import models
+from datastore import tasks
+
+
+def run_project_block(project_block, meter_class='EnergyEfficiencyMeter',
+                      meter_settings=None, chunk_size=None):
+    """
+    Create a ProjectRun for every project in `project_block` and queue them
+    as a group of chunked celery tasks.
+
+    Parameters
+    ----------
+    project_block : datastore.models.ProjectBlock
+        Block of projects to run.
+    chunk_size : int
+        Number of project runs executed by each celery task. Defaults to
+        `settings.PROJECT_RUN_CHUNK_SIZE`.
+
+    Returns
+    -------
+    project_block_run : datastore.models.ProjectBlockRun
+        Handle for polling the status of the project runs.
+    """
+
+    if chunk_size is None:
+        chunk_size = settings.PROJECT_RUN_CHUNK_SIZE
+
+    project_pks = list(
+        project_block.projects.order_by('pk').values_list('pk', flat=True))
+
+    with transaction.atomic():
+        project_block_run = models.ProjectBlockRun.objects.create(
+            project_block=project_block,
+            meter_class=meter_class,
+            meter_settings=meter_settings,
+        )
+
+        project_run_pks = models.reserve_pks(models.ProjectRun,
+                                             len(project_pks))
+        models.ProjectRun.objects.bulk_create([
+            models.ProjectRun(
+                pk=project_run_pk,
+                project_id=project_pk,
+                project_block_run=project_block_run,
+                meter_class=meter_class,
+                meter_settings=meter_settings,
+            )
+            for project_run_pk, project_pk in zip(project_run_pks,
+                                                  project_pks)
+        ])
+
+    if len(project_run_pks) > 0:
+        tasks.execute_project_run.chunks(
+            [(pk,) for pk in project_run_pks], chunk_size).apply_async()
+
+    return project_block_run
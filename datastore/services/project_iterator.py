@@ -0,0 +1,69 @@
+from datastore import models
+
+
+def iterate_projects(queryset=None, chunk_size=100):
+    """
+    Stream projects in primary key order, fetching `chunk_size` projects
+    (and their consumption metadata) at a time.
+
+    Chunks are fetched with keyset pagination on `pk` rather than a single
+    long-lived cursor, so no transaction is held open between chunks and
+    only one chunk is in memory at a time, whatever the size of the
+    portfolio.
+
+    Parameters
+    ----------
+    queryset : django.db.models.QuerySet of datastore.models.Project
+        Projects to iterate over. Defaults to all projects.
+    chunk_size : int
+        Number of projects to fetch per query.
+    """
+
+    if queryset is None:
+        queryset = models.Project.objects.all()
+
+    queryset = queryset.order_by('pk')\
+        .prefetch_related('consumptionmetadata_set')
+
+    last_pk = None
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+
+        chunk = list(chunk_queryset[:chunk_size])
+        if len(chunk) == 0:
+            return
+
+        for project in chunk:
+            yield project
+
+        last_pk = chunk[-1].pk
+
+
+def iterate_project_pks(queryset=None, chunk_size=1000):
+    """
+    Stream the primary keys of projects in order, fetched `chunk_size` at a
+    time with keyset pagination as in `iterate_projects`, for callers which
+    load each project themselves.
+    """
+
+    if queryset is None:
+        queryset = models.Project.objects.all()
+
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+
+    last_pk = None
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+
+        chunk = list(chunk_queryset[:chunk_size])
+        if len(chunk) == 0:
+            return
+
+        for pk in chunk:
+            yield pk
+
+        last_pk = chunk[-1]
@@ -1,147 +1,261 @@
+from django.db.models import Count, F, Max
+
+import pandas as pd
+
 from datastore import models
 
+PROJECT_RESULT_FIELDS = [
+    ('project_result__id', 'id'),
+    ('project_result__project_run__id', 'project_run_id'),
+    ('project_result__eemeter_version', 'eemeter_version'),
+    ('project_result__meter_class', 'meter_class'),
+    ('project__id', 'project__id'),
+    ('project__project_id', 'project__project_id'),
+    ('project__zipcode', 'project__zipcode'),
+    ('project__baseline_period_end', 'project__baseline_period_end'),
+    ('project__reporting_period_start', 'project__reporting_period_start'),
+]
+
+MODELING_PERIOD_GROUP_FIELDS = [
+    ('project_result__id', 'project_result_id'),
+    ('modeling_period_group__id', 'id'),
+    ('baseline_period__id', 'baseline_period__id'),
+    ('baseline_period__start_date', 'baseline_period__start_date'),
+    ('baseline_period__end_date', 'baseline_period__end_date'),
+    ('reporting_period__id', 'reporting_period__id'),
+    ('reporting_period__start_date', 'reporting_period__start_date'),
+    ('reporting_period__end_date', 'reporting_period__end_date'),
+]
+
+DERIVATIVE_AGGREGATION_ATTRS = [
+    'id',
+    'baseline_value',
+    'baseline_upper',
+    'baseline_lower',
+    'baseline_n',
+    'reporting_value',
+    'reporting_upper',
+    'reporting_lower',
+    'reporting_n',
+]
+
+ENERGY_TRACE_MODEL_RESULT_ATTRS = [
+    'id',
+    'energy_trace_id',
+    'modeling_period_id',
+    'status',
+    'r2',
+    'rmse',
+    'cvrmse',
+    'model_serializiation',
+    'upper',
+    'lower',
+    'n',
+]
+
+
+def _values_frame(queryset, fields):
+    """ Load `(column name, lookup)` fields of a queryset into a DataFrame
+    without instantiating any models.
+    """
+    names = [name for name, _ in fields]
+    lookups = [lookup for _, lookup in fields]
+    return pd.DataFrame.from_records(
+        list(queryset.values_list(*lookups)), columns=names)
+
+
+def _pivot(frame, index, prefix, attrs):
+    """ Pivot one row per (index, prefix) into one row per index with a
+    `prefix + attr` column for each attr.
+    """
+    frame = frame.drop_duplicates([index, prefix], keep='last')
+    frame = frame.set_index([index, prefix])[attrs].unstack(prefix)
+    frame.columns = [
+        column_prefix + attr for attr, column_prefix in frame.columns
+    ]
+    return frame.reset_index()
+
+
+INTEGER_ATTRS = {
+    'derivative_aggregation': ['id', 'baseline_n', 'reporting_n'],
+    'energy_trace_model_result': [
+        'id', 'energy_trace_id', 'modeling_period_id',
+    ],
+}
+
+# Number of project results pivoted at a time.
+EXPORT_BATCH_SIZE = 500
+
+
+def _latest(queryset):
+    return queryset.filter(
+        project_result__project__latest_project_result=F('project_result'))
+
+
+def _derivative_aggregation_prefix(trace_interpretation, interpretation):
+    return 'derivative_aggregation__{}__{}__'.format(
+        trace_interpretation.lower(), interpretation.lower())
+
+
+def _energy_trace_model_result_prefix(i):
+    return 'energy_trace_model_result-{}__'.format(i)
+
+
+def _columns():
+    """ Every column of the export, and the subset holding integers, from
+    the distinct derivative aggregation interpretations and the largest
+    number of energy trace model results of any project result.
+    """
+    columns = set(name for name, _ in PROJECT_RESULT_FIELDS)
+    columns.update(name for name, _ in MODELING_PERIOD_GROUP_FIELDS)
+    integer_columns = set(name for name in columns if name.endswith('__id'))
+
+    interpretations = _latest(models.DerivativeAggregation.objects) \
+        .order_by().values_list('trace_interpretation', 'interpretation') \
+        .distinct()
+    for trace_interpretation, interpretation in interpretations:
+        prefix = _derivative_aggregation_prefix(trace_interpretation,
+                                                interpretation)
+        columns.update(prefix + attr for attr in DERIVATIVE_AGGREGATION_ATTRS)
+        integer_columns.update(
+            prefix + attr for attr in INTEGER_ATTRS['derivative_aggregation'])
+
+    n_results = _latest(models.EnergyTraceModelResult.objects) \
+        .order_by().values('project_result_id') \
+        .annotate(n=Count('id')).aggregate(n=Max('n'))['n'] or 0
+    for i in range(n_results):
+        prefix = _energy_trace_model_result_prefix(i)
+        columns.update(prefix + attr
+                       for attr in ENERGY_TRACE_MODEL_RESULT_ATTRS)
+        integer_columns.update(
+            prefix + attr
+            for attr in INTEGER_ATTRS['energy_trace_model_result'])
+
+    return sorted(columns), integer_columns
+
+
+def _derivative_aggregations_frame(project_result_ids):
+    frame = _values_frame(
+        models.DerivativeAggregation.objects
+        .filter(project_result_id__in=project_result_ids)
+        .order_by('id'),
+        [
+            ('modeling_period_group__id', 'modeling_period_group_id'),
+            ('trace_interpretation', 'trace_interpretation'),
+            ('interpretation', 'interpretation'),
+        ] + [(attr, attr) for attr in DERIVATIVE_AGGREGATION_ATTRS]
+    )
+    if len(frame) == 0:
+        return None
+
+    frame['prefix'] = [
+        _derivative_aggregation_prefix(trace_interpretation, interpretation)
+        for trace_interpretation, interpretation
+        in zip(frame.trace_interpretation, frame.interpretation)
+    ]
+    return _pivot(frame, 'modeling_period_group__id', 'prefix',
+                  DERIVATIVE_AGGREGATION_ATTRS)
+
+
+def _energy_trace_model_results_frame(project_result_ids):
+    frame = _values_frame(
+        models.EnergyTraceModelResult.objects
+        .filter(project_result_id__in=project_result_ids)
+        .order_by('project_result_id', 'modeling_period_id', 'id'),
+        [('project_result__id', 'project_result_id')] +
+        [(attr, attr) for attr in ENERGY_TRACE_MODEL_RESULT_ATTRS]
+    )
+    if len(frame) == 0:
+        return None
+
+    frame['prefix'] = [
+        _energy_trace_model_result_prefix(i)
+        for i in frame.groupby('project_result__id').cumcount()
+    ]
+    return _pivot(frame, 'project_result__id', 'prefix',
+                  ENERGY_TRACE_MODEL_RESULT_ATTRS)
+
+
+def _export_frame(project_result_ids, headers):
+    """ Export rows of a batch of project results, with `headers` as
+    columns.
+    """
+    project_results = _values_frame(
+        models.ProjectResult.objects.filter(id__in=project_result_ids),
+        PROJECT_RESULT_FIELDS)
+    modeling_period_groups = _values_frame(
+        models.ModelingPeriodGroup.objects
+        .filter(project_result_id__in=project_result_ids),
+        MODELING_PERIOD_GROUP_FIELDS)
+
+    frame = modeling_period_groups.merge(project_results,
+                                         on='project_result__id')
+
+    derivative_aggregations = \
+        _derivative_aggregations_frame(project_result_ids)
+    if derivative_aggregations is not None:
+        frame = frame.merge(derivative_aggregations, how='left',
+                            on='modeling_period_group__id')
+
+    energy_trace_model_results = \
+        _energy_trace_model_results_frame(project_result_ids)
+    if energy_trace_model_results is not None:
+        frame = frame.merge(energy_trace_model_results, how='left',
+                            on='project_result__id')
+
+    frame = frame.sort_values(['project__id', 'modeling_period_group__id'])\
+        .reindex(columns=headers)
+
+    # Null dates come back as NaT when others in the batch aren't null.
+    dates = [name for name, dtype in frame.dtypes.items() if dtype.kind == 'M']
+    frame[dates] = frame[dates].astype(object)\
+        .where(frame[dates].notnull(), None)
+    return frame
+
+
+def _format_integer(value):
+    """ Integers come back from pandas as floats in any column with a
+    missing value; write them as integers again, and missing values as
+    None.
+    """
+    if value is None or pd.isnull(value):
+        return None
+    return int(value)
+
+
+def projectresult_export(batch_size=EXPORT_BATCH_SIZE):
+    """
+    Export the latest project result of every project, one row per modeling
+    period group, joined through `Project.latest_project_result`.
+
+    Rows are built `batch_size` project results at a time, in a fixed number
+    of queries per batch, so memory use does not depend on the number of
+    projects.
+
+    Returns
+    -------
+    export : dict
+        `headers`: the full, sorted list of columns, known before any row
+        is produced; `rows`: a generator of row dicts.
+    """
+    headers, integer_columns = _columns()
+    project_result_ids = list(
+        models.ProjectResult.objects
+        .filter(project__latest_project_result=F('id'))
+        .order_by('project_id')
+        .values_list('id', flat=True))
 
-def serialize(project_result):
-
-    modeling_period_groups = project_result.modeling_period_groups.all()
-
-    rows = []
-    for modeling_period_group in modeling_period_groups:
-
-        project_result_attrs = [
-            'id',
-            ('project_run', 'id'),
-            'eemeter_version',
-            'meter_class',
-        ]
-
-        project_attrs = [
-            'id',
-            'project_id',
-            'zipcode',
-            'baseline_period_end',
-            'reporting_period_start'
-        ]
-
-        modeling_period_group_attrs = [
-            'id',
-        ]
-
-        period_attrs = [
-            'id',
-            'start_date',
-            'end_date',
-        ]
-
-        derivative_aggregation_identifiers = [
-            'trace_interpretation',
-            'interpretation',
-        ]
-
-        derivative_aggregation_attrs = [
-            'id',
-            'baseline_value',
-            'baseline_upper',
-            'baseline_lower',
-            'baseline_n',
-            'reporting_value',
-            'reporting_upper',
-            'reporting_lower',
-            'reporting_n',
-        ]
-
-        energy_trace_model_result_attrs = [
-            'id',
-            'energy_trace_id',
-            'modeling_period_id',
-            'status',
-            'r2',
-            'rmse',
-            'cvrmse',
-            'model_serializiation',
-            'upper',
-            'lower',
-            'n',
-        ]
-
-        resp = {}
-
-        project = project_result.project
-        for attr in project_attrs:
-            resp['project__' + attr] = getattr(project, attr)
-
-        for attr in project_result_attrs:
-            attr_name = ""
-            if isinstance(attr, tuple):
-                attribute = project_result
-                for attr_ in attr:
-                    if attribute is None:
-                        break
-                    attribute = getattr(attribute, attr_)
-                    attr_name += "__" + attr_
-                resp['project_result' + attr_name] = attribute
-            else:
-                resp['project_result__' + attr] = getattr(project_result, attr)
-
-        for attr in modeling_period_group_attrs:
-            resp['modeling_period_group__' + attr] = \
-                getattr(modeling_period_group, attr)
-
-        modeling_period_baseline = modeling_period_group.baseline_period
-        for attr in period_attrs:
-            resp['baseline_period__' + attr] = \
-                getattr(modeling_period_baseline, attr)
-
-        modeling_period_reporting = modeling_period_group.reporting_period
-        for attr in period_attrs:
-            resp['reporting_period__' + attr] = \
-                getattr(modeling_period_reporting, attr)
-
-        derivative_aggregations = project_result.derivative_aggregations \
-            .filter(modeling_period_group=modeling_period_group)\
-            .order_by('-trace_interpretation')\
-            .order_by('-interpretation')
-        for derivative_aggregation in derivative_aggregations:
-            prefix = 'derivative_aggregation__'
-            for attr in derivative_aggregation_identifiers:
-                prefix += getattr(derivative_aggregation, attr).lower() + '__'
-            for attr in derivative_aggregation_attrs:
-                resp[prefix + attr] = getattr(derivative_aggregation, attr)
-
-        energy_trace_model_results = project_result.energy_trace_model_results\
-            .order_by('energy_trace_id')\
-            .order_by('modeling_period_id')
-        for i, energy_trace_model_result in \
-                enumerate(energy_trace_model_results):
-            prefix = 'energy_trace_model_result-{}__'.format(i)
-            for attr in energy_trace_model_result_attrs:
-                resp[prefix + attr] = getattr(energy_trace_model_result, attr)
-
-        rows.append(resp)
-
-    return rows
-
-
-def projectresult_export():
-    project_results = models.ProjectResult.objects.all()\
-        .prefetch_related(
-            "project",
-            "derivative_aggregations",
-            "energy_trace_model_results",
-            "modeling_period_groups",
-            "modeling_period_groups__baseline_period",
-            "modeling_period_groups__reporting_period")\
-        .order_by('project', '-id').distinct('project')
-
-    projectresults_serialized = []
-    headers = set()
-    for pr in project_results:
-        serialized = serialize(pr)
-        for item in serialized:
-            headers.update(item.keys())
-        projectresults_serialized.extend(serialized)
+    def rows():
+        for i in range(0, len(project_result_ids), batch_size):
+            frame = _export_frame(project_result_ids[i:i + batch_size],
+                                  headers)
+            for values in frame.itertuples(index=False):
+                row = dict(zip(headers, values))
+                for column in integer_columns:
+                    row[column] = _format_integer(row[column])
+                yield row
 
     return {
-        'headers': sorted(headers),
-        'rows': projectresults_serialized,
+        'headers': headers,
+        'rows': rows(),
     }
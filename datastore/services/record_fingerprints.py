@@ -0,0 +1,170 @@
+from collections import defaultdict
+from datetime import timedelta
+import hashlib
+
+from django.db import connection, transaction
+import numpy as np
+import pandas as pd
+import pytz
+
+from datastore import models
+from .bulk_sync import (
+    bulk_sync_frame,
+    invalid_records_response,
+    success_response,
+)
+from .record_validation import validate_records
+
+FIELDS = ['start', 'value', 'estimated', 'metadata_id']
+KEYS = ['start', 'metadata_id']
+
+
+def fingerprint(starts, values, estimateds):
+    """ Digest of one day of a trace.
+
+    Parameters
+    ----------
+    starts : array of int64 nanoseconds since the epoch, in UTC
+    values : array of float, NaN where missing
+    estimateds : array of bool
+    """
+    order = np.argsort(starts, kind='mergesort')
+    values = np.asarray(values, dtype='<f8')[order]
+    values[np.isnan(values)] = np.nan  # one bit pattern for every NaN
+
+    digest = hashlib.sha1()
+    digest.update(np.asarray(starts).astype('<i8')[order].tobytes())
+    digest.update(values.tobytes())
+    digest.update(np.asarray(estimateds, dtype='u1')[order].tobytes())
+    return digest.hexdigest()
+
+
+def sync_consumption_records(records):
+    """
+    Upsert sync2 consumption records with `bulk_sync`, skipping whole UTC
+    days of a trace whose records are identical to those stored, as
+    recorded by `ConsumptionFingerprint`s. Fingerprints of the days written
+    are then recomputed from the stored records.
+
+    Parameters
+    ----------
+    records : list of dicts with `start`, `value`, `estimated` and
+        `metadata_id`
+
+    Returns
+    -------
+    (response, status) as for `bulk_sync`; the response includes the number
+    of `skipped` records.
+    """
+    if records is None or len(records) == 0:
+        response, status = success_response()
+        response["skipped"] = 0
+        return response, status
+
+    # Fingerprints are taken of the values as they would be loaded.
+    frame, errors = validate_records(records, FIELDS,
+                                     models.ConsumptionRecord)
+    if len(errors) > 0:
+        return invalid_records_response(errors)
+
+    groups = frame.groupby([frame.metadata_id, frame.start.dt.floor('D')])
+    days = []
+    unchanged = []
+    stored = _stored_fingerprints(groups.groups)
+    for n, ((metadata_id, day), group) in enumerate(groups):
+        day = (int(metadata_id), day.to_pydatetime())
+        days.append(day)
+
+        # the last record for a start wins, as in bulk_sync
+        group = group.drop_duplicates('start', keep='last')
+        digest = stored.get(day)
+        if digest is not None and digest == fingerprint(
+                _nanoseconds(group.start), group.value.values,
+                group.estimated.values):
+            unchanged.append(n)
+
+    changed = frame[~np.isin(groups.ngroup().values, unchanged)]
+
+    with transaction.atomic():
+        response, status = bulk_sync_frame(
+            changed, models.ConsumptionRecord, KEYS)
+        if status != 200:
+            transaction.set_rollback(True)
+            return response, status
+
+        _store_fingerprints(
+            set(days) - set(days[n] for n in unchanged))
+
+    response["skipped"] = len(frame) - len(changed)
+    return response, status
+
+
+def _stored_fingerprints(days):
+    """ Stored digests of `(metadata_id, day)`s, by `(metadata_id, day)`.
+    """
+    metadata_ids = set(int(metadata_id) for metadata_id, _ in days)
+    starts = set(day.to_pydatetime() for _, day in days)
+    return {
+        (metadata_id, start): digest
+        for metadata_id, start, digest in
+        models.ConsumptionFingerprint.objects.filter(
+            metadata_id__in=metadata_ids, start__in=starts,
+        ).values_list('metadata_id', 'start', 'digest')
+    }
+
+
+def _nanoseconds(starts):
+    """ int64 nanoseconds since the epoch of tz-aware UTC `starts`. """
+    return pd.DatetimeIndex(starts).tz_convert(None).values \
+        .astype('datetime64[ns]').view(np.int64)
+
+
+def _store_fingerprints(days):
+    """ Recompute the fingerprints of `(metadata_id, day)`s from the
+    records stored for them, with one trace load per metadata.
+    """
+    by_metadata = defaultdict(set)
+    for metadata_id, day in days:
+        by_metadata[metadata_id].add(day)
+
+    fingerprints = []
+    metadatas = models.ConsumptionMetadata.objects.filter(
+        pk__in=list(by_metadata))
+    for metadata in metadatas:
+        metadata_days = by_metadata[metadata.pk]
+        data = metadata.records_dataframe(
+            start=min(metadata_days),
+            end=max(metadata_days) + timedelta(days=1))
+        if len(data) == 0:
+            continue
+
+        index = data.index.tz_convert(pytz.UTC)
+        for day, group in data.groupby(index.floor('D')):
+            day = day.to_pydatetime()
+            if day not in metadata_days:
+                continue
+            fingerprints.append((
+                metadata.pk,
+                day,
+                fingerprint(_nanoseconds(group.index), group.value.values,
+                            group.estimated.values),
+            ))
+
+    _upsert_fingerprints(fingerprints)
+
+
+def _upsert_fingerprints(fingerprints):
+    """ Insert or replace `(metadata_id, start, digest)` fingerprints in one
+    statement, which concurrent syncs of the same days can't interleave.
+    """
+    if len(fingerprints) == 0:
+        return
+
+    table = models.ConsumptionFingerprint._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO {} (metadata_id, start, digest) VALUES {}"
+            " ON CONFLICT (metadata_id, start)"
+            " DO UPDATE SET digest = EXCLUDED.digest"
+            .format(table, ", ".join(["(%s, %s, %s)"] * len(fingerprints))),
+            [value for row in fingerprints for value in row])
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+DATETIME_TYPES = set(['DateTimeField', 'DateField'])
+FLOAT_TYPES = set(['FloatField', 'DecimalField'])
+INTEGER_TYPES = set([
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'ForeignKey',
+    'IntegerField', 'OneToOneField', 'PositiveIntegerField',
+    'PositiveSmallIntegerField', 'SmallIntegerField',
+])
+BOOLEAN_TYPES = set(['BooleanField', 'NullBooleanField'])
+
+# pandas 2 infers one format from the first value unless told to accept any
+# ISO 8601 string.
+TO_DATETIME_KWARGS = \
+    {'format': 'ISO8601'} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
+TRUE_VALUES = ['true', 't', '1', 'yes', 'y', 'on']
+FALSE_VALUES = ['false', 'f', '0', 'no', 'n', 'off']
+NULL_VALUES = ['none', 'nan', 'null', '']
+
+
+def validate_records(records, fields, model_class):
+    """
+    Check and coerce `records` a column at a time, as `bulk_sync` does
+    before loading them.
+
+    Each field is converted according to its model field type: datetimes
+    are parsed (naive times are taken as UTC), floats accept numbers,
+    numeric strings and NaN, integers and foreign keys must be whole
+    numbers, and booleans accept bools, 0/1 and strings such as "true" or
+    "f". Null values, including NaN floats, are only accepted by nullable
+    fields and are loaded as NULL.
+
+    Parameters
+    ----------
+    records: list of dicts
+    fields: list of field names, all required in every record
+    model_class: Django model class the fields belong to
+
+    Returns
+    -------
+    frame: pandas.DataFrame
+        Coerced values, one column per field, in order; only meaningful if
+        there are no errors.
+    errors: list of dicts
+        `{"index": i, "field": name, "message": ...}` for each invalid
+        value, ordered by index, where `i` is the position of the record in
+        `records`.
+    """
+    raw_frame = pd.DataFrame.from_records(records, columns=fields)
+    index = np.arange(len(records))
+    columns = []
+    errors = []
+
+    for name in fields:
+        field = model_class._meta.get_field(name)
+        raw = raw_frame[name]
+        column, null, invalid = _coerce(raw, field.get_internal_type())
+        if not field.null:
+            invalid |= null
+
+        # Missing fields are read as nulls; only those need a closer look.
+        missing = np.zeros(len(index), dtype=bool)
+        for i in index[null]:
+            missing[i] = name not in records[i]
+
+        for i in index[missing]:
+            errors.append((i, name, "missing field"))
+        for i in index[~missing & invalid & null]:
+            errors.append((i, name, "null value"))
+        for i in index[invalid & ~null]:
+            errors.append((i, name, u"invalid value: {}".format(raw[i])))
+
+        columns.append(column)
+
+    frame = pd.concat(columns, axis=1, keys=fields)
+    errors.sort(key=lambda error: error[0])
+    return frame, [
+        {"index": int(i), "field": name, "message": message}
+        for i, name, message in errors
+    ]
+
+
+def _coerce(raw, internal_type):
+    """ Coerced column, null mask and invalid (non-null) mask of `raw`.
+
+    Values are first converted in bulk; only those which fail are then
+    compared to the accepted strings.
+    """
+    null = np.array(raw.isnull())
+
+    if internal_type in DATETIME_TYPES:
+        column = pd.to_datetime(raw, utc=True, errors='coerce',
+                                **TO_DATETIME_KWARGS)
+        failed = column.isnull().values & ~null
+    elif internal_type in FLOAT_TYPES or internal_type in INTEGER_TYPES:
+        column = pd.to_numeric(raw, errors='coerce')
+        failed = column.isnull().values & ~null
+    elif internal_type in BOOLEAN_TYPES:
+        # matches True and False, and 1 and 0
+        column = pd.Series(np.where(null, None, raw.isin([True]).values),
+                           index=raw.index, dtype=object)
+        failed = ~raw.isin([True, False]).values & ~null
+    else:
+        # strings and other values are loaded as they are
+        return raw, null, np.zeros(len(raw), dtype=bool)
+
+    if failed.any():
+        lowered = raw[failed].astype(str).str.strip().str.lower()
+        null[failed] = lowered.isin(NULL_VALUES).values
+        if internal_type in BOOLEAN_TYPES:
+            true = lowered.isin(TRUE_VALUES).values
+            false = lowered.isin(FALSE_VALUES).values
+            column[failed] = np.where(true, True,
+                                      np.where(false, False, None))
+            failed[failed] = ~(true | false)
+    invalid = failed & ~null
+
+    if internal_type in INTEGER_TYPES:
+        invalid |= ~null & (column.fillna(0) % 1 != 0).values
+        if not (invalid | null).any():
+            column = column.astype(np.int64)
+
+    return column, null, invalid
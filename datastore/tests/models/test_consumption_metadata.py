@@ -3,8 +3,13 @@ from django.contrib.auth.models import User
 
 from datastore import models
 
+from eemeter.io.serializers import ArbitraryStartSerializer
 from eemeter.structures import EnergyTrace
 
+from datetime import datetime, timedelta
+import numpy as np
+import pytz
+
 
 class ConsumptionMetadataTestCase(TestCase):
 
@@ -35,3 +40,141 @@ class ConsumptionMetadataTestCase(TestCase):
     def test_eemeter_consumption_data(self):
         trace = self.consumptionmetadata.eemeter_consumption_data()
         assert isinstance(trace, EnergyTrace)
+
+    def test_records_dataframe(self):
+        start = datetime(2011, 1, 1, tzinfo=pytz.UTC)
+        models.ConsumptionRecord.objects.bulk_create([
+            models.ConsumptionRecord(
+                metadata=self.consumptionmetadata,
+                start=start + timedelta(days=i),
+                value=(None if i == 1 else float(i)),
+                estimated=(i == 2),
+            )
+            for i in range(3)
+        ])
+
+        data = self.consumptionmetadata.records_dataframe()
+        assert list(data.columns) == ['value', 'estimated']
+        assert data.index[0] == start
+        assert str(data.index.tz) == 'UTC'
+        assert data.value[0] == 0.0
+        assert np.isnan(data.value[1])
+        assert list(data.estimated) == [False, False, True]
+
+        trace = self.consumptionmetadata.eemeter_consumption_data()
+        assert trace.data.shape == (3, 2)
+
+        data = self.consumptionmetadata.records_dataframe(
+            start=start + timedelta(days=1), end=start + timedelta(days=2))
+        assert list(data.index) == [start + timedelta(days=1)]
+
+    def test_eemeter_consumption_data_matches_serializer(self):
+        start = datetime(2011, 1, 1, tzinfo=pytz.UTC)
+        models.ConsumptionRecord.objects.bulk_create([
+            models.ConsumptionRecord(
+                metadata=self.consumptionmetadata,
+                start=start + timedelta(days=i),
+                value=(None if i == 1 else float(i)),
+                estimated=(i >= 2),
+            )
+            for i in range(4)
+        ])
+
+        trace = self.consumptionmetadata.eemeter_consumption_data()
+        expected = EnergyTrace(
+            "ELECTRICITY_CONSUMPTION_SUPPLIED",
+            records=[
+                r.eemeter_record()
+                for r in self.consumptionmetadata.records.all()
+            ],
+            unit="KWH",
+            serializer=ArbitraryStartSerializer(),
+        )
+
+        assert list(trace.data.index) == list(expected.data.index)
+        np.testing.assert_array_equal(trace.data.value.values,
+                                      expected.data.value.values)
+        assert list(trace.data.estimated) == list(expected.data.estimated)
+        # the last record closes the trace
+        assert np.isnan(trace.data.value.values[-1])
+        assert not trace.data.estimated.values[-1]
+
+    def test_records_dataframe_empty(self):
+        data = self.consumptionmetadata.records_dataframe()
+        assert data.shape == (0, 2)
+
+    def test_compact_records(self):
+        start = datetime(2011, 1, 31, 22, tzinfo=pytz.UTC)
+        models.ConsumptionRecord.objects.bulk_create([
+            models.ConsumptionRecord(
+                metadata=self.consumptionmetadata,
+                start=start + timedelta(hours=i),
+                value=(None if i == 1 else float(i)),
+                estimated=(i == 2),
+            )
+            for i in range(5) if i != 3
+        ])
+        data = self.consumptionmetadata.records_dataframe()
+
+        self.consumptionmetadata.compact_records(3600, 'month')
+
+        assert self.consumptionmetadata.records.count() == 0
+        assert self.consumptionmetadata.record_chunks.count() == 2
+        assert self.consumptionmetadata.records_dataframe().equals(data)
+
+        # records synced later are read along with, and override, chunks
+        models.ConsumptionRecord.objects.create(
+            metadata=self.consumptionmetadata,
+            start=start, value=10.0, estimated=False)
+        data = self.consumptionmetadata.records_dataframe()
+        assert list(data.value.fillna(-1)) == [10.0, -1, 2.0, 4.0]
+
+        data = self.consumptionmetadata.records_dataframe(
+            start=start + timedelta(hours=2), end=start + timedelta(hours=4))
+        assert list(data.index) == [start + timedelta(hours=2)]
+
+        # compacted records are served, with no id, after those stored as
+        # rows
+        records = self.consumptionmetadata.all_records()
+        assert [record.start for record in records] == [
+            start + timedelta(hours=i) for i in [0, 1, 2, 4]]
+        assert [record.id is None for record in records] == \
+            [False, True, True, True]
+        assert 'n=4' in str(self.consumptionmetadata)
+
+    def test_chunks_dataframe_limit(self):
+        start = datetime(2011, 1, 1, tzinfo=pytz.UTC)
+        models.ConsumptionRecord.objects.bulk_create([
+            models.ConsumptionRecord(
+                metadata=self.consumptionmetadata,
+                start=start + timedelta(hours=i),
+                value=float(i), estimated=False)
+            for i in range(24 * 10)
+        ])
+        self.consumptionmetadata.compact_records(3600, 'day')
+        data = self.consumptionmetadata.chunks_dataframe()
+        assert len(data) == 24 * 10
+
+        # 4 chunks a query
+        with self.assertNumQueries(1):
+            limited = self.consumptionmetadata.chunks_dataframe(limit=30)
+        assert limited.equals(data[:30])
+        with self.assertNumQueries(2):
+            limited = self.consumptionmetadata.chunks_dataframe(limit=100)
+        assert limited.equals(data[:100])
+
+        limited = self.consumptionmetadata.chunks_dataframe(
+            start=start + timedelta(hours=50), limit=5)
+        assert limited.equals(data[50:55])
+        assert self.consumptionmetadata.chunks_dataframe(
+            limit=1000).equals(data)
+
+    def test_compact_records_misaligned(self):
+        models.ConsumptionRecord.objects.create(
+            metadata=self.consumptionmetadata,
+            start=datetime(2011, 1, 1, 0, 5, tzinfo=pytz.UTC),
+            value=1.0, estimated=False)
+
+        with self.assertRaises(ValueError):
+            self.consumptionmetadata.compact_records(900)
+        assert self.consumptionmetadata.records.count() == 1
@@ -1,5 +1,7 @@
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.db import connection
 
 from datetime import datetime
 import tempfile
@@ -11,6 +13,7 @@ from eemeter.testing.mocks import MockWeatherClient
 from eemeter.weather import TMY3WeatherSource, ISDWeatherSource
 import pytz
 
+from datastore.models import ProjectResult, ProjectResultWriter
 from datastore.services import create_project
 
 
@@ -140,3 +143,54 @@ class ProjectTestCase(TestCase):
         assert len(project_result.energy_trace_model_results.all()) == 12
         assert len(project_result.modeling_periods.all()) == 2
         assert len(project_result.modeling_period_groups.all()) == 1
+
+    def test_project_result_writer_bulk(self):
+        meter = self.project._get_meter('EnergyEfficiencyMeter')
+        results = meter.evaluate(
+            self.project.eemeter_project(),
+            weather_source=self.weather_source,
+            weather_normal_source=self.weather_normal_source)
+
+        with CaptureQueriesContext(connection) as serial_queries:
+            serial = ProjectResultWriter(self.project, results)\
+                .save(bulk=False)
+
+        with CaptureQueriesContext(connection) as bulk_queries:
+            bulk = ProjectResultWriter(self.project, results).save()
+
+        assert len(bulk_queries) < 20
+        assert len(bulk_queries) < len(serial_queries)
+
+        for related in ['modeling_periods', 'modeling_period_groups',
+                        'energy_trace_model_results',
+                        'derivative_aggregations']:
+            assert getattr(bulk, related).count() == \
+                getattr(serial, related).count()
+
+        group = bulk.modeling_period_groups.get()
+        assert group.baseline_period.project_result_id == bulk.pk
+        assert group.derivative_aggregations.count() == 8
+
+    def test_latest_project_result(self):
+        first = self.project.project_results.order_by('pk').last()
+        second = self.project.run_meter(
+            weather_source=self.weather_source,
+            weather_normal_source=self.weather_normal_source)
+
+        self.project.refresh_from_db()
+        assert self.project.latest_project_result_id == second.pk
+
+        # an older result doesn't displace a newer one
+        self.project.set_latest_project_result(first)
+        self.project.refresh_from_db()
+        assert self.project.latest_project_result_id == second.pk
+
+        second.delete()
+        self.project.refresh_from_db()
+        assert self.project.latest_project_result_id == first.pk
+
+    def test_latest_project_result_on_save(self):
+        project_result = ProjectResult.objects.create(
+            project=self.project)
+        self.project.refresh_from_db()
+        assert self.project.latest_project_result_id == project_result.pk
@@ -90,3 +90,7 @@ class DiagnosticExportServiceTestCase(TestCase):
                    '-ELECTRICITY_ON_SITE_GENERATION_UNCONSUMED'] == 1
         assert row['consumption_metadata_count'
                    '-NATURAL_GAS_CONSUMPTION_SUPPLIED'] == 1
+
+    def test_constant_query_count(self):
+        with self.assertNumQueries(4):
+            diagnostic_export()
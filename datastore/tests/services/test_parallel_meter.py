@@ -0,0 +1,63 @@
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import User
+
+from datetime import datetime
+
+import pytz
+
+from datastore import models
+from datastore.services import create_project, run_meters_parallel
+from datastore.services.parallel_meter import _run_project
+
+
+class ParallelMeterServiceTestCase(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(
+            'john', 'lennon@thebeatles.com', 'johnpassword')
+
+        self.project = create_project(spec={
+            "project_id": "GHIJ",
+            "project_owner": user.projectowner,
+            "baseline_period_end": datetime(2012, 1, 1, tzinfo=pytz.UTC),
+            "reporting_period_start": datetime(2012, 2, 1, tzinfo=pytz.UTC),
+            "zipcode": "91104",
+            "traces": [],
+        })
+
+    def test_run_project_records_failure(self):
+        project_run = _run_project((self.project.pk, 'NotAMeter', None))
+        assert project_run.project_id == self.project.pk
+        assert project_run.status == 'FAILED'
+        assert 'NotAMeter' in project_run.traceback
+
+
+class RunMetersParallelTestCase(TransactionTestCase):
+    """ Workers are separate processes with their own connections, so the
+    projects must be committed for them to see. """
+
+    def setUp(self):
+        user = User.objects.create_user(
+            'john', 'lennon@thebeatles.com', 'johnpassword')
+        self.projects = [
+            create_project(spec={
+                "project_id": project_id,
+                "project_owner": user.projectowner,
+                "baseline_period_end": datetime(2012, 1, 1, tzinfo=pytz.UTC),
+                "reporting_period_start": datetime(2012, 2, 1,
+                                                   tzinfo=pytz.UTC),
+                "zipcode": "91104",
+                "traces": [],
+            })
+            for project_id in ["ABC", "DEF", "GHI"]
+        ]
+
+    def test_run_meters_parallel(self):
+        project_pks = [project.pk for project in self.projects]
+        project_runs = list(run_meters_parallel(
+            project_pks, 2, meter_class='NotAMeter'))
+
+        assert sorted(run.project_id for run in project_runs) == project_pks
+        assert all(run.status == 'FAILED' for run in project_runs)
+        assert models.ProjectRun.objects.filter(
+            project__in=project_pks, status='FAILED').count() == 3
@@ -0,0 +1,123 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TransactionTestCase
+
+from datastore import models
+from datastore.services import sync_consumption_records
+from datastore.services.parallel_sync import (
+    ConnectionPool, parallel_sync, partition_records,
+)
+
+
+class ParallelSyncServiceTestCase(SimpleTestCase):
+
+    records = [
+        {"metadata_id": 1, "value": 0},
+        {"metadata_id": 2, "value": 1},
+        {"metadata_id": "1", "value": 2},
+        {"metadata_id": 3, "value": 3},
+        {"metadata_id": 1, "value": 4},
+    ]
+
+    def test_partition_records(self):
+        chunks = partition_records(self.records, 'metadata_id', 2)
+        assert sorted(len(chunk) for chunk in chunks) == [2, 3]
+        # all records of a trace in one chunk, in their original order
+        assert [r["value"] for r in chunks[0]] == [0, 2, 4]
+
+        assert len(partition_records(self.records, 'metadata_id', 8)) == 3
+        assert partition_records([], 'metadata_id', 4) == []
+
+    def test_parallel_sync_merges_responses(self):
+        threads = set()
+
+        def sync(records):
+            threads.add(threading.current_thread().ident)
+            return {"status": "success", "skipped": len(records)}, 200
+
+        response, status = parallel_sync(self.records, sync, n_connections=3)
+        assert status == 200
+        assert response == {"status": "success", "skipped": 5}
+        assert threading.current_thread().ident not in threads
+
+    def test_parallel_sync_reports_failed_chunks(self):
+        def sync(records):
+            if records[0]["metadata_id"] == 2:
+                return {"status": "error", "message": "bad"}, 400
+            return {"status": "success"}, 200
+
+        response, status = parallel_sync(self.records, sync, n_connections=3)
+        assert status == 400
+        assert response["message"] == "1 of 3 chunks failed: bad"
+
+    def test_parallel_sync_single_connection(self):
+        calls = []
+
+        def sync(records):
+            calls.append(records)
+            return {"status": "success"}, 200
+
+        parallel_sync(self.records, sync, n_connections=1)
+        assert calls == [self.records]
+
+    def test_parallel_sync_reindexes_errors(self):
+        def sync(records):
+            errors = [
+                {"index": i, "field": "value", "message": "invalid"}
+                for i, record in enumerate(records) if record["value"] >= 3
+            ]
+            if len(errors) > 0:
+                return {"status": "error", "message": "bad",
+                        "errors": errors}, 400
+            return {"status": "success"}, 200
+
+        response, status = parallel_sync(self.records, sync, n_connections=3)
+        assert [error["index"] for error in response["errors"]] == [3, 4]
+
+
+class ParallelSyncDatabaseTestCase(TransactionTestCase):
+    """ Chunks are committed on the pool's own connections, so this can't
+    run inside a test transaction. """
+
+    def setUp(self):
+        user = User.objects.create_user(
+            'john', 'lennon@thebeatles.com', 'johnpassword')
+        project = models.Project.objects.create(
+            project_owner=user.projectowner, project_id="ABC")
+        self.metadata_ids = [
+            models.ConsumptionMetadata.objects.create(
+                project=project, interpretation=interpretation,
+                unit="KWH").pk
+            for interpretation in ["E_C_S", "E_C_T", "E_OSG_U"]
+        ]
+
+    def records(self, day, value):
+        return [
+            {
+                "metadata_id": metadata_id,
+                "start": "2016-01-{:02d}T{:02d}:00:00+00:00".format(day, hour),
+                "value": value,
+                "estimated": False,
+            }
+            for metadata_id in self.metadata_ids
+            for hour in range(24)
+        ]
+
+    def test_parallel_sync_over_pool(self):
+        with ConnectionPool(2) as pool:
+            for day in [1, 2]:
+                response, status = parallel_sync(
+                    self.records(day, 1.0), sync_consumption_records,
+                    pool=pool)
+                assert status == 200
+                assert response["skipped"] == 0
+
+            # unchanged days are skipped, whichever connection syncs them
+            response, status = parallel_sync(
+                self.records(1, 1.0), sync_consumption_records, pool=pool)
+            assert response["skipped"] == 72
+
+        for metadata_id in self.metadata_ids:
+            assert models.ConsumptionRecord.objects.filter(
+                metadata_id=metadata_id).count() == 48
@@ -0,0 +1,49 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from datastore.services import iterate_project_pks, iterate_projects
+from datastore import models
+
+
+class ProjectIteratorServiceTestCase(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(
+            'john', 'lennon@thebeatles.com', 'johnpassword')
+
+        self.projects = [
+            models.Project.objects.create(
+                project_owner=user.projectowner,
+                project_id="PROJECT_{}".format(i),
+            )
+            for i in range(5)
+        ]
+
+        models.ConsumptionMetadata.objects.create(
+            project=self.projects[0],
+            interpretation="E_C_S",
+            unit="KWH",
+        )
+
+    def test_basic_usage(self):
+        projects = list(iterate_projects(chunk_size=2))
+        assert [p.pk for p in projects] == [p.pk for p in self.projects]
+
+    def test_queryset(self):
+        queryset = models.Project.objects.filter(
+            project_id__in=["PROJECT_1", "PROJECT_3"])
+        projects = list(iterate_projects(queryset, chunk_size=1))
+        assert [p.project_id for p in projects] == ["PROJECT_1", "PROJECT_3"]
+
+    def test_prefetches_consumption_metadata(self):
+        projects = iterate_projects(chunk_size=10)
+        project = next(projects)
+        with self.assertNumQueries(0):
+            assert len(project.consumptionmetadata_set.all()) == 1
+
+    def test_project_pks(self):
+        queryset = models.Project.objects.exclude(project_id="PROJECT_2")
+        with self.assertNumQueries(3):
+            pks = list(iterate_project_pks(queryset, chunk_size=2))
+        assert pks == [
+            p.pk for p in self.projects if p.project_id != "PROJECT_2"]
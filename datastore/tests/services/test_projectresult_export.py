@@ -5,6 +5,7 @@ from datetime import datetime
 
 import pytz
 
+from datastore import models
 from datastore.services import create_project, projectresult_export
 
 
@@ -54,10 +55,50 @@ class ExportServiceTestCase(TestCase):
             ],
         })
         project.run_meter()
+        self.project = project
 
     def test_export(self):
         result = projectresult_export()
         headers = result['headers']
         assert len(headers) == 154
-        project_results = result['rows']
+        project_results = list(result['rows'])
         assert len(project_results) == 1
+        assert set(project_results[0].keys()) == set(headers)
+
+    def test_integer_columns(self):
+        result = projectresult_export()
+        row = next(result['rows'])
+        integer_columns = [
+            column for column in result['headers']
+            if column.endswith(('__id', 'baseline_n', 'reporting_n'))
+        ]
+        assert len(integer_columns) > 0
+        for column in integer_columns:
+            assert row[column] is None or isinstance(row[column], int)
+
+    def test_null_dates(self):
+        # a second group, whose periods have every date
+        project_result = self.project.project_results.get()
+        periods = [
+            models.ModelingPeriod.objects.create(
+                project_result=project_result, interpretation=interpretation,
+                start_date=datetime(2012, month, 1, tzinfo=pytz.UTC),
+                end_date=datetime(2012, month + 1, 1, tzinfo=pytz.UTC))
+            for interpretation, month in [('BASELINE', 1), ('REPORTING', 2)]
+        ]
+        models.ModelingPeriodGroup.objects.create(
+            project_result=project_result, baseline_period=periods[0],
+            reporting_period=periods[1])
+
+        rows = list(projectresult_export()['rows'])
+        assert len(rows) == 2
+        assert rows[0]['baseline_period__start_date'] is None
+        assert rows[1]['baseline_period__start_date'] == \
+            datetime(2012, 1, 1, tzinfo=pytz.UTC)
+
+    def test_constant_query_count(self):
+        # columns (2), project result ids (1), then 4 per batch
+        with self.assertNumQueries(3):
+            result = projectresult_export()
+        with self.assertNumQueries(4):
+            list(result['rows'])
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from django.test import SimpleTestCase
+import numpy as np
+import pytz
+
+from datastore.models import ConsumptionRecord
+from datastore.services.record_validation import validate_records
+
+FIELDS = ['start', 'value', 'estimated', 'metadata_id']
+
+
+class RecordValidationTestCase(SimpleTestCase):
+
+    def test_validate_records_coerces_values(self):
+        frame, errors = validate_records([
+            {"start": "2014-01-01T00:00:00+00:00", "value": 1.5,
+             "estimated": True, "metadata_id": 1},
+            {"start": "2014-01-01T01:00:00-05:00", "value": "NaN",
+             "estimated": "f", "metadata_id": "2"},
+            {"start": "2014-01-01T02:00:00", "value": None,
+             "estimated": 0, "metadata_id": 3},
+        ], FIELDS, ConsumptionRecord)
+
+        assert errors == []
+        assert list(frame.columns) == FIELDS
+        assert frame.start[1].to_pydatetime() == \
+            datetime(2014, 1, 1, 6, tzinfo=pytz.UTC)
+        assert frame.start[2].to_pydatetime() == \
+            datetime(2014, 1, 1, 2, tzinfo=pytz.UTC)
+        assert frame.value[0] == 1.5
+        assert np.isnan(frame.value[1]) and np.isnan(frame.value[2])
+        assert list(frame.estimated) == [True, False, False]
+        assert list(frame.metadata_id) == [1, 2, 3]
+
+    def test_validate_records_reports_errors_by_index(self):
+        valid = {"start": "2014-01-01T00:00:00+00:00", "value": 1.0,
+                 "estimated": False, "metadata_id": 1}
+        _, errors = validate_records([
+            valid,
+            dict(valid, start="foo", estimated="maybe"),
+            {"value": 1.0, "estimated": False, "metadata_id": 1},
+            dict(valid, metadata_id=None),
+            dict(valid, metadata_id=1.5),
+        ], FIELDS, ConsumptionRecord)
+
+        assert errors == [
+            {"index": 1, "field": "start",
+             "message": "invalid value: foo"},
+            {"index": 1, "field": "estimated",
+             "message": "invalid value: maybe"},
+            {"index": 2, "field": "start", "message": "missing field"},
+            {"index": 3, "field": "metadata_id", "message": "null value"},
+            {"index": 4, "field": "metadata_id",
+             "message": "invalid value: 1.5"},
+        ]
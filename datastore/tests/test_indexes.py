@@ -0,0 +1,24 @@
+from django.db import connection
+from django.test import TransactionTestCase
+
+from datastore import indexes
+
+
+class IndexesTestCase(TransactionTestCase):
+    """ Indexes are built concurrently, which can't be done in a
+    transaction. """
+
+    def test_brin_index(self):
+        indexes.create_brin_index()
+        indexes.create_brin_index()  # already exists
+        indexes.drop_brin_index()
+
+    def test_covering_index(self):
+        if connection.pg_version < 110000:
+            with self.assertRaises(ValueError):
+                indexes.create_covering_index()
+            return
+
+        indexes.create_covering_index()
+        assert 'INCLUDE' in indexes.unique_constraint()[1]
+        assert not indexes.create_covering_index()
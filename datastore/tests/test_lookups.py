@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from datastore import lookups, models
+from datastore.lookups import ForeignKeyCache
+
+
+class ForeignKeyCacheTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("username", "user@example.com",
+                                        "123456")
+        cls.project_a = models.Project.objects.create(
+            project_owner=user.projectowner, project_id="A")
+        cls.project_b = models.Project.objects.create(
+            project_owner=user.projectowner, project_id="B")
+        cls.cm = models.ConsumptionMetadata.objects.create(
+            project=cls.project_a, interpretation="E_C_S", unit="KWH")
+
+    def setUp(self):
+        lookups.project_cache.clear()
+        lookups.consumption_metadata_cache.clear()
+
+    def test_fetches_missing_keys_once(self):
+        cache = lookups.project_cache
+
+        with self.assertNumQueries(1):
+            found = cache.get_many(["A", "B", "C"])
+        assert found == {"A": self.project_a, "B": self.project_b}
+
+        with self.assertNumQueries(0):
+            found = cache.get_many(["A", "B"])
+        assert found == {"A": self.project_a, "B": self.project_b}
+
+        # misses aren't cached
+        with self.assertNumQueries(1):
+            assert cache.get_many(["C"]) == {}
+
+    def test_composite_key(self):
+        found = lookups.consumption_metadata_cache.get_many(
+            [("A", "E_C_S"), ("A", "NG_C_S"), ("B", "E_C_S")])
+        assert found == {("A", "E_C_S"): self.cm}
+
+    def test_invalidated_on_change(self):
+        cache = lookups.consumption_metadata_cache
+        cache.get_many([("A", "E_C_S")])
+
+        # saving a project clears caches depending on projects
+        self.project_b.save()
+        with self.assertNumQueries(1):
+            cache.get_many([("A", "E_C_S")])
+
+        self.cm.delete()
+        assert cache.get_many([("A", "E_C_S")]) == {}
+
+    def test_bounded(self):
+        cache = ForeignKeyCache(models.Project.objects.order_by('pk'),
+                                'project_id', 1, 60)
+        cache.get_many(["A", "B"])
+        assert len(cache._objects) == 1
+
+    def test_expires(self):
+        cache = ForeignKeyCache(models.Project.objects.order_by('pk'),
+                                'project_id', 10, 0)
+        cache.get_many(["A"])
+
+        # changes which weren't signalled in this process are seen once the
+        # cache has expired
+        models.Project.objects.filter(pk=self.project_a.pk) \
+            .update(zipcode="91104")
+        with self.assertNumQueries(1):
+            found = cache.get_many(["A"])
+        assert found["A"].zipcode == "91104"
@@ -0,0 +1,50 @@
+from io import BytesIO
+
+from django.test import TestCase
+from rest_framework.exceptions import ParseError
+
+from datastore.parsers import JSONArrayStream
+
+
+def parse(body, chunk_size=4):
+    return list(JSONArrayStream(BytesIO(body.encode('utf-8')),
+                                chunk_size=chunk_size))
+
+
+class JSONArrayStreamTestCase(TestCase):
+
+    def test_array_across_chunks(self):
+        body = '[{"start": "2014-01-01", "value": 1.5}, 12345, "é", null]'
+        assert parse(body) == [
+            {"start": "2014-01-01", "value": 1.5}, 12345, u"é", None]
+        assert parse(body, chunk_size=1) == parse(body, chunk_size=1024)
+
+    def test_numbers_across_chunks(self):
+        body = '[1.5, 2e3, -0.25E-2, 10, true]'
+        for chunk_size in range(1, 8):
+            assert parse(body, chunk_size=chunk_size) == \
+                [1.5, 2000.0, -0.0025, 10, True]
+
+    def test_whitespace_and_empty(self):
+        assert parse(' [ ] ') == []
+        assert parse('') == []
+        assert parse('\n[ 1 ,\n 2 ]\n') == [1, 2]
+
+    def test_single_object(self):
+        assert parse('{"value": 1}') == [{"value": 1}]
+
+    def test_lazy(self):
+        records = iter(JSONArrayStream(BytesIO(b'[1, 2, oops]'),
+                                       chunk_size=2))
+        assert next(records) == 1
+        assert next(records) == 2
+        with self.assertRaises(ParseError):
+            next(records)
+
+    def test_missing_separator(self):
+        with self.assertRaises(ParseError):
+            parse('[1 2]')
+
+    def test_truncated(self):
+        with self.assertRaises(ParseError):
+            parse('[{"value": 1}, {"val')
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.test import TestCase
+import pytz
+
+from datastore import partitioning
+
+
+class PartitioningTestCase(TestCase):
+
+    def test_unpartitioned(self):
+        assert partitioning.partition_scheme() is None
+
+        with self.assertRaises(ValueError):
+            partitioning.create_range_partitions(
+                datetime(2016, 1, 1), datetime(2016, 12, 31))
+
+    def test_interval_bounds(self):
+        bounds = partitioning.interval_bounds(
+            datetime(2015, 11, 20, tzinfo=pytz.UTC),
+            datetime(2016, 1, 1, tzinfo=pytz.UTC), 'month')
+        assert [lower.month for lower, _ in bounds] == [11, 12, 1]
+        assert bounds[-1][1] == datetime(2016, 2, 1, tzinfo=pytz.UTC)
+
+        bounds = partitioning.interval_bounds(
+            datetime(2015, 11, 20), datetime(2016, 6, 1), 'year')
+        assert bounds == [
+            (datetime(2015, 1, 1, tzinfo=pytz.UTC),
+             datetime(2016, 1, 1, tzinfo=pytz.UTC)),
+            (datetime(2016, 1, 1, tzinfo=pytz.UTC),
+             datetime(2017, 1, 1, tzinfo=pytz.UTC)),
+        ]
+
+    def test_partition_name(self):
+        lower = datetime(2016, 3, 1, tzinfo=pytz.UTC)
+        assert partitioning.partition_name(lower, 'month') == \
+            'datastore_consumptionrecord_y2016m03'
+        assert partitioning.partition_name(lower, 'year') == \
+            'datastore_consumptionrecord_y2016'
@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from datastore.weather import WeatherSourceCache
+
+
+class WeatherSourceCacheTestCase(TestCase):
+
+    def test_hits_and_misses(self):
+        cache = WeatherSourceCache(2)
+
+        assert cache.get('A', lambda: 1) == 1
+        assert cache.get('A', lambda: 2) == 1
+        assert cache.get('B', lambda: 3) == 3
+
+        assert cache.stats() == {
+            'hits': 1,
+            'misses': 2,
+            'size': 2,
+            'maxsize': 2,
+        }
+
+    def test_evicts_least_recently_used(self):
+        cache = WeatherSourceCache(2)
+
+        cache.get('A', lambda: 1)
+        cache.get('B', lambda: 2)
+        cache.get('A', lambda: 1)
+        cache.get('C', lambda: 3)
+
+        assert cache.get('A', lambda: None) == 1
+        assert cache.get('B', lambda: None) is None
+        assert cache.stats()['size'] == 2
+
+    def test_clear(self):
+        cache = WeatherSourceCache(2)
+        cache.get('A', lambda: 1)
+        cache.clear()
+        assert cache.stats() == {
+            'hits': 0,
+            'misses': 0,
+            'size': 0,
+            'maxsize': 2,
+        }
+
+    def test_station_without_data(self):
+        calls = []
+
+        def source_class(station):
+            calls.append(station)
+            raise ValueError("No data for station {}".format(station))
+
+        cache = WeatherSourceCache(2)
+
+        def factory():
+            return cache._create(source_class, '722880')
+
+        assert cache.get(('ISD', '722880'), factory) is None
+        assert cache.get(('ISD', '722880'), factory) is None
+        assert calls == ['722880']
@@ -173,6 +173,6 @@ class OAuthTestCase(TestCase):
                                 content_type="application/json",
                                 Authorization="Bearer " + "tokstr")
 
-    def get(self, url, data=None):
+    def get(self, url, data=None, **extra):
         return self.client.get(
-            url, Authorization="Bearer " + "tokstr", data=data)
+            url, Authorization="Bearer " + "tokstr", data=data, **extra)
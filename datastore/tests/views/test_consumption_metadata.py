@@ -1,3 +1,7 @@
+from io import BytesIO
+
+import numpy as np
+
 from .shared import OAuthTestCase
 
 
@@ -33,3 +37,101 @@ class ConsumptionMetadataAPITestCase(OAuthTestCase):
         assert response.data['interpretation'] == 'E_C_S'
         assert response.data['project'] is None
         assert response.data['records'] == []
+
+    def test_consumption_metadata_read_columnar(self):
+        response = self.get(
+            '/api/v1/consumption_metadatas/{}/'.format(self.cm_e.pk),
+            {"records_format": "columnar"})
+
+        assert response.status_code == 200
+        records = response.data['records']
+        assert records['start'] == '2011-12-01T00:00:00Z'
+        assert records['freq_seconds'] == 900
+        assert len(records['value']) == 6000
+        assert records['value'][:2] == [None, 1.0]
+        assert records['estimated'][0] is False
+        assert 'starts' not in records
+
+        # same readings as the default representation
+        response = self.get(
+            '/api/v1/consumption_metadatas/{}/'.format(self.cm_e.pk))
+        assert [r['value'] for r in response.data['records']] == \
+            records['value']
+
+    def test_consumption_metadata_trace(self):
+        url = '/api/v1/consumption_metadatas/{}/trace/'.format(self.cm_e.pk)
+
+        # 15-minute readings from 2011-12-01, every fourth one missing
+        response = self.get(url, {
+            "start": "2011-12-01T00:00:00Z",
+            "end": "2011-12-03T00:00:00Z",
+            "freq": "D",
+            "aggregation": "sum",
+        })
+        assert response.status_code == 200
+        assert response.data['starts'] == [
+            '2011-12-01T00:00:00Z', '2011-12-02T00:00:00Z']
+        assert response.data['value'] == [72.0, 72.0]
+
+        response = self.get(url, {"freq": "H", "aggregation": "count",
+                                  "end": "2011-12-01T02:00:00Z"})
+        assert response.data['value'] == [3, 3]
+
+        response = self.get(url, {"freq": "fortnightly"})
+        assert response.status_code == 400
+        # labelled by interval end
+        response = self.get(url, {"freq": "M"})
+        assert response.status_code == 400
+        response = self.get(url, {"aggregation": "median"})
+        assert response.status_code == 400
+        # over TRACE_MAX_INTERVALS intervals
+        response = self.get(url, {"freq": "1S"})
+        assert response.status_code == 400
+        with self.settings(TRACE_MAX_INTERVALS=24):
+            response = self.get(url, {"freq": "H",
+                                      "end": "2011-12-02T00:00:00Z"})
+            assert len(response.data['starts']) == 24
+            response = self.get(url, {"freq": "H",
+                                      "end": "2011-12-02T00:15:00Z"})
+            assert response.status_code == 400
+
+    def test_consumption_metadata_read_npy(self):
+        response = self.get(
+            '/api/v1/consumption_metadatas/{}/'.format(self.cm_ng.pk),
+            HTTP_ACCEPT='application/x-npy')
+        assert response.status_code == 200
+
+        records = np.load(BytesIO(response.content), allow_pickle=False)
+        assert records.dtype.names == (
+            'metadata_id', 'start', 'value', 'estimated')
+        assert len(records) == 24
+        assert records['start'].dtype == np.dtype('datetime64[us]')
+
+    def test_consumption_metadata_list_npy(self):
+        def read_pages():
+            pages = []
+            url = '/api/v1/consumption_metadatas/'
+            data = {"project": self.project2.pk, "format": "npy",
+                    "page_size": 1}
+            while url is not None:
+                response = self.get(url, data)
+                assert response.status_code == 200
+                pages.append(np.load(BytesIO(response.content),
+                                     allow_pickle=False))
+                link = response.get('Link')
+                url = link[1:link.index('>')] if link is not None else None
+                data = None
+            return pages
+
+        pages = read_pages()
+        assert [set(page['metadata_id']) for page in pages] == \
+            [{self.cm_ng.pk}, {self.cm_e.pk}]
+        assert [len(page) for page in pages] == [24, 6000]
+
+        # compacted records are included
+        self.cm_e.compact_records(900)
+        compacted = read_pages()
+        assert len(compacted[1]) == 6000
+        assert (compacted[1]['start'] == pages[1]['start']).all()
+        np.testing.assert_array_equal(compacted[1]['value'],
+                                      pages[1]['value'])
@@ -1,6 +1,14 @@
+from datetime import datetime
+from io import BytesIO
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import numpy as np
+import pytz
+
 from .shared import OAuthTestCase
 
-from datastore import models
+from datastore import models, partitioning, views
 
 
 class ConsumptionRecordAPITestCase(OAuthTestCase):
@@ -41,6 +49,21 @@ class ConsumptionRecordAPITestCase(OAuthTestCase):
         assert response.data[0]['metadata'] == cm_id
         assert response.data[1]['metadata'] == cm_id
 
+    def test_consumption_record_sync_concurrent_create(self):
+        # created by another sync after this one looked it up
+        start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+        existing = models.ConsumptionRecord.objects.create(
+            metadata=self.cm_e, start=start, value=1.0, estimated=False)
+
+        record = models.ConsumptionRecord(
+            metadata=self.cm_e, start=start, value=2.0, estimated=True)
+        errors = views.ConsumptionRecordViewSet()._save_objects([record])
+        assert errors == {}
+        assert record.pk == existing.pk
+        existing.refresh_from_db()
+        assert existing.value == 2.0
+        assert existing.estimated is True
+
     def test_consumption_record_sync2(self):
 
         # Create a two metadata objects
@@ -164,6 +187,196 @@ class ConsumptionRecordAPITestCase(OAuthTestCase):
         assert response.status_code == 400
         assert response.data['status'] == 'error'
 
+    def test_consumption_record_sync_partitioned(self):
+        if connection.pg_version < 110000:
+            return
+
+        partitioning.partition_table('start')
+        partitioning.create_range_partitions(
+            datetime(2014, 1, 1, tzinfo=pytz.UTC),
+            datetime(2014, 12, 31, tzinfo=pytz.UTC))
+
+        response = self.post('/api/v1/consumption_metadatas/sync/', [{
+            "project_project_id": "ABC",
+            "unit": "KWH",
+            "interpretation": "E_C_S",
+            "label": "first-trace"
+        }])
+        cm_id = response.data[0]['id']
+
+        record = {
+            "project_id": "ABC",
+            "unit": "KWH",
+            "interpretation": "E_C_S",
+            "label": "first-trace",
+            "start": "2014-01-01T00:00:00+00:00",
+            "value": 1.0,
+            "estimated": True
+        }
+        response = self.post('/api/v1/consumption_records/sync/', [record])
+        assert response.status_code == 200
+        assert response.data[0]['status'] == 'created'
+
+        response = self.post('/api/v1/consumption_records/sync/',
+                             [dict(record, value=2.0)])
+        assert response.data[0]['status'] == 'updated'
+
+        response = self.post('/api/v1/consumption_records/sync2/', [{
+            "metadata_id": cm_id,
+            "start": "2014-01-01T00:00:00+00:00",
+            "value": 3.0,
+            "estimated": False
+        }, {
+            "metadata_id": cm_id,
+            "start": "2014-01-01T01:00:00+00:00",
+            "value": 4.0,
+            "estimated": False
+        }])
+        assert response.status_code == 200
+
+        records = models.ConsumptionRecord.objects\
+            .filter(metadata_id=cm_id).order_by('start')
+        assert [record.value for record in records] == [3.0, 4.0]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT tableoid::regclass::text"
+                " FROM datastore_consumptionrecord WHERE metadata_id = %s",
+                [cm_id])
+            assert cursor.fetchall() == \
+                [('datastore_consumptionrecord_y2014',)]
+
+    def test_consumption_record_sync2_duplicate_keys(self):
+        start = "2014-01-01T00:00:00+00:00"
+        records = [{
+            "metadata_id": self.cm_e.pk,
+            "start": start,
+            "value": value,
+            "estimated": False
+        } for value in [1.0, 2.0]]
+
+        response = self.post('/api/v1/consumption_records/sync2/', records)
+        assert response.status_code == 200
+
+        # last record for a key wins
+        record = models.ConsumptionRecord.objects.get(
+            metadata_id=self.cm_e.pk, start=start)
+        assert record.value == 2.0
+
+        # resending unchanged records leaves them alone
+        response = self.post('/api/v1/consumption_records/sync2/',
+                             records[1:])
+        assert response.status_code == 200
+        assert models.ConsumptionRecord.objects.filter(
+            metadata_id=self.cm_e.pk, start=start).count() == 1
+
+    def test_consumption_record_sync2_batches(self):
+        records = [{
+            "metadata_id": self.cm_e.pk,
+            "start": "2014-01-01T0{}:00:00+00:00".format(hour),
+            "value": 1.0,
+            "estimated": False
+        } for hour in range(5)]
+
+        with self.settings(SYNC_BATCH_SIZE=2):
+            response = self.post('/api/v1/consumption_records/sync2/',
+                                 records)
+        assert response.status_code == 200
+        assert models.ConsumptionRecord.objects.filter(
+            metadata_id=self.cm_e.pk, start__year=2014).count() == 5
+
+        # an error in a later batch rolls back the earlier ones
+        for record in records:
+            record["value"] = 2.0
+        records[-1]["value"] = "foo"
+        with self.settings(SYNC_BATCH_SIZE=2):
+            response = self.post('/api/v1/consumption_records/sync2/',
+                                 records)
+        assert response.status_code == 400
+        assert models.ConsumptionRecord.objects.filter(
+            metadata_id=self.cm_e.pk, value=2.0).count() == 0
+
+        # errors refer to the position of the record in the whole upload
+        assert response.data['errors'] == [{
+            "index": 4, "field": "value", "message": "invalid value: foo"
+        }]
+
+    def test_consumption_record_sync2_skips_unchanged_days(self):
+        records = [{
+            "metadata_id": self.cm_e.pk,
+            "start": "2014-01-0{}T12:00:00+00:00".format(day),
+            "value": 1.0,
+            "estimated": False
+        } for day in [1, 2, 3]]
+
+        response = self.post('/api/v1/consumption_records/sync2/', records)
+        assert response.status_code == 200
+        assert response.data['skipped'] == 0
+        assert models.ConsumptionFingerprint.objects.filter(
+            metadata=self.cm_e).count() == 3
+
+        response = self.post('/api/v1/consumption_records/sync2/', records)
+        assert response.data['skipped'] == 3
+
+        # only the changed day is written
+        records[0]["value"] = 2.0
+        response = self.post('/api/v1/consumption_records/sync2/', records)
+        assert response.data['skipped'] == 2
+        assert models.ConsumptionRecord.objects.get(
+            metadata=self.cm_e, start=records[0]["start"]).value == 2.0
+
+        # writes by other means invalidate the fingerprint of their day
+        record = models.ConsumptionRecord.objects.get(
+            metadata=self.cm_e, start=records[1]["start"])
+        record.value = 5.0
+        record.save()
+        response = self.post('/api/v1/consumption_records/sync2/', records)
+        assert response.data['skipped'] == 2
+        record.refresh_from_db()
+        assert record.value == 1.0
+
+        # invalid values are reported, even on days which are unchanged
+        response = self.post('/api/v1/consumption_records/sync2/',
+                             [dict(records[2], estimated="maybe")])
+        assert response.status_code == 400
+        assert response.data['errors'] == [{
+            "index": 0,
+            "field": "estimated",
+            "message": "invalid value: maybe",
+        }]
+
+    def test_consumption_record_sync2_csv(self):
+        body = (
+            "metadata_id,start,value,estimated\n"
+            "{0},2014-01-01T00:00:00+00:00,1.0,true\n"
+            "{0},2014-01-01T01:00:00+00:00,,false\n"
+        ).format(self.cm_e.pk)
+
+        response = self.client.post('/api/v1/consumption_records/sync2/',
+                                    body, content_type="text/csv",
+                                    Authorization="Bearer " + "tokstr")
+        assert response.status_code == 200
+
+        records = models.ConsumptionRecord.objects.filter(
+            metadata_id=self.cm_e.pk, start__year=2014).order_by('start')
+        assert [r.value for r in records] == [1.0, None]
+        assert [r.estimated for r in records] == [True, False]
+
+    def test_consumption_record_sync2_csv_bad_header(self):
+        body = "metadata_id,start,value\n1,2014-01-01T00:00:00+00:00,1.0\n"
+
+        response = self.client.post('/api/v1/consumption_records/sync2/',
+                                    body, content_type="text/csv",
+                                    Authorization="Bearer " + "tokstr")
+        assert response.status_code == 400
+        assert response.data['status'] == 'error'
+
+    def test_consumption_record_sync2_csv_empty(self):
+        response = self.client.post('/api/v1/consumption_records/sync2/',
+                                    '', content_type="text/csv",
+                                    Authorization="Bearer " + "tokstr")
+        assert response.status_code == 400
+        assert response.data['status'] == 'error'
+
     def test_consumption_record_create_read(self):
 
         response = self.post('/api/v1/consumption_metadatas/sync/', [{
@@ -202,3 +415,98 @@ class ConsumptionRecordAPITestCase(OAuthTestCase):
         assert response.data['value'] == 0.0
         assert response.data['estimated'] is False
         assert response.data['metadata'] == cm_id
+
+    def test_consumption_record_list_pages(self):
+        # unpaginated unless asked
+        response = self.get('/api/v1/consumption_records/',
+                            {"metadata": self.cm_ng.pk})
+        assert isinstance(response.data, list)
+        expected = sorted(record['start'] for record in response.data)
+
+        starts = []
+        url = '/api/v1/consumption_records/'
+        data = {"metadata": self.cm_ng.pk, "page_size": 10}
+        with CaptureQueriesContext(connection) as queries:
+            while url is not None:
+                response = self.get(url, data)
+                assert response.status_code == 200
+                assert len(response.data['results']) <= 10
+                starts.extend(r['start'] for r in response.data['results'])
+                url, data = response.data['next'], None
+
+        assert starts == expected
+        assert not any('COUNT(' in query['sql'] for query in queries)
+
+        response = self.get('/api/v1/consumption_records/',
+                            {"page_size": 10, "cursor": "foo"})
+        assert response.status_code == 404
+
+    def test_consumption_record_list_compacted(self):
+        url = '/api/v1/consumption_records/'
+        data = {"metadata": self.cm_e.pk}
+        expected = sorted(
+            (record['start'], record['value'], record['estimated'])
+            for record in self.get(url, data).data)
+
+        self.cm_e.compact_records(900)
+
+        response = self.get(url, data)
+        assert [
+            (record['start'], record['value'], record['estimated'])
+            for record in response.data
+        ] == expected
+        assert all(record['id'] is None for record in response.data)
+
+        records = []
+        data = dict(data, page_size=1000)
+        while url is not None:
+            response = self.get(url, data)
+            records.extend(response.data['results'])
+            url, data = response.data['next'], None
+        assert [record['start'] for record in records] == \
+            [start for start, _, _ in expected]
+
+        response = self.get('/api/v1/consumption_records/',
+                            {"metadata": self.cm_e.pk, "format": "npy"})
+        records = np.load(BytesIO(response.content), allow_pickle=False)
+        assert len(records) == len(expected)
+        assert (records['id'] == -1).all()
+
+    def test_consumption_record_list_npy(self):
+        response = self.get('/api/v1/consumption_records/',
+                            {"metadata": self.cm_e.pk, "format": "npy"})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-npy'
+
+        records = np.load(BytesIO(response.content), allow_pickle=False)
+        assert records.dtype.names == (
+            'id', 'metadata_id', 'start', 'value', 'estimated')
+        assert len(records) == 6000
+        assert (records['metadata_id'] == self.cm_e.pk).all()
+        assert records['start'][0] == np.datetime64('2011-12-01T00:00')
+        assert np.isnan(records['value'][0]) and records['value'][1] == 1.0
+
+        assert 'Link' not in response
+
+        # errors are still sent as JSON
+        response = self.get('/api/v1/consumption_records/0/',
+                            {"format": "npy"})
+        assert response.status_code == 404
+        assert response['Content-Type'] == 'application/json'
+
+    def test_consumption_record_list_npy_pages(self):
+        starts = []
+        url = '/api/v1/consumption_records/'
+        data = {"metadata": self.cm_e.pk, "format": "npy", "page_size": 1000}
+        while url is not None:
+            response = self.get(url, data)
+            assert response.status_code == 200
+            records = np.load(BytesIO(response.content), allow_pickle=False)
+            assert len(records) <= 1000
+            starts.extend(records['start'])
+            link = response.get('Link')
+            url = link[1:link.index('>')] if link is not None else None
+            data = None
+
+        assert len(starts) == 6000
+        assert starts == sorted(starts)
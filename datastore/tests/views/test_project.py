@@ -1,10 +1,14 @@
 from datetime import datetime, timedelta
+import json
 
 import pytz
 import numpy as np
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from .shared import OAuthTestCase
-from datastore import models
+from datastore import models, views
 
 
 class ProjectAPITestCase(OAuthTestCase):
@@ -216,6 +220,89 @@ class ProjectAPITestCase(OAuthTestCase):
         assert response.data[0]['status'] == 'updated'
         assert isinstance(response.data[0]['id'], int)
 
+    def test_project_sync_concurrent_create(self):
+        # created by another sync after this one looked it up
+        existing = models.Project.objects.get(project_id="ABC")
+        project = models.Project(project_owner=existing.project_owner,
+                                 project_id="ABC", zipcode="02138")
+        errors = views.ProjectViewSet()._save_objects([project])
+        assert errors == {}
+        assert project.pk == existing.pk
+        existing.refresh_from_db()
+        assert existing.zipcode == "02138"
+
+    def test_project_sync_batch(self):
+
+        def project(project_id, zipcode):
+            return {
+                "project_owner_id": self.project_owner.id,
+                "project_id": project_id,
+                "baseline_period_end": "2014-01-01T00:00:00+00:00",
+                "reporting_period_start": "2014-01-01T00:00:00+00:00",
+                "zipcode": zipcode,
+            }
+
+        response = self.post('/api/v1/projects/sync/', [
+            project("PROJECT_1", "11111"),
+            project("PROJECT_2", "22222"),
+        ])
+        assert [r['status'] for r in response.data] == ['created', 'created']
+
+        # created, updated, unchanged and repeated records in one batch
+        response = self.post('/api/v1/projects/sync/', [
+            project("PROJECT_1", "11111"),
+            project("PROJECT_2", "33333"),
+            project("PROJECT_3", "44444"),
+            project("PROJECT_3", "55555"),
+            project("PROJECT_3", "55555"),
+        ])
+        assert [r['status'] for r in response.data] == [
+            'unchanged - same record',
+            'updated',
+            'created',
+            'updated',
+            'unchanged - same record',
+        ]
+        assert response.data[2]['id'] == response.data[3]['id']
+        assert models.Project.objects.get(project_id="PROJECT_2").zipcode \
+            == "33333"
+        assert models.Project.objects.get(project_id="PROJECT_3").zipcode \
+            == "55555"
+
+        # the number of queries doesn't depend on the number of records
+        def sync_queries(n):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post('/api/v1/projects/sync/', [
+                    project("PROJECT_{}_{}".format(n, i), "00000")
+                    for i in range(n)
+                ])
+            assert response.status_code == 200
+            return len(queries)
+
+        assert sync_queries(1) == sync_queries(20)
+
+    def test_project_sync_malformed_tail(self):
+        body = json.dumps([
+            {
+                "project_owner_id": self.project_owner.id,
+                "project_id": "PROJECT_{}".format(i),
+                "baseline_period_end": "2014-01-01T00:00:00+00:00",
+                "reporting_period_start": "2014-01-01T00:00:00+00:00",
+                "zipcode": "11111",
+            }
+            for i in range(3)
+        ])[:-1] + ', {"project_id": '
+
+        with self.settings(SYNC_BATCH_SIZE=2):
+            response = self.client.post('/api/v1/projects/sync/', body,
+                                        content_type="application/json",
+                                        Authorization="Bearer " + "tokstr")
+        assert response.status_code == 400
+
+        # the batches parsed before the error were rolled back
+        assert not models.Project.objects \
+            .filter(project_id__startswith="PROJECT_").exists()
+
     def test_project_read_no_query_params(self):
         data = self.get(
             '/api/v1/projects/{}/'
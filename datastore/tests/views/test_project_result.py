@@ -1,9 +1,12 @@
 from .shared import OAuthTestCase
 
 from datetime import datetime
+from io import BytesIO
 
+import numpy as np
 import pytz
 
+from datastore import models
 from datastore.services import create_project
 
 
@@ -160,3 +163,28 @@ class ProjectAPITestCase(OAuthTestCase):
             'lower',
             'n',
         ]
+
+    def test_project_result_read_npy(self):
+        response = self.get('/api/v1/project_results/', {"format": "npy"})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-npy'
+        assert 'Link' not in response
+
+        aggregations = np.load(BytesIO(response.content), allow_pickle=False)
+        assert aggregations.dtype.names[:3] == (
+            'project_result_id', 'project_id', 'modeling_period_group_id')
+        assert len(aggregations) == \
+            models.DerivativeAggregation.objects.count()
+        assert (aggregations['project_id'] == 'BCDE').all()
+        assert np.issubdtype(aggregations['baseline_value'].dtype,
+                             np.floating)
+
+        project_result = models.ProjectResult.objects.latest('pk')
+        response = self.get(
+            '/api/v1/project_results/{}/'.format(project_result.pk),
+            HTTP_ACCEPT='application/x-npy')
+        assert response.status_code == 200
+        aggregations = np.load(BytesIO(response.content), allow_pickle=False)
+        assert (aggregations['project_result_id'] == project_result.pk).all()
+        assert len(aggregations) == \
+            project_result.derivative_aggregations.count()
@@ -1,5 +1,7 @@
 from .shared import OAuthTestCase
 
+from datastore import models
+
 
 class ProjectRunAPITestCase(OAuthTestCase):
 
@@ -80,3 +82,42 @@ class ProjectRunAPITestCase(OAuthTestCase):
         response = self.post('/api/v1/project_runs/', data)
         project_run = response.data
         assert 'Invalid pk "99999999"' in project_run['project'][0]
+
+    def test_project_block_run(self):
+        project_block = models.ProjectBlock.objects.create(name="BLOCK")
+        project_block.projects.add(self.project, self.project2)
+
+        data = {
+            'meter_class': 'EnergyEfficiencyMeter',
+            'chunk_size': 1,
+        }
+        response = self.post(
+            '/api/v1/project_blocks/{}/run/'.format(project_block.pk), data)
+        assert response.status_code == 201
+        project_block_run = response.data
+        assert project_block_run['project_block'] == project_block.pk
+        assert 'chunk_size' not in project_block_run
+
+        project_runs = models.ProjectRun.objects.filter(
+            project_block_run_id=project_block_run['id'])
+        assert set(pr.project_id for pr in project_runs) == \
+            set([self.project.pk, self.project2.pk])
+
+        response = self.get('/api/v1/project_block_runs/{}/'
+                            .format(project_block_run['id']))
+        status_counts = response.data['status_counts']
+        assert sum(status_counts.values()) == 2
+        assert status_counts['PENDING'] == 0
+        assert status_counts['RUNNING'] == 0
+
+    def test_project_block_run_bad_meter_class(self):
+        project_block = models.ProjectBlock.objects.create(name="BLOCK")
+        project_block.projects.add(self.project)
+
+        data = {
+            'meter_class': 'foo',
+        }
+        response = self.post(
+            '/api/v1/project_blocks/{}/run/'.format(project_block.pk), data)
+        assert response.status_code == 400
+        assert models.ProjectRun.objects.count() == 0
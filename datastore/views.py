@@ -2,20 +2,34 @@ from rest_framework.permissions import (
     IsAuthenticated,
     DjangoModelPermissionsOrAnonReadOnly,
 )
-from rest_framework.decorators import list_route
+from rest_framework.decorators import list_route, detail_route
+from rest_framework.exceptions import ParseError
 from rest_framework import viewsets, mixins
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import filters
 from rest_framework_bulk import BulkModelViewSet
 
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+from io import BytesIO
+
 import django_filters
+import numpy as np
+import pytz
+from django.core.exceptions import ValidationError
 from django.db import IntegrityError, transaction
+from django.db.models import Model
 from django.utils.dateparse import parse_datetime
 
 from oauth2_provider.ext.rest_framework import TokenHasReadWriteScope
 
+from . import lookups
 from . import models
 from . import serializers
+from .pagination import merge_objects
+from .parsers import JSONStreamParser
+from . import renderers
 from . import tasks
 from . import services
 
@@ -28,6 +42,41 @@ else:
     default_permissions_classes = [IsAuthenticated, TokenHasReadWriteScope]
 
 
+def _batches(iterable, size):
+    """ Yield lists of at most `size` items from `iterable`. """
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _sync_record_batches(records, pool):
+    """ Sync consumption records a `SYNC_BATCH_SIZE` batch at a time over
+    `pool`, or the current connection if None, stopping at the first batch
+    which fails.
+    """
+    result, status = {"status": "success"}, 200
+    skipped = 0
+    offset = 0
+    for batch in _batches(records, settings.SYNC_BATCH_SIZE):
+        result, status = services.parallel_sync(
+            batch, services.sync_consumption_records, n_connections=1,
+            pool=pool)
+        if status != 200:
+            services.reindex_errors(
+                result, range(offset, offset + len(batch)))
+            return result, status
+        skipped += result["skipped"]
+        offset += len(batch)
+
+    result["skipped"] = skipped
+    return result, status
+
+
 def projects_filter(queryset, value):
     """Project filter for non-project views"""
     return _filter_projects(queryset, value, "project__in")
@@ -59,13 +108,24 @@ def _parse_part(part):
 
 class SyncMixin(object):
 
-    @list_route(methods=['post'])
+    @list_route(methods=['post'], parser_classes=[JSONStreamParser])
     def sync(self, request):
         self._sync_route_docstring()
 
         self._create_properties()
 
-        response_data = [self._sync_record(record) for record in request.data]
+        # Records are parsed lazily from the request body and synced a batch
+        # at a time, all in one transaction: if the body turns out to be
+        # malformed part way through, none of it is kept.
+        response_data = []
+        try:
+            with transaction.atomic():
+                for batch in _batches(request.data, settings.SYNC_BATCH_SIZE):
+                    response_data.extend(self._sync_records(batch))
+        except ParseError:
+            # Drop anything cached from the rolled back writes
+            lookups.invalidate(self.queryset.model)
+            raise
 
         # Return a 400 response if any of the records failed to sync
         status_code = 200
@@ -75,65 +135,182 @@ class SyncMixin(object):
 
         return Response(response_data, status=status_code)
 
-    def _sync_record(self, record):
-        """ Get/Create/Update records as necessary, returing dict with data
-        (as stored in the db) and status.
-        If a record is new, add it. If it already exists, decide whether to
-        updated it.
-        """
+    def _sync_records(self, records):
+        """ Get/Create/Update a batch of records, returning a dict with data
+        (as stored in the db) and status for each record.
 
-        foreign_objects = self._find_foreign_objects(record)
-        if "status" in foreign_objects:  # one or more not found
-            return foreign_objects
+        Existing objects are looked up with one query, and new or changed
+        objects are written with one bulk upsert. Objects are only saved one
+        at a time when the upsert fails, to report which records failed.
+        """
+        results = [None] * len(records)
+        model = self.queryset.model
+
+        self._prefetch_foreign_objects(records)
+
+        entries = []
+        for i, record in enumerate(records):
+            foreign_objects = self._find_foreign_objects(record)
+            if "status" in foreign_objects:  # one or more not found
+                results[i] = foreign_objects
+                continue
+
+            record = self._parse_record(record, foreign_objects)
+
+            try:
+                fields = self._get_fields(record, foreign_objects)
+                defaults = {attr: record[attr] for attr in self.attributes}
+                key = self._lookup_key(fields)
+            except KeyError as e:
+                results[i] = self._serialize_error(
+                    record, "error - missing field", e, foreign_objects)
+                continue
+            except (ValueError, ValidationError) as e:
+                results[i] = self._serialize_error(
+                    record, "error - bad field value - create", e,
+                    foreign_objects)
+                continue
+
+            entries.append((i, record, foreign_objects, fields, defaults, key))
+
+        existing = self._find_existing([entry[3] for entry in entries])
+
+        # Resolve every record against the existing objects, or against the
+        # object created or updated by an earlier record with the same key.
+        objs = {}
+        to_save = OrderedDict()
+        pending = []
+        for i, record, foreign_objects, fields, defaults, key in entries:
+            obj = objs.get(key)
+            if obj is None:
+                matches = existing.get(key, [])
+                if len(matches) > 1:
+                    results[i] = self._serialize_error(
+                        record, "error - multiple records",
+                        "get() returned more than one {} -- it returned {}!"
+                        .format(model.__name__, len(matches)),
+                        foreign_objects)
+                    continue
+                elif len(matches) == 1:
+                    obj = matches[0]
+                else:
+                    obj = model(**dict(fields, **defaults))
+                    objs[key] = to_save[id(obj)] = obj
+                    pending.append((i, record, foreign_objects, obj,
+                                    "created"))
+                    continue
+                objs[key] = obj
+
+            if self._is_different(obj, record):
+                if self._should_update(obj, record):
+                    # update every field
+                    for attr in self.attributes:
+                        setattr(obj, attr, record[attr])
+                    to_save[id(obj)] = obj
+                    pending.append((i, record, foreign_objects, obj,
+                                    "updated"))
+                else:
+                    pending.append((i, record, foreign_objects, obj,
+                                    "unchanged - update not valid"))
+            else:
+                pending.append((i, record, foreign_objects, obj,
+                                "unchanged - same record"))
+
+        errors = self._save_objects(list(to_save.values()))
+
+        for i, record, foreign_objects, obj, status in pending:
+            error = errors.get(id(obj))
+            if error is None:
+                results[i] = self._serialize(obj, status=status)
+                continue
+
+            action = "create" if status == "created" else "update"
+            if isinstance(error, IntegrityError):
+                results[i] = self._serialize_error(
+                    record, "error - integrity error - " + action,
+                    error.__cause__, foreign_objects)
+            else:
+                results[i] = self._serialize_error(
+                    record, "error - bad field value - " + action, error,
+                    foreign_objects)
 
-        record = self._parse_record(record, foreign_objects)
+        return results
 
-        try:
-            with transaction.atomic():
-                obj, created = self._get_or_create(record, foreign_objects)
-        except KeyError as e:
-            return self._serialize_error(record, "error - missing field", e,
-                                         foreign_objects)
-        except models.Project.MultipleObjectsReturned as e:
-            return self._serialize_error(record, "error - multiple records",
-                                         e, foreign_objects)
-        except ValueError as e:
-            return self._serialize_error(
-                record, "error - bad field value - create", e, foreign_objects)
-        except IntegrityError as e:
-            return self._serialize_error(
-                record, "error - integrity error - create", e.__cause__,
-                foreign_objects)
+    def _prefetch_foreign_objects(self, records):
+        """ Resolve the foreign objects named in a batch of records, before
+        `_find_foreign_objects` is called for each of them.
+        """
+        pass
 
-        if created:
-            return self._serialize(obj, status="created")
+    def _lookup_key(self, fields):
+        """ Hashable key for lookup fields, comparable with `_object_key`.
+        """
+        opts = self.queryset.model._meta
+        key = []
+        for name in sorted(fields):
+            value = fields[name]
+            if isinstance(value, Model):
+                value = value.pk
+            key.append(opts.get_field(name).to_python(value))
+        return tuple(key)
+
+    def _object_key(self, obj, names):
+        opts = self.queryset.model._meta
+        return tuple(
+            opts.get_field(name).to_python(
+                getattr(obj, opts.get_field(name).attname))
+            for name in sorted(names)
+        )
 
-        # (else not created)
+    def _find_existing(self, lookups):
+        """ Fetch the existing objects matching any of `lookups` in one
+        query, as a dict of lookup key to list of matching objects.
+        """
+        existing = defaultdict(list)
+        if len(lookups) == 0:
+            return existing
 
-        if self._is_different(obj, record):
-            if self._should_update(obj, record):
-                # update every field
-                for attr in self.attributes:
-                    setattr(obj, attr, record[attr])
+        names = sorted(lookups[0])
+        keys = set(self._lookup_key(fields) for fields in lookups)
 
+        # Filter on each lookup field separately, then keep exact matches.
+        filters = {
+            "{}__in".format(name): set(key[n] for key in keys)
+            for n, name in enumerate(names)
+        }
+        for obj in self.queryset.filter(**filters):
+            key = self._object_key(obj, names)
+            if key in keys:
+                existing[key].append(obj)
+        return existing
+
+    def _save_objects(self, objs):
+        """ Save objs with a single bulk upsert. If that fails, save them
+        one at a time and return a dict of `id(obj)` to exception for each
+        object which could not be saved.
+        """
+        model = self.queryset.model
+        new_objs = [obj for obj in objs if obj._state.adding]
+        if len(new_objs) > 0:
+            for obj, pk in zip(new_objs,
+                               models.reserve_pks(model, len(new_objs))):
+                obj.pk = pk
+
+        errors = {}
+        try:
+            with transaction.atomic():
+                models.bulk_save(model, objs)
+        except (ValueError, IntegrityError):
+            for obj in objs:
                 try:
                     with transaction.atomic():
-                        obj.save()
-                except ValueError as e:
-                    return self._serialize_error(
-                        record, "error - bad field value - update", e,
-                        foreign_objects)
-                except IntegrityError as e:
-                    return self._serialize_error(
-                        record, "error - integrity error - update",
-                        e.__cause__, foreign_objects)
+                        models.bulk_save(model, [obj])
+                except (ValueError, IntegrityError) as e:
+                    errors[id(obj)] = e
 
-                return self._serialize(obj, status="updated")
-            else:
-                return self._serialize(
-                    obj, status="unchanged - update not valid")
-        else:
-            return self._serialize(obj, status="unchanged - same record")
+        # bulk_save doesn't send the signals which keep these up to date
+        lookups.invalidate(model)
+        return errors
 
     def _is_different(self, existing_obj, new_record_data):
         return any([getattr(existing_obj, attr) != new_record_data[attr]
@@ -158,11 +335,44 @@ class SyncMixin(object):
         data["status"] = status
         return data
 
-    def _get_or_create(self, record, foreign_objects):
-        fields = self._get_fields(record, foreign_objects)
-        fields["defaults"] = {attr: record[attr] for attr in self.attributes}
-        obj, created = self.queryset.get_or_create(**fields)
-        return obj, created
+
+class ColumnarMixin(object):
+    """ Adds the typed binary formats of `datastore.renderers` to list and
+    detail reads. Their data is built by `get_columns` straight from query
+    results, without serializers.
+
+    Binary lists are always paginated, in pages of up to
+    `columnar_page_size` objects (`API_MAX_PAGE_SIZE` if None); the next
+    page is linked from the `Link` header.
+    """
+
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + \
+        renderers.BINARY_RENDERERS
+    columnar_page_size = None
+
+    def _columnar(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        return renderer is not None and \
+            renderer.format in renderers.BINARY_FORMATS
+
+    def list(self, request, *args, **kwargs):
+        if self._columnar(request):
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginator.paginate_queryset(
+                queryset, request, view=self,
+                max_page_size=(self.columnar_page_size or
+                               settings.API_MAX_PAGE_SIZE))
+            response = Response(self.get_columns(page))
+            link = self.paginator.get_link_header()
+            if link is not None:
+                response['Link'] = link
+            return response
+        return super(ColumnarMixin, self).list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self._columnar(request):
+            return Response(self.get_columns([self.get_object()]))
+        return super(ColumnarMixin, self).retrieve(request, *args, **kwargs)
 
 
 class ProjectOwnerViewSet(viewsets.ModelViewSet):
@@ -184,13 +394,16 @@ class ConsumptionMetadataFilter(django_filters.FilterSet):
         fields = ['interpretation', 'unit', 'project', 'label']
 
 
-class ConsumptionMetadataViewSet(SyncMixin, viewsets.ModelViewSet):
+class ConsumptionMetadataViewSet(ColumnarMixin, SyncMixin,
+                                 viewsets.ModelViewSet):
 
     permission_classes = default_permissions_classes
     queryset = models.ConsumptionMetadata.objects.all().order_by('pk')
     filter_backends = (filters.DjangoFilterBackend,)
     filter_class = ConsumptionMetadataFilter
     sync_serializer_class = serializers.ConsumptionMetadataSummarySerializer
+    # binary pages hold every record of each trace
+    columnar_page_size = 10
 
     def get_serializer_class(self):
         if not hasattr(self.request, 'query_params'):
@@ -198,9 +411,99 @@ class ConsumptionMetadataViewSet(SyncMixin, viewsets.ModelViewSet):
 
         if self.request.query_params.get("summary", "False") == "True":
             return serializers.ConsumptionMetadataSummarySerializer
+        elif self.request.query_params.get("records_format") == "columnar" \
+                and self.action in ('list', 'retrieve'):
+            return serializers.ConsumptionMetadataColumnarSerializer
         else:
             return serializers.ConsumptionMetadataSerializer
 
+    def get_columns(self, metadatas):
+        """ Records of the traces, in long form, including compacted
+        records.
+        """
+        names = ['metadata_id', 'start', 'value', 'estimated']
+        rows = list(
+            models.ConsumptionRecord.objects
+            .filter(metadata__in=metadatas)
+            .order_by('metadata_id', 'start')
+            .values_list(*names))
+
+        chunked = []
+        for metadata in metadatas:
+            data = metadata.chunks_dataframe()
+            chunked.extend(zip(
+                [metadata.pk] * len(data), data.index.to_pydatetime(),
+                data.value.values, data.estimated.values))
+        if len(chunked) > 0:
+            rows = merge_objects(rows, chunked, lambda row: row[:2])
+
+        return renderers.Columns.from_rows(
+            rows, names, ['int', 'datetime', 'float', 'bool'])
+
+    @detail_route(methods=['get'])
+    def trace(self, request, pk=None):
+        """
+        `GET /api/v1/consumption_metadatas/{id}/trace/`
+
+        Aggregates the trace into intervals on the server, so only the
+        aggregated series is sent. Query parameters (all optional):
+
+        - `start`, `end`: ISO 8601 window of records, end exclusive
+        - `freq`: pandas frequency of intervals, e.g. `H`, `D` (default) or
+          `MS` (month start); frequencies labelled by interval end, such as
+          `M` (month end), are rejected
+        - `aggregation`: `sum` (default), `mean`, `min`, `max` or `count`
+          (of non-null values)
+        - `tz`: time zone in which intervals such as days begin (default
+          `UTC`)
+
+        Requests for more than `TRACE_MAX_INTERVALS` intervals are rejected.
+
+        Returns data like the following::
+
+            {
+                "id": 1,
+                "interpretation": "E_C_S",
+                "unit": "KWH",
+                "freq": "D",
+                "aggregation": "sum",
+                "starts": ["2016-01-01T00:00:00Z", ...],
+                "value": [10.2, null, ...]
+            }
+
+        Intervals without values are null, except for `count`. Starts are
+        in UTC, as elsewhere in the API.
+        """
+        consumption_metadata = self.get_object()
+
+        query = serializers.TraceQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        try:
+            series = consumption_metadata.resample_records(
+                params['freq'], params['aggregation'],
+                start=params.get('start'), end=params.get('end'),
+                tz=params['tz'], max_intervals=settings.TRACE_MAX_INTERVALS)
+        except ValueError as e:
+            raise ParseError(str(e))
+
+        if params['aggregation'] == 'count':
+            values = series.values.astype(int).tolist()
+        else:
+            values = series.values.astype(float)
+            values = np.where(np.isnan(values), None, values).tolist()
+
+        return Response(OrderedDict([
+            ('id', consumption_metadata.pk),
+            ('interpretation', consumption_metadata.interpretation),
+            ('unit', consumption_metadata.unit),
+            ('freq', params['freq']),
+            ('aggregation', params['aggregation']),
+            ('starts', serializers.isoformat_utc(series.index)),
+            ('value', values),
+        ]))
+
     def _sync_route_docstring(self):
         return """
         `POST /api/v1/consumption_metadatas/sync/`
@@ -224,9 +527,11 @@ class ConsumptionMetadataViewSet(SyncMixin, viewsets.ModelViewSet):
             "unit",
         ]
 
-        self.project_dict = {
-            p.project_id: p for p in models.Project.objects.all()
-        }
+    def _prefetch_foreign_objects(self, records):
+        self.project_dict = lookups.project_cache.get_many(
+            str(record["project_project_id"]) for record in records
+            if "project_project_id" in record
+        )
 
     def _find_foreign_objects(self, record):
         project = self.project_dict.get(str(record["project_project_id"]))
@@ -264,10 +569,11 @@ class ConsumptionRecordFilter(django_filters.FilterSet):
         fields = ['metadata', 'start']
 
 
-class ConsumptionRecordViewSet(SyncMixin, BulkModelViewSet):
+class ConsumptionRecordViewSet(ColumnarMixin, SyncMixin, BulkModelViewSet):
 
     permission_classes = default_permissions_classes
     queryset = models.ConsumptionRecord.objects.all().order_by('pk')
+    keyset_ordering = ('metadata_id', 'start')
     filter_backends = (filters.DjangoFilterBackend,)
     filter_class = ConsumptionRecordFilter
     sync_serializer_class = serializers.ConsumptionRecordSerializer
@@ -275,6 +581,80 @@ class ConsumptionRecordViewSet(SyncMixin, BulkModelViewSet):
     def get_serializer_class(self):
         return serializers.ConsumptionRecordSerializer
 
+    def list(self, request, *args, **kwargs):
+        """ Lists include the records of compacted traces, which have a
+        null id (or -1 in binary formats). Those can't be retrieved, updated
+        or deleted one at a time.
+        """
+        if self._columnar(request):
+            return super(ConsumptionRecordViewSet, self).list(
+                request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        extra = self.get_extra_objects()
+        if len(extra) > 0:
+            queryset = merge_objects(
+                list(queryset.order_by(*self.keyset_ordering)), extra,
+                lambda record: (record.metadata_id, record.start))
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def get_extra_objects(self, after=None, limit=None):
+        """ Compacted records matching the `metadata` and `start` filters,
+        as unsaved ConsumptionRecords, in (metadata_id, start) order, after
+        the key `after`.
+        """
+        metadatas = models.ConsumptionMetadata.objects\
+            .filter(has_record_chunks=True).order_by('pk')
+        start = end = None
+
+        params = self.request.query_params
+        if params.get('metadata'):
+            try:
+                metadatas = metadatas.filter(pk=int(params['metadata']))
+            except ValueError:
+                return []
+        if params.get('start'):
+            start = parse_datetime(params['start'])
+            if start is None:
+                return []
+            if start.tzinfo is None:
+                start = pytz.UTC.localize(start)
+            end = start + timedelta(microseconds=1)
+        if after is not None:
+            metadatas = metadatas.filter(pk__gte=after[0])
+
+        records = []
+        for metadata in metadatas.iterator():
+            lower = start
+            if after is not None and metadata.pk == after[0]:
+                lower = after[1] if start is None else max(start, after[1])
+            # one more, in case the record at `after` is among them
+            data = metadata.chunks_dataframe(
+                lower, end,
+                None if limit is None else limit - len(records) + 1)
+            if after is not None and metadata.pk == after[0]:
+                data = data[data.index > after[1]]
+            records.extend(models.chunk_records(metadata, data))
+            if limit is not None and len(records) >= limit:
+                return records[:limit]
+        return records
+
+    def get_columns(self, records):
+        names = ['id', 'metadata_id', 'start', 'value', 'estimated']
+        rows = [
+            (-1 if record.id is None else record.id, record.metadata_id,
+             record.start, record.value, record.estimated)
+            for record in records
+        ]
+        return renderers.Columns.from_rows(
+            rows, names, ['int', 'int', 'datetime', 'float', 'bool'])
+
     def _sync_route_docstring(self):
         return """
         `POST /api/v1/consumption_records/sync/`
@@ -301,12 +681,12 @@ class ConsumptionRecordViewSet(SyncMixin, BulkModelViewSet):
             "estimated",
         ]
 
-        consumption_metadatas = models.ConsumptionMetadata.objects.all()
-
-        self.metadata_dict = {
-            (cm.project.project_id, cm.interpretation): cm
-            for cm in consumption_metadatas if cm.project
-        }
+    def _prefetch_foreign_objects(self, records):
+        self.metadata_dict = lookups.consumption_metadata_cache.get_many(
+            (str(record["project_id"]), record["interpretation"])
+            for record in records
+            if "project_id" in record and "interpretation" in record
+        )
 
     def _find_foreign_objects(self, record):
 
@@ -338,7 +718,7 @@ class ConsumptionRecordViewSet(SyncMixin, BulkModelViewSet):
         record["start"] = parse_datetime(record["start"])
         return record
 
-    @list_route(methods=['post'])
+    @list_route(methods=['post'], parser_classes=[JSONStreamParser])
     def sync2(self, request):
         """
         `POST /api/v1/consumption_records/sync2/`
@@ -357,19 +737,55 @@ class ConsumptionRecordViewSet(SyncMixin, BulkModelViewSet):
                 },
                 ...
             ]
+
+        For large uploads, send `Content-Type: text/csv` instead; the body
+        is streamed straight into the database without being parsed in
+        Python::
+
+            start,value,estimated,metadata_id
+            2016-03-15T00:00:00+0000,10.2,false,1
+            ...
+
+        Records are parsed incrementally and upserted in batches of
+        `SYNC_BATCH_SIZE` within a single transaction, so memory use does not
+        grow with the size of the upload. Days of a trace identical to the
+        stored records are skipped; the response reports how many records
+        were `skipped`. Invalid values are reported as `errors`, each with
+        the `index` of its record in the upload.
+
+        With `SYNC_CONNECTIONS` above 1, each batch is split by
+        `metadata_id` and upserted over that many connections at once, and
+        the upload is no longer synced in a single transaction: the records
+        of each trace in each batch are committed on their own. If a batch
+        fails, the batches before it, and the traces of the failed batch
+        which succeeded, are kept.
         """
 
         fields = ['start', 'value', 'estimated', 'metadata_id']
 
+        if request.content_type.startswith('text/csv'):
+            # An empty body has no stream; it is then missing its header.
+            result, status = services.bulk_sync_csv(
+                request.stream or BytesIO(), fields, models.ConsumptionRecord,
+                ['start', 'metadata_id'])
+            return Response(result, status=status)
+
         records = request.data
 
         # Wrap as list if missing
-        if type(records) is not list:
+        if isinstance(records, dict):
             records = [records]
 
-        result, status = services.bulk_sync(
-            records, fields, models.ConsumptionRecord,
-            ['start', 'metadata_id'])
+        # Connections of a pool commit on their own, so the upload is only
+        # one transaction when synced over the request's connection.
+        if settings.SYNC_CONNECTIONS > 1:
+            with services.ConnectionPool(settings.SYNC_CONNECTIONS) as pool:
+                result, status = _sync_record_batches(records, pool)
+        else:
+            with transaction.atomic():
+                result, status = _sync_record_batches(records, pool=None)
+                if status != 200:
+                    transaction.set_rollback(True)
 
         return Response(result, status=status)
 
@@ -419,7 +835,7 @@ class ProjectViewSet(SyncMixin, viewsets.ModelViewSet):
     sync_serializer_class = serializers.ProjectSerializer
 
     def get_queryset(self):
-        return (
+        queryset = (
             models.Project.objects.all()
             .prefetch_related('consumptionmetadata_set')
             .prefetch_related('projectattribute_set')
@@ -427,6 +843,24 @@ class ProjectViewSet(SyncMixin, viewsets.ModelViewSet):
             .order_by('pk')
         )
 
+        if hasattr(self.request, 'query_params') and \
+                self.request.query_params.get(
+                    "with_meter_runs", "False") == "True":
+            queryset = (
+                queryset
+                .select_related('latest_project_result')
+                .prefetch_related(
+                    'latest_project_result__modeling_periods',
+                    'latest_project_result__modeling_period_groups',
+                    'latest_project_result__derivative_aggregations',
+                    'latest_project_result__energy_trace_model_results',
+                    'latest_project_result__energy_trace_model_results'
+                    '__derivatives',
+                )
+            )
+
+        return queryset
+
     def get_serializer(self, *args, **kwargs):
         queryset = self.get_queryset()
 
@@ -549,13 +983,16 @@ class ProjectRunViewSet(mixins.CreateModelMixin,
         return serializers.ProjectRunSerializer
 
 
-class ProjectResultViewSet(viewsets.ModelViewSet):
+class ProjectResultViewSet(ColumnarMixin, viewsets.ModelViewSet):
 
     permission_classes = default_permissions_classes
 
     def get_queryset(self):
+        queryset = models.ProjectResult.objects.all().order_by('pk')
+        if self._columnar(getattr(self, 'request', None)):
+            return queryset
         return (
-            models.ProjectResult.objects.all().order_by('pk')
+            queryset
             .prefetch_related('modeling_periods')
             .prefetch_related('modeling_period_groups')
             .prefetch_related('derivative_aggregations')
@@ -566,6 +1003,30 @@ class ProjectResultViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         return serializers.ProjectResultSerializer
 
+    def get_columns(self, project_results):
+        """ Derivative aggregations of the project results. """
+        fields = [
+            ('project_result_id', 'project_result_id', 'int'),
+            ('project_id', 'project_result__project__project_id', 'str'),
+            ('modeling_period_group_id', 'modeling_period_group_id', 'int'),
+            ('trace_interpretation', 'trace_interpretation', 'str'),
+            ('interpretation', 'interpretation', 'str'),
+            ('baseline_value', 'baseline_value', 'float'),
+            ('baseline_upper', 'baseline_upper', 'float'),
+            ('baseline_lower', 'baseline_lower', 'float'),
+            ('baseline_n', 'baseline_n', 'int'),
+            ('reporting_value', 'reporting_value', 'float'),
+            ('reporting_upper', 'reporting_upper', 'float'),
+            ('reporting_lower', 'reporting_lower', 'float'),
+            ('reporting_n', 'reporting_n', 'int'),
+        ]
+        names, paths, kinds = zip(*fields)
+        rows = models.DerivativeAggregation.objects\
+            .filter(project_result__in=project_results)\
+            .order_by('project_result_id', 'pk')\
+            .values_list(*paths)
+        return renderers.Columns.from_rows(rows, names, kinds)
+
 
 class ProjectBlockViewSet(viewsets.ModelViewSet):
 
@@ -581,6 +1042,50 @@ class ProjectBlockViewSet(viewsets.ModelViewSet):
         else:
             return serializers.ProjectBlockSerializer
 
+    @detail_route(methods=['post'])
+    def run(self, request, pk=None):
+        """
+        `POST /api/v1/project_blocks/{id}/run/`
+
+        Creates a ProjectRun for every project in the block and queues them
+        in chunks of `chunk_size` (optional) project runs per celery task.
+
+        Expects data like the following::
+
+            {
+                "meter_class": "EnergyEfficiencyMeter",
+                "meter_settings": {},
+                "chunk_size": 100
+            }
+
+        Returns a project block run, which can be polled at
+        `GET /api/v1/project_block_runs/{id}/` for its `status_counts`.
+        """
+        project_block = self.get_object()
+
+        serializer = serializers.ProjectBlockRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        project_block_run = services.run_project_block(
+            project_block,
+            meter_class=data.get('meter_class', 'EnergyEfficiencyMeter'),
+            meter_settings=data.get('meter_settings'),
+            chunk_size=data.get('chunk_size'),
+        )
+
+        serializer = serializers.ProjectBlockRunSerializer(project_block_run)
+        return Response(serializer.data, status=201)
+
+
+class ProjectBlockRunViewSet(mixins.ListModelMixin,
+                             mixins.RetrieveModelMixin,
+                             viewsets.GenericViewSet):
+
+    permission_classes = default_permissions_classes
+    queryset = models.ProjectBlockRun.objects.all().order_by('pk')
+    serializer_class = serializers.ProjectBlockRunSerializer
+
 
 class ProjectAttributeKeyFilter(django_filters.FilterSet):
 
@@ -687,12 +1192,16 @@ class ProjectAttributeViewSet(SyncMixin, viewsets.ModelViewSet):
             "integer_value",
         ]
 
-        self.project_dict = {
-            p.project_id: p for p in models.Project.objects.all()
-        }
-        self.project_attribute_key_dict = {
-            pak.name: pak for pak in models.ProjectAttributeKey.objects.all()
-        }
+    def _prefetch_foreign_objects(self, records):
+        self.project_dict = lookups.project_cache.get_many(
+            record["project_project_id"] for record in records
+            if "project_project_id" in record
+        )
+        self.project_attribute_key_dict = \
+            lookups.project_attribute_key_cache.get_many(
+                record["project_attribute_key_name"] for record in records
+                if "project_attribute_key_name" in record
+            )
 
     def _find_foreign_objects(self, record):
 
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+import threading
+
+from django.conf import settings
+
+from eemeter.weather import ISDWeatherSource, TMY3WeatherSource
+from eemeter.weather.location import (
+    zipcode_to_usaf_station,
+    zipcode_to_tmy3_station,
+)
+
+
+class WeatherSourceCache(object):
+    """ Process-level, size-bounded LRU cache of weather sources keyed by
+    station, so that projects sharing a station share one weather source and
+    its loaded data.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of weather sources kept in memory.
+    cache_directory : str, optional
+        Directory in which weather sources persist downloaded data, shared
+        across processes and runs. If None, eemeter's default is used.
+    """
+
+    def __init__(self, maxsize, cache_directory=None):
+        self.maxsize = maxsize
+        self.cache_directory = cache_directory
+        self.hits = 0
+        self.misses = 0
+        self._sources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory):
+        """ Return the cached value for `key`, calling `factory()` to create
+        it on a miss.
+        """
+        with self._lock:
+            if key in self._sources:
+                self.hits += 1
+                source = self._sources.pop(key)
+                self._sources[key] = source
+                return source
+            self.misses += 1
+
+        source = factory()
+
+        with self._lock:
+            self._sources[key] = source
+            while len(self._sources) > self.maxsize:
+                self._sources.popitem(last=False)
+
+        return source
+
+    def weather_source(self, zipcode):
+        """ ISD weather source for the station nearest `zipcode`, or None if
+        no station can be found.
+        """
+        station = zipcode_to_usaf_station(zipcode)
+        if station is None:
+            return None
+        return self.get(('ISD', station),
+                        lambda: self._create(ISDWeatherSource, station))
+
+    def weather_normal_source(self, zipcode):
+        """ TMY3 weather normal source for the station nearest `zipcode`, or
+        None if no station can be found.
+        """
+        station = zipcode_to_tmy3_station(zipcode)
+        if station is None:
+            return None
+        return self.get(('TMY3', station),
+                        lambda: self._create(TMY3WeatherSource, station))
+
+    def _create(self, source_class, station):
+        # eemeter raises ValueError for stations it has no data for; cache
+        # None so that the station isn't tried again for every project.
+        try:
+            if self.cache_directory is None:
+                return source_class(station)
+            return source_class(station, self.cache_directory)
+        except ValueError:
+            return None
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._sources),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._sources.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+weather_source_cache = WeatherSourceCache(
+    settings.WEATHER_SOURCE_CACHE_SIZE,
+    cache_directory=settings.WEATHER_SOURCE_CACHE_DIRECTORY,
+)
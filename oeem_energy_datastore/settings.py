@@ -86,6 +86,11 @@ STATIC_URL = '/static/'
 # Extra places for collectstatic to find static files.
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'staticfiles'),)
 
+# Generated files, e.g. portal CSV exports. Point DEFAULT_FILE_STORAGE at a
+# shared backend when web and worker processes don't share a filesystem.
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", os.path.join(BASE_DIR, 'media'))
+MEDIA_URL = '/media/'
+
 OAUTH2_PROVIDER = {
     'SCOPES': {'read': 'Read scope', 'write': 'Write scope'},
     'ACCESS_TOKEN_EXPIRE_SECONDS': 315360000,  # 10 years
@@ -97,9 +102,21 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'datastore.pagination.KeysetPagination',
 }
 
+# rows per page of list endpoints when a request doesn't give `page_size`;
+# unset to return unpaginated lists
+API_PAGE_SIZE = int(os.environ["API_PAGE_SIZE"]) \
+    if os.environ.get("API_PAGE_SIZE") else None
+
+# largest `page_size` a request may ask for
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 10000))
+
+# most intervals a consumption metadata `trace` request may aggregate into
+TRACE_MAX_INTERVALS = int(os.environ.get("TRACE_MAX_INTERVALS", 100000))
+
 GRAPPELLI_ADMIN_TITLE = "Open Energy Efficiency Meter"
 
 LOGGING = {
@@ -162,6 +179,28 @@ BROKER_TRANSPORT = os.environ.get("BROKER_TRANSPORT", "memory")
 CELERY_ALWAYS_EAGER = \
     os.environ.get("CELERY_ALWAYS_EAGER", "true").lower() == "true"
 
+# weather sources shared across meter runs within a worker process
+WEATHER_SOURCE_CACHE_SIZE = \
+    int(os.environ.get("WEATHER_SOURCE_CACHE_SIZE", 64))
+WEATHER_SOURCE_CACHE_DIRECTORY = \
+    os.environ.get("WEATHER_SOURCE_CACHE_DIRECTORY", None)
+
+# number of project runs executed per celery task when running whole blocks
+PROJECT_RUN_CHUNK_SIZE = int(os.environ.get("PROJECT_RUN_CHUNK_SIZE", 100))
+
+# number of records parsed from a sync payload and handled at a time
+SYNC_BATCH_SIZE = int(os.environ.get("SYNC_BATCH_SIZE", 5000))
+
+# database connections used at once to upsert each sync2 batch; batches
+# split across connections are no longer synced in a single transaction
+SYNC_CONNECTIONS = int(os.environ.get("SYNC_CONNECTIONS", 1))
+
+# projects, metadata and attribute keys cached per process for sync routes
+FOREIGN_KEY_CACHE_SIZE = int(os.environ.get("FOREIGN_KEY_CACHE_SIZE", 10000))
+
+# seconds before those caches pick up changes made by other processes
+FOREIGN_KEY_CACHE_TTL = float(os.environ.get("FOREIGN_KEY_CACHE_TTL", 60))
+
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
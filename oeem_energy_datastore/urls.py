@@ -44,6 +44,11 @@ router.register(
     datastore_views.ProjectBlockViewSet,
     base_name='project_block')
 
+router.register(
+    r'project_block_runs',
+    datastore_views.ProjectBlockRunViewSet,
+    base_name='project_block_run')
+
 router.register(
     r'consumption_metadatas',
     datastore_views.ConsumptionMetadataViewSet,
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def content_to_file(apps, schema_editor):
+    CSVDownload = apps.get_model('portal', 'CSVDownload')
+    downloads = CSVDownload.objects.filter(content__isnull=False) \
+        .exclude(content='')
+    for csv_download in downloads.iterator():
+        csv_download.file.save(
+            '{}.csv'.format(csv_download.filename),
+            ContentFile(csv_download.content.encode('utf-8')), save=False)
+        csv_download.save(update_fields=['file'])
+
+
+def file_to_content(apps, schema_editor):
+    CSVDownload = apps.get_model('portal', 'CSVDownload')
+    downloads = CSVDownload.objects.exclude(file__isnull=True) \
+        .exclude(file='')
+    for csv_download in downloads.iterator():
+        csv_file = csv_download.file
+        with csv_file.storage.open(csv_file.name, 'rb') as f:
+            csv_download.content = f.read().decode('utf-8')
+        csv_download.save(update_fields=['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvdownload',
+            name='file',
+            field=models.FileField(blank=True, null=True, upload_to='csv_downloads'),
+        ),
+        migrations.RunPython(content_to_file, file_to_content),
+        migrations.RemoveField(
+            model_name='csvdownload',
+            name='content',
+        ),
+    ]
@@ -1,7 +1,12 @@
 from celery import shared_task
 from celery.utils.log import get_task_logger
 
-from six import StringIO
+from django.core.files import File
+from django.utils import six
+
+import csv
+import tempfile
+
 import pandas as pd
 
 from portal.models import CSVDownload
@@ -12,13 +17,39 @@ from datastore.services import (
 
 logger = get_task_logger(__name__)
 
+# The Python 2 csv module writes bytes; on Python 3 it writes text and
+# handles line endings itself.
+CSV_TEMPFILE_KWARGS = {'mode': 'w+b'} if six.PY2 else \
+    {'mode': 'w+', 'newline': ''}
+
+
+def _csv_value(value):
+    # None, NaN and NaT
+    if pd.isnull(value):
+        return ''
+    return value
+
+
+def write_csv(outfile, headers, rows):
+    """ Write rows (dicts) to `outfile` one at a time; rows may be any
+    iterable, so memory use does not depend on the number of rows.
+    """
+    writer = csv.DictWriter(outfile, fieldnames=headers, restval='',
+                            extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+
 
 def save_csv(csv_download_pk, data):
     csv_download = CSVDownload.objects.get(pk=csv_download_pk)
-    string = StringIO()
-    df = pd.DataFrame(data['rows'])
-    df.to_csv(string, columns=data['headers'], index=False)
-    csv_download.content = string.getvalue()
+
+    with tempfile.TemporaryFile(**CSV_TEMPFILE_KWARGS) as outfile:
+        write_csv(outfile, data['headers'], data['rows'])
+        outfile.seek(0)
+        csv_download.file.save('{}.csv'.format(csv_download.filename),
+                               File(outfile), save=False)
+
     csv_download.completed = True
     csv_download.save()
 
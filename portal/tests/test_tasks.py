@@ -0,0 +1,41 @@
+from django.test import TestCase, override_settings
+
+import tempfile
+
+import pandas as pd
+from six import StringIO
+
+from portal.models import CSVDownload
+from portal.tasks import save_csv, write_csv
+
+
+class SaveCSVTestCase(TestCase):
+
+    def test_write_csv(self):
+        outfile = StringIO()
+        rows = (
+            {'a': i, 'b': [None, float('nan'), pd.NaT][i], 'c': 'x'}
+            for i in range(3)
+        )
+        write_csv(outfile, ['a', 'b'], rows)
+        assert outfile.getvalue().splitlines() == [
+            'a,b',
+            '0,',
+            '1,',
+            '2,',
+        ]
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_save_csv(self):
+        csv_download = CSVDownload.objects.create(completed=False,
+                                                  filename="export")
+        save_csv(csv_download.pk, {
+            'headers': ['a'],
+            'rows': iter([{'a': 1}, {'a': 2}]),
+        })
+
+        csv_download.refresh_from_db()
+        assert csv_download.completed
+        csv_file = csv_download.file
+        with csv_file.storage.open(csv_file.name, 'r') as f:
+            assert f.read().splitlines() == ['a', '1', '2']
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase, override_settings
+
+import tempfile
+
+from portal.models import CSVDownload
+
+
+class DownloadCSVTestCase(TestCase):
+
+    def setUp(self):
+        User.objects.create_user('john', 'lennon@thebeatles.com',
+                                 'johnpassword')
+        self.client.login(username='john', password='johnpassword')
+
+    def test_completed_without_file(self):
+        csv_download = CSVDownload.objects.create(completed=True,
+                                                  filename="export")
+        response = self.client.get(reverse("download_csv"),
+                                   {"csv_id": csv_download.pk})
+        assert response.status_code == 410
+
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+    def test_completed_with_missing_file(self):
+        csv_download = CSVDownload.objects.create(
+            completed=True, filename="export",
+            file='csv_downloads/missing.csv')
+        response = self.client.get(reverse("download_csv"),
+                                   {"csv_id": csv_download.pk})
+        assert response.status_code == 410
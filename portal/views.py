@@ -1,7 +1,8 @@
 from django.shortcuts import render, render_to_response
 from django.http import (
-    HttpResponse,
+    FileResponse,
     HttpResponseForbidden,
+    HttpResponseGone,
     HttpResponseRedirect
 )
 from django.core.urlresolvers import reverse
@@ -50,16 +51,20 @@ def download_csv(request):
     csv_id = request.GET.get("csv_id")
     try:
         csv_download = CSVDownload.objects.get(pk=csv_id)
-    except CSVDownload.objects.DoesNotExist:
+    except CSVDownload.DoesNotExist:
         return HttpResponseForbidden()
 
     if csv_download.completed:
-        response = HttpResponse(content_type='text/csv')
+        csv_file = csv_download.file
+        if not csv_file or not csv_file.storage.exists(csv_file.name):
+            # completed, but the file is gone
+            return HttpResponseGone()
+        response = FileResponse(csv_file.storage.open(csv_file.name, 'rb'),
+                                content_type='text/csv')
         response['Content-Disposition'] = (
             'attachment; filename="{}.csv"'
             .format(csv_download.filename)
         )
-        response.write(csv_download.content)
         return response
     else:
         return render_to_response("download_csv.html",
@@ -32,20 +32,17 @@ class Connection(models.Model):
 
     def summary_data(self):
         connection_memberships = self.connectionmembership_set.all() \
+            .select_related('project__latest_project_result') \
             .prefetch_related(
-                'project',
-                'project__project_results',
-                'project__project_results__derivative_aggregations'
+                'project__latest_project_result__derivative_aggregations'
             ).order_by('-pk')
 
         projects = []
         for membership in connection_memberships:
 
-            project_results = membership.project.project_results\
-                .order_by('-pk')
-            if len(project_results) == 0:
+            project_result = membership.project.latest_project_result
+            if project_result is None:
                 continue
-            project_result = project_results[0]
 
             summaries = [
                 OrderedDict([